@@ -0,0 +1,72 @@
+"""
+Benchmark: lexicon sentiment tier vs. LLM labels.
+
+Reports how often the lexicon agrees with the LLM on the fixture posts, how
+many posts (and LLM requests) hybrid mode keeps local, and scoring throughput.
+With OPENAI_API_KEY or GEMINI_API_KEY set, agreement is measured against live
+LLM labels; otherwise against the reference labels stored in the fixture.
+
+Usage (from backend/):
+    python -m benchmarks.bench_lexicon_sentiment
+"""
+import json
+import math
+import time
+from pathlib import Path
+from src.services.lexicon_sentiment import lexicon_sentiment, LEXICON_MIN_CONFIDENCE
+from src.services.llm import LLMService, SENTIMENT_BATCH_SIZE
+
+FIXTURE = Path(__file__).parent.parent / "tests" / "fixtures" / "sentiment_posts.json"
+LABELS = ("Positive", "Negative", "Neutral")
+THROUGHPUT_POSTS = 100_000
+
+
+def agreement(pairs: list) -> str:
+    if not pairs:
+        return "n/a"
+    matches = sum(1 for ours, theirs in pairs if ours == theirs)
+    return f"{matches}/{len(pairs)} ({matches / len(pairs):.0%})"
+
+
+def main():
+    posts = json.loads(FIXTURE.read_text())["posts"]
+    texts = [p["text"] for p in posts]
+
+    llm = LLMService()
+    if llm.provider:
+        reference = [a.get("sentiment_label", "Neutral") for a in llm.analyze_sentiment_batch(texts)]
+        source = f"live {llm.model_name}"
+    else:
+        reference = [p["label"] for p in posts]
+        source = "fixture reference labels"
+
+    results = lexicon_sentiment(texts)
+    confident = [r["confidence"] >= LEXICON_MIN_CONFIDENCE for r in results]
+    local_pairs = [(r["sentiment_label"], ref) for r, ref, c in zip(results, reference, confident) if c]
+    all_pairs = [(r["sentiment_label"], ref) for r, ref in zip(results, reference)]
+
+    print(f"Agreement with {source} ({len(posts)} posts, min confidence {LEXICON_MIN_CONFIDENCE})")
+    print(f"  posts kept local (hybrid):  {len(local_pairs)}/{len(posts)}")
+    print(f"  agreement on local posts:   {agreement(local_pairs)}")
+    print(f"  agreement on all (local):   {agreement(all_pairs)}")
+
+    escalated = len(posts) - len(local_pairs)
+    before = math.ceil(len(posts) / SENTIMENT_BATCH_SIZE)
+    after = math.ceil(escalated / SENTIMENT_BATCH_SIZE)
+    print(f"  LLM requests (batch {SENTIMENT_BATCH_SIZE}): {before} -> {after}, posts sent: {len(posts)} -> {escalated}")
+
+    print("\nConfusion (rows = lexicon, columns = reference):")
+    print(f"{'':>10}" + "".join(f"{label:>10}" for label in LABELS))
+    for ours in LABELS:
+        counts = [sum(1 for o, t in all_pairs if o == ours and t == theirs) for theirs in LABELS]
+        print(f"{ours:>10}" + "".join(f"{c:>10}" for c in counts))
+
+    batch = (texts * math.ceil(THROUGHPUT_POSTS / len(texts)))[:THROUGHPUT_POSTS]
+    start = time.perf_counter()
+    lexicon_sentiment(batch)
+    elapsed = time.perf_counter() - start
+    print(f"\nThroughput: {THROUGHPUT_POSTS:,} posts in {elapsed * 1000:.0f} ms ({THROUGHPUT_POSTS / elapsed:,.0f} posts/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+"""
+Benchmark: per-call cost of the in-process metrics.
+
+Times Histogram.observe and Counter.inc on a private registry, from one
+thread and from several threads sharing a metric, which is how agent threads
+record stage and upstream timings. Wall-clock costs vary too much between
+machines to assert on in the test suite, so they are reported here instead.
+
+Usage (from backend/):
+    python -m benchmarks.bench_metrics
+"""
+import threading
+import time
+from src.utils.metrics import Counter, Histogram, CollectorRegistry
+
+
+def bench(func, repeat: int, threads: int = 1) -> float:
+    """Microseconds per call, with `threads` threads each making `repeat` calls."""
+    def run():
+        for _ in range(repeat):
+            func()
+
+    workers = [threading.Thread(target=run) for _ in range(threads)]
+    start = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return (time.perf_counter() - start) / (repeat * threads) * 1e6
+
+
+def main():
+    registry = CollectorRegistry()
+    histogram = Histogram("bench_latency_seconds", "Benchmark latency.", ("stage",), registry=registry)
+    counter = Counter("bench_events_total", "Benchmark events.", ("stage",), registry=registry)
+    repeat = 50000
+
+    print(f"{'case':<32} {'us/call':>8}")
+    for threads in (1, 4, 16):
+        observe_us = bench(lambda: histogram.observe(0.01, stage="listener"), repeat // threads, threads)
+        inc_us = bench(lambda: counter.inc(stage="listener"), repeat // threads, threads)
+        print(f"{f'Histogram.observe, {threads} thread(s)':<32} {observe_us:>8.2f}")
+        print(f"{f'Counter.inc, {threads} thread(s)':<32} {inc_us:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
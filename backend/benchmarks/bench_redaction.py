@@ -0,0 +1,90 @@
+"""
+Benchmark: single-pass Redactor vs. the previous multi-pass sanitizers.
+
+Times sanitize_error_message on long error strings and with many sensitive
+values, and the RedactingFilter on typical log records. The multi-pass
+implementation is kept here as the baseline, and every case also checks that
+both produce the same output.
+
+Usage (from backend/):
+    python -m benchmarks.bench_redaction
+"""
+import logging
+import re
+import time
+from src.utils.security import Redactor, RedactingFilter, sanitize_error_message
+
+OPENAI_KEY = "sk-proj-abc123def456ghi789jkl012mno345pqr678stu901vwx234yz567"
+GENERIC_KEY = "abc123def456ghi789jkl012mno345pqr678stu901vwx234yz567890"
+
+
+def legacy_sanitize_api_key(text: str, key_value: str = None) -> str:
+    """The pre-Redactor implementation: recompiles and rescans per pattern and per hit."""
+    if not text:
+        return text
+    if key_value and len(key_value) > 8:
+        text = text.replace(key_value, f"{key_value[:4]}...{key_value[-4:]}")
+    text = re.sub(r'sk-[a-zA-Z0-9\-]{20,}', 'sk-****REDACTED****', text)
+    for match in re.finditer(r'\b[a-zA-Z0-9_\-]{40,}\b', text):
+        matched_text = match.group(0)
+        if re.search(r'[a-zA-Z]', matched_text) and re.search(r'[0-9]', matched_text):
+            text = text.replace(matched_text, '****REDACTED****', 1)
+    return text
+
+
+def legacy_sanitize_error_message(error: Exception, sensitive_values: list = None) -> str:
+    message = str(error)
+    for value in sensitive_values or ():
+        if value and len(value) > 8:
+            message = message.replace(value, f"{value[:4]}...{value[-4:]}")
+    return legacy_sanitize_api_key(message)
+
+
+def bench(func, *args, repeat: int) -> float:
+    """Microseconds per call."""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func(*args)
+    return (time.perf_counter() - start) / repeat * 1e6
+
+
+def compare(label: str, error: Exception, values: list, repeat: int):
+    ours = sanitize_error_message(error, values)
+    theirs = legacy_sanitize_error_message(error, values)
+    legacy_us = bench(legacy_sanitize_error_message, error, values, repeat=repeat)
+    new_us = bench(sanitize_error_message, error, values, repeat=repeat)
+    same = "same output" if ours == theirs else "OUTPUT DIFFERS"
+    print(f"{label:<38} {legacy_us:>10.1f} {new_us:>10.1f} {legacy_us / new_us:>7.1f}x  {same}")
+
+
+def main():
+    keys = [f"user-key-{i:04d}-{'x' * 20}" for i in range(50)]
+    traceback_line = 'File "/app/src/services/llm.py", line 120, in generate_text: upstream said no. '
+
+    print(f"{'case':<38} {'legacy us':>10} {'single us':>10} {'speedup':>8}")
+    compare("short error, 2 keys", Exception(f"401 for key {OPENAI_KEY}"), [OPENAI_KEY, "etherscan-key-123456"], 20000)
+    compare("short error, no secrets", Exception("Connection reset by peer"), [], 20000)
+    long_text = traceback_line * 150 + f" key={OPENAI_KEY} token={GENERIC_KEY} " + traceback_line * 150
+    compare("12KB error, 2 keys present", Exception(long_text), [OPENAI_KEY, GENERIC_KEY], 500)
+    many_hits = " ".join(f"{key} {GENERIC_KEY}{i}" for i, key in enumerate(keys))
+    compare("50 keys, all present + 50 generic", Exception(many_hits), keys, 500)
+    compare("50 keys, 12KB error, none present", Exception(traceback_line * 300), keys, 500)
+
+    # Log filter: one scan per record
+    redacting_filter = RedactingFilter(Redactor(keys[:5]))
+    records = [
+        logging.LogRecord("bench", logging.INFO, __file__, 0, "[Listener] Fetched %d posts for %s", (25, "PEPE"), None),
+        logging.LogRecord("bench", logging.WARNING, __file__, 0, f"[LLM] OpenAI error with {OPENAI_KEY}", None, None),
+    ]
+    repeat = 20000
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for record in records:
+            record._redacted = False
+            redacting_filter.filter(record)
+    per_record_us = (time.perf_counter() - start) / (repeat * len(records)) * 1e6
+    print(f"\nRedactingFilter: {per_record_us:.1f}us per record ({len(records)} record kinds, 5 known keys)")
+
+
+if __name__ == "__main__":
+    main()
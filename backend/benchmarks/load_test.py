@@ -0,0 +1,328 @@
+"""
+Offline end-to-end load benchmark for /analyze/{token}.
+
+Starts local stand-ins for the DexScreener search, Etherscan tokentx, Reddit
+RSS and OpenAI chat-completions endpoints. Each has configurable latency and
+payload size. The backend is pointed at them through DEXSCREENER_BASE_URL,
+ETHERSCAN_API_URL, REDDIT_BASE_URL and OPENAI_BASE_URL. main.app is driven
+in-process through httpx's ASGI transport at increasing concurrency, and the
+benchmark reports throughput, p50/p95/p99 latency and per-stage means.
+
+Every request uses a distinct token symbol, so caches don't hide the
+orchestration path. Pass --repeat-token to measure the cached path instead.
+
+Usage (from backend/):
+    python -m benchmarks.load_test
+    python -m benchmarks.load_test --levels 1,8,32 --requests 64 --llm-latency-ms 500
+    python -m benchmarks.load_test --fail-p95-ms 2500   # non-zero exit on regression
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import re
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs
+from xml.sax.saxutils import escape
+
+import numpy as np
+
+STAGES = ("setup_ms", "listener_ms", "analyst_ms", "judge_ms")
+
+
+def _address(seed: str) -> str:
+    return "0x" + hashlib.sha256(seed.encode()).hexdigest()[:40]
+
+
+class StubConfig:
+    latency_s = {"dexscreener": 0.05, "etherscan": 0.08, "reddit": 0.06, "openai": 0.3}
+    pairs = 20
+    transfers = 500
+    posts = 10
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    upstream = None
+
+    def _send(self, status: int, body: bytes, content_type: str = "application/json", headers: dict = None):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        time.sleep(StubConfig.latency_s[self.upstream])
+        url = urlsplit(self.path)
+        query = {k: v[0] for k, v in parse_qs(url.query).items()}
+
+        if self.upstream == "dexscreener" and url.path == "/latest/dex/search":
+            self._send(200, json.dumps({"pairs": dexscreener_pairs(query.get("q", "X"))}).encode())
+        elif self.upstream == "dexscreener" and url.path.startswith("/latest/dex/pairs/"):
+            addresses = url.path.rsplit("/", 1)[-1].split(",")
+            pairs = [SERVED_PAIRS[a] for a in addresses if a in SERVED_PAIRS]
+            self._send(200, json.dumps({"pairs": pairs}).encode())
+        elif self.upstream == "etherscan" and query.get("action") == "tokentx":
+            self._send(200, json.dumps(etherscan_transfers(query["contractaddress"])).encode())
+        elif self.upstream == "reddit" and url.path.endswith("/search.rss"):
+            feed = reddit_feed(query.get("q", "X"))
+            etag = f'"{hashlib.sha256(feed).hexdigest()[:16]}"'
+            if self.headers.get("If-None-Match") == etag:
+                self._send(304, b"", headers={"ETag": etag})
+            else:
+                self._send(200, feed, "application/atom+xml", headers={"ETag": etag})
+        else:
+            self._send(404, b'{"error": "not found"}')
+
+    def do_POST(self):
+        time.sleep(StubConfig.latency_s[self.upstream])
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        if self.upstream == "openai" and self.path.endswith("/chat/completions"):
+            prompt = body["messages"][-1]["content"]
+            self._send(200, json.dumps(chat_completion(prompt, body.get("model", "gpt-4o"))).encode())
+        else:
+            self._send(404, b'{"error": "not found"}')
+
+
+# Pairs handed out by the search stub, by address, for the per-pair endpoint
+SERVED_PAIRS = {}
+
+
+def dexscreener_pairs(symbol: str) -> list:
+    pairs = []
+    seen_chains = set()
+    for i in range(StubConfig.pairs):
+        chain = "ethereum" if i % 4 == 0 else ("solana", "bsc", "base")[i % 3]
+        token_address = _address(f"token-{symbol}-{chain}")
+        # The top pair per chain gets the pool address the Etherscan stub trades against
+        pair_address = _address(f"pair-{token_address}") if chain not in seen_chains else _address(f"pair-{symbol}-{i}")
+        seen_chains.add(chain)
+        pairs.append({
+            "chainId": chain,
+            "pairAddress": pair_address,
+            "baseToken": {"address": token_address, "symbol": symbol},
+            "priceUsd": "0.5",
+            "liquidity": {"usd": 2_000_000 / (i + 1)},
+            "volume": {"h24": 5_000_000 / (i + 1)},
+            "fdv": 50_000_000,
+            "url": f"https://dexscreener.com/{chain}/{i}",
+            "txns": {"h24": {"buys": 1200 - i, "sells": 1000 + i}},
+        })
+        SERVED_PAIRS[pair_address] = pairs[-1]
+    return pairs
+
+
+def etherscan_transfers(contract: str) -> dict:
+    # A third of transfers leave the pool (buys), the rest enter it (sells)
+    now = int(time.time())
+    pair = _address(f"pair-{contract}")
+    rows = []
+    for i in range(StubConfig.transfers):
+        wallet = _address(f"wallet-{i}")
+        rows.append({
+            "blockNumber": str(20_000_000 - i),
+            "timeStamp": str(now - i * 30),
+            "hash": "0x" + hashlib.sha256(f"{contract}-{i}".encode()).hexdigest(),
+            "from": pair if i % 3 == 0 else wallet,
+            "to": wallet if i % 3 == 0 else pair,
+            "value": str((i % 7 + 1) * 10 ** 23),
+            "tokenDecimal": "18",
+        })
+    return {"status": "1", "message": "OK", "result": rows}
+
+
+def _post_html(symbol: str, i: int) -> str:
+    return '<!-- SC_OFF --><div class="md"><p>' + f"{symbol} holders keep buying, day {i}" + '</p></div><!-- SC_ON -->'
+
+
+def reddit_feed(symbol: str) -> bytes:
+    phrases = ("to the moon 🚀", "looks like a rug", "what do you think?", "LFG 100x", "dumping hard")
+    entries = "".join(
+        f"<entry><title>{escape(f'{symbol} {phrases[i % len(phrases)]} #{i}')}</title>"
+        f'<link href="https://www.reddit.com/r/CryptoMoonShots/comments/{i}/"/>'
+        f'<content type="html">{escape(_post_html(symbol, i))}</content></entry>'
+        for i in range(StubConfig.posts)
+    )
+    return f'<?xml version="1.0" encoding="UTF-8"?><feed xmlns="http://www.w3.org/2005/Atom">{entries}</feed>'.encode()
+
+
+def chat_completion(prompt: str, model: str) -> dict:
+    batch = re.search(r"each of these (\d+) crypto", prompt)
+    if batch:
+        content = {"results": [
+            {"index": i, "sentiment_score": 0.7, "sentiment_label": "Positive"} for i in range(int(batch.group(1)))
+        ]}
+    elif "sentiment of this" in prompt:
+        content = {"sentiment_score": 0.7, "sentiment_label": "Positive"}
+    else:
+        content = {"risk_level": "Medium", "verdict": "Organic Growth", "reasoning": "Stub verdict."}
+    return {
+        "id": "chatcmpl-stub", "object": "chat.completion", "created": int(time.time()), "model": model,
+        "choices": [{"index": 0, "finish_reason": "stop",
+                     "message": {"role": "assistant", "content": json.dumps(content)}}],
+        "usage": {"prompt_tokens": len(prompt) // 4, "completion_tokens": 40,
+                  "total_tokens": len(prompt) // 4 + 40},
+    }
+
+
+def start_stub(upstream: str) -> ThreadingHTTPServer:
+    handler = type(f"{upstream.title()}Stub", (StubHandler,), {"upstream": upstream})
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def configure_environment(servers: dict, data_dir: str, sentiment_mode: str, rate_limit: bool):
+    """Points the backend at the stubs; must run before src.main is imported."""
+    base = {name: f"http://127.0.0.1:{server.server_port}" for name, server in servers.items()}
+    os.environ.update({
+        "DEXSCREENER_BASE_URL": base["dexscreener"],
+        "ETHERSCAN_API_URL": f"{base['etherscan']}/v2/api",
+        "REDDIT_BASE_URL": base["reddit"],
+        "OPENAI_BASE_URL": f"{base['openai']}/v1",
+        "OPENAI_API_KEY": "sk-stub",
+        "ETHERSCAN_API_KEY": "stub",
+        "SENTIMENT_MODE": sentiment_mode,
+        "TRANSFER_STORE_PATH": os.path.join(data_dir, "transfers.sqlite3"),
+        "SNAPSHOT_STORE_PATH": os.path.join(data_dir, "snapshots.sqlite3"),
+        "SENTIMENT_CACHE_PATH": os.path.join(data_dir, "sentiment_cache.sqlite3"),
+        "WATCHLIST_TOKENS": "",
+        # Real-world upstream limits would throttle the stubs and mask the orchestration path
+        "RATE_LIMIT_ENABLED": "1" if rate_limit else "0",
+    })
+    for name in ("GEMINI_API_KEY", "REDDIT_CLIENT_ID", "REDDIT_CLIENT_SECRET"):
+        os.environ.pop(name, None)
+
+
+def percentile(values, q: float) -> float:
+    return float(np.percentile(values, q)) if values else float("nan")
+
+
+async def run_level(client, concurrency: int, requests: int, level_index: int, repeat_token: bool) -> dict:
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies, stage_timings, errors = [], [], 0
+
+    async def one(i: int):
+        nonlocal errors
+        token = "LOAD" if repeat_token else f"L{level_index}X{i}"
+        async with semaphore:
+            start = time.perf_counter()
+            response = await client.get(f"/analyze/{token}", params={"fresh": "true"})
+            latencies.append((time.perf_counter() - start) * 1000)
+        if response.status_code != 200:
+            errors += 1
+            return
+        stage_timings.append(response.json().get("timings", {}))
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(requests)))
+    wall = time.perf_counter() - start
+
+    return {
+        "concurrency": concurrency,
+        "throughput": requests / wall,
+        "p50": percentile(latencies, 50),
+        "p95": percentile(latencies, 95),
+        "p99": percentile(latencies, 99),
+        "errors": errors,
+        "stages": {s: float(np.mean([t.get(s, 0) for t in stage_timings])) if stage_timings else float("nan")
+                   for s in STAGES},
+    }
+
+
+async def drive(args) -> list:
+    import httpx
+    from src.main import app
+
+    # Keep the benchmark output readable; warnings and errors still show
+    for name in list(logging.root.manager.loggerDict):
+        if name.startswith("src."):
+            logging.getLogger(name).setLevel(logging.WARNING)
+
+    results = []
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://loadtest", timeout=120) as client:
+            # Warm-up: builds the shared clients and opens connections
+            await client.get("/analyze/WARMUP", params={"fresh": "true"})
+            for index, concurrency in enumerate(args.levels):
+                results.append(await run_level(client, concurrency, args.requests, index, args.repeat_token))
+    return results
+
+
+def print_report(results: list):
+    header = (f"{'conc':>5} | {'req/s':>7} | {'p50 ms':>8} | {'p95 ms':>8} | {'p99 ms':>8} | {'err':>4} | "
+              + " | ".join(f"{s:>11}" for s in STAGES))
+    print(header)
+    print("-" * len(header))
+    for r in results:
+        print(f"{r['concurrency']:>5} | {r['throughput']:>7.1f} | {r['p50']:>8.0f} | {r['p95']:>8.0f} | "
+              f"{r['p99']:>8.0f} | {r['errors']:>4} | "
+              + " | ".join(f"{r['stages'][s]:>11.0f}" for s in STAGES))
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--levels", default="1,4,16,32", type=lambda v: [int(x) for x in v.split(",")],
+                        help="Comma-separated concurrency levels")
+    parser.add_argument("--requests", type=int, default=32, help="Requests per concurrency level")
+    parser.add_argument("--dex-latency-ms", type=float, default=50)
+    parser.add_argument("--etherscan-latency-ms", type=float, default=80)
+    parser.add_argument("--reddit-latency-ms", type=float, default=60)
+    parser.add_argument("--llm-latency-ms", type=float, default=300)
+    parser.add_argument("--pairs", type=int, default=20, help="Pairs per DexScreener search response")
+    parser.add_argument("--transfers", type=int, default=500, help="Transfers per Etherscan page")
+    parser.add_argument("--posts", type=int, default=10, help="Entries per Reddit RSS feed")
+    parser.add_argument("--sentiment-mode", default="llm", choices=("llm", "hybrid", "local"))
+    parser.add_argument("--rate-limit", action="store_true", help="Keep the upstream rate limiter on")
+    parser.add_argument("--repeat-token", action="store_true", help="Reuse one symbol (exercises the caches)")
+    parser.add_argument("--fail-p95-ms", type=float, default=None,
+                        help="Exit non-zero if any level's p95 exceeds this")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    StubConfig.latency_s = {
+        "dexscreener": args.dex_latency_ms / 1000, "etherscan": args.etherscan_latency_ms / 1000,
+        "reddit": args.reddit_latency_ms / 1000, "openai": args.llm_latency_ms / 1000,
+    }
+    StubConfig.pairs, StubConfig.transfers, StubConfig.posts = args.pairs, args.transfers, args.posts
+
+    servers = {name: start_stub(name) for name in ("dexscreener", "etherscan", "reddit", "openai")}
+    with tempfile.TemporaryDirectory(prefix="alphadiv-load-") as data_dir:
+        configure_environment(servers, data_dir, args.sentiment_mode, args.rate_limit)
+        try:
+            results = asyncio.run(drive(args))
+        finally:
+            for server in servers.values():
+                server.shutdown()
+
+    print(f"\nStub latency (ms): dex={args.dex_latency_ms:.0f} etherscan={args.etherscan_latency_ms:.0f} "
+          f"reddit={args.reddit_latency_ms:.0f} llm={args.llm_latency_ms:.0f}; "
+          f"{args.requests} requests per level, sentiment={args.sentiment_mode}\n")
+    print_report(results)
+
+    if args.fail_p95_ms is not None:
+        worst = max(r["p95"] for r in results)
+        if worst > args.fail_p95_ms:
+            print(f"\np95 regression: {worst:.0f}ms > {args.fail_p95_ms:.0f}ms")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,129 +1,228 @@
 import os
-import requests
 import time
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
 from src.utils.logger import get_logger
+from src.utils.metrics import instrumented
+from src.services.market_cache import dexscreener_search_cache, dexscreener_pair_cache
+from src.services.symbol_index import symbol_index, rank_pairs, primary_position
+from src.services.http_client import http_get
+from src.services.transfer_store import get_transfer_store
+from src.services.etherscan_ingestor import EtherscanIngestor, EtherscanError, ingestor_settings_from_env
+from src.services.whale_analysis import classify_whales, WHALE_THRESHOLD_USD, WHALE_BUCKET_MINUTES
+from src.services.chains import etherscan_chain_id
+from src.services.snapshot_store import get_snapshot_store
 
 load_dotenv()
 logger = get_logger(__name__)
 
+# Top pairs on at most this many Etherscan-supported chains are whale-tracked per request
+WHALE_MAX_CHAINS = int(os.getenv("WHALE_MAX_CHAINS", "4"))
+# Overridable so benchmarks can point the Analyst at a local stub
+DEXSCREENER_BASE_URL = os.getenv("DEXSCREENER_BASE_URL", "https://api.dexscreener.com").rstrip("/")
+_whale_executor = ThreadPoolExecutor(max_workers=16, thread_name_prefix="whales")
+
 class AnalystAgent:
     def __init__(self, etherscan_api_key: str = None):
         self.name = "The Analyst"
         # Priority: Passed key → Environment variable
         self.etherscan_api_key = etherscan_api_key or os.getenv("ETHERSCAN_API_KEY")
+        self.ingestor = None
+        if self.etherscan_api_key:
+            self.ingestor = EtherscanIngestor(
+                self.etherscan_api_key, get_transfer_store(), **ingestor_settings_from_env()
+            )
+
+    def _search_dexscreener_pairs(self, token_symbol: str):
+        """Runs a DexScreener search and returns the raw list of pairs."""
+        logger.info(f"[{self.name}] Querying DexScreener for ${token_symbol}...")
+        url = f"{DEXSCREENER_BASE_URL}/latest/dex/search?q={token_symbol}"
+        response = http_get(url, upstream="dexscreener")
+        return response.json().get("pairs") or []
+
+    def _fetch_dexscreener_pairs(self, chain_id: str, pair_addresses: list):
+        """Fetches current data for specific pairs on one chain (much lighter than a search)."""
+        url = f"{DEXSCREENER_BASE_URL}/latest/dex/pairs/{chain_id}/{','.join(pair_addresses)}"
+        response = http_get(url, upstream="dexscreener")
+        data = response.json()
+        return data.get("pairs") or ([data["pair"]] if data.get("pair") else [])
+
+    def index_symbol(self, token_symbol: str):
+        """
+        Searches DexScreener for a symbol and stores its ranked pairs in the symbol index.
+
+        Returns:
+            (ranked pairs, index entries), both empty if the search found nothing
+        """
+        # Concurrent lookups for the same symbol share one in-flight search
+        pairs = dexscreener_search_cache.get(
+            token_symbol.upper(),
+            lambda: self._search_dexscreener_pairs(token_symbol)
+        )
+        ranked = rank_pairs(pairs or [])
+        return ranked, symbol_index.put(token_symbol, ranked)
+
+    def _fetch_indexed_pair(self, token_symbol: str, entry: dict):
+        """Returns fresh data for an indexed pair, or None if the pair endpoint has nothing for it."""
+        try:
+            pairs = dexscreener_pair_cache.get(
+                (entry["chain_id"], entry["pair_address"]),
+                lambda: self._fetch_dexscreener_pairs(entry["chain_id"], [entry["pair_address"]])
+            )
+        except Exception as e:
+            logger.warning(f"[{self.name}] Pair lookup for {token_symbol} failed, searching instead: {e}")
+            return None
+        if not pairs:
+            logger.warning(f"[{self.name}] Indexed pair for {token_symbol} is gone, searching again")
+            symbol_index.invalidate(token_symbol)
+            return None
+        return pairs[0]
 
     def _fetch_dexscreener_data(self, token_symbol: str):
         """Fetches real-time data from DexScreener."""
-        logger.info(f"[{self.name}] Querying DexScreener for ${token_symbol}...")
-        
         try:
-            url = f"https://api.dexscreener.com/latest/dex/search?q={token_symbol}"
-            response = requests.get(url)
-            data = response.json()
-            
-            if not data.get("pairs"):
-                logger.warning(f"[{self.name}] No pairs found for {token_symbol}.")
-                return None
+            # Resolved symbols skip the search and refresh only the chosen pair
+            pair, source = None, "index"
+            entries = symbol_index.resolve(token_symbol)
+            if entries:
+                pair = self._fetch_indexed_pair(token_symbol, entries[primary_position(entries)])
+            if pair is None:
+                source = "search"
+                ranked, entries = self.index_symbol(token_symbol)
+                if not ranked:
+                    logger.warning(f"[{self.name}] No pairs found for {token_symbol}.")
+                    return None
+                # Ethereum pair if there is one (for whale tracking), else the highest liquidity
+                pair = ranked[primary_position(entries)]
+
+            liquidity_usd = pair.get("liquidity", {}).get("usd", 0)
+            price_usd = float(pair.get("priceUsd", 0))
+            logger.info(f"[{self.name}] Selected pair: {pair.get('chainId')} (Liquidity: ${liquidity_usd:,.0f}, via {source})")
+
+            # Top pair per Etherscan-supported chain, for multi-chain whale tracking. The selected
+            # pair always gets a slot and the rest go to the deepest chains; pairs other than the
+            # selected one are valued at their indexed price.
+            trackable = [
+                e for e in entries
+                if etherscan_chain_id(e["chain_id"]) is not None and e["base_token_address"]
+            ]
+            trackable.sort(key=lambda e: e["pair_address"] != pair.get("pairAddress"))
+            whale_pairs = [
+                {
+                    "chain_id": e["chain_id"],
+                    "pair_address": e["pair_address"],
+                    "base_token_address": e["base_token_address"],
+                    "price_usd": price_usd if e["pair_address"] == pair.get("pairAddress") else e["price_usd"]
+                }
+                for e in trackable[:WHALE_MAX_CHAINS]
+            ]
 
-            # Prioritize Ethereum pairs for whale tracking
-            eth_pair = None
-            highest_liquidity_pair = None
-            
-            for pair in data["pairs"]:
-                if pair.get("chainId") == "ethereum":
-                    if not eth_pair or pair.get("liquidity", {}).get("usd", 0) > eth_pair.get("liquidity", {}).get("usd", 0):
-                        eth_pair = pair
-                
-                if not highest_liquidity_pair or pair.get("liquidity", {}).get("usd", 0) > highest_liquidity_pair.get("liquidity", {}).get("usd", 0):
-                    highest_liquidity_pair = pair
-            
-            # Use Ethereum pair if available, otherwise use highest liquidity
-            pair = eth_pair if eth_pair else highest_liquidity_pair
-            
-            logger.info(f"[{self.name}] Selected pair: {pair.get('chainId')} (Liquidity: ${pair.get('liquidity', {}).get('usd', 0):,.0f})")
-            
             return {
                 "chain_id": pair.get("chainId"),
                 "pair_address": pair.get("pairAddress"),
                 "base_token_address": pair.get("baseToken", {}).get("address"),
-                "price_usd": float(pair.get("priceUsd", 0)),
-                "liquidity_usd": pair.get("liquidity", {}).get("usd", 0),
+                "price_usd": price_usd,
+                "liquidity_usd": liquidity_usd,
                 "volume_24h": pair.get("volume", {}).get("h24", 0),
                 "fdv": pair.get("fdv", 0),
                 "pair_url": pair.get("url"),
-                "txns_24h": pair.get("txns", {}).get("h24", {})
+                "txns_24h": pair.get("txns", {}).get("h24", {}),
+                "pair_source": source,
+                "whale_pairs": whale_pairs
             }
 
         except Exception as e:
             logger.error(f"[{self.name}] Error fetching DexScreener data: {e}")
             return None
 
-    def _fetch_etherscan_whales(self, token_address: str, pair_address: str, price_usd: float):
+    def _fetch_etherscan_whales(self, token_address: str, pair_address: str, price_usd: float, chain_id: int = 1):
         """
         Fetches recent transfers from Etherscan to detect Whale Buys/Sells.
+        chain_id is the Etherscan V2 chain ID (1 = Ethereum mainnet).
         """
         if not self.etherscan_api_key:
             logger.warning(f"[{self.name}] Etherscan API Key missing. Skipping Whale Tracking.")
             return None
 
-        logger.info(f"[{self.name}] Fetching Etherscan data for Whale Tracking...")
+        logger.info(f"[{self.name}] Fetching Etherscan data for Whale Tracking (chain {chain_id})...")
         
         try:
-            # Use V2 API endpoint
-            url = "https://api.etherscan.io/v2/api"
-            params = {
-                "chainid": 1,  # Ethereum mainnet
-                "module": "account",
-                "action": "tokentx",
-                "contractaddress": token_address,
-                "page": 1,
-                "offset": 100,
-                "sort": "desc",
-                "apikey": self.etherscan_api_key
-            }
-            
-            response = requests.get(url, params=params)
-            data = response.json()
-            
-            if data["status"] != "1":
-                logger.error(f"[{self.name}] Etherscan Error: {data.get('message')} - {data.get('result')}")
+            # Only transfers newer than the stored cursor are downloaded
+            try:
+                self.ingestor.sync(token_address, chain_id=chain_id)
+            except EtherscanError as e:
+                logger.warning(f"[{self.name}] Etherscan Error, falling back to previously ingested transfers: {e}")
+            if not self.ingestor.window_covered(token_address, chain_id=chain_id):
+                # A stale or unfinished sync would report whales from part of the window
+                logger.warning(f"[{self.name}] Transfers for {token_address} do not cover the window yet. "
+                               f"Skipping Whale Tracking.")
                 return None
+            batch = self.ingestor.pool_batch_in_window(token_address, pair_address, chain_id=chain_id)
 
-            whale_buys = 0
-            whale_sells = 0
-            whale_tx_count = 0
-            
-            WHALE_THRESHOLD_USD = 100000 # Define a whale as > $100k trade
+            # Vectorized buy/sell/whale aggregation over the whole window
+            whale_stats = classify_whales(
+                batch, price_usd, threshold_usd=WHALE_THRESHOLD_USD,
+                bucket_seconds=WHALE_BUCKET_MINUTES * 60
+            )
+            whale_stats["pool_transfers_analyzed"] = len(batch)
+            whale_stats["window_hours"] = self.ingestor.window_seconds / 3600
+            return whale_stats
 
-            for tx in data["result"]:
-                # Check if interaction is with the Liquidity Pool (Pair Address)
-                is_buy = tx["from"].lower() == pair_address.lower()
-                is_sell = tx["to"].lower() == pair_address.lower()
-                
-                if not (is_buy or is_sell):
-                    continue # Ignore transfers between wallets
+        except Exception as e:
+            logger.error(f"[{self.name}] Error analyzing Etherscan data: {e}")
+            return None
 
-                amount = float(tx["value"]) / (10 ** int(tx["tokenDecimal"]))
-                value_usd = amount * price_usd
-                
-                if value_usd > WHALE_THRESHOLD_USD:
-                    whale_tx_count += 1
-                    if is_buy:
-                        whale_buys += value_usd
-                    else:
-                        whale_sells += value_usd
+    def _fetch_multichain_whales(self, whale_pairs: list):
+        """
+        Runs whale tracking for the top pair on each supported chain concurrently
+        and merges the results into one flow figure.
 
-            return {
-                "whale_buys_usd": whale_buys,
-                "whale_sells_usd": whale_sells,
-                "whale_tx_count": whale_tx_count
-            }
+        Returns:
+            Merged whale stats with a per-chain breakdown, or None if every chain failed
+        """
+        if not self.etherscan_api_key:
+            logger.warning(f"[{self.name}] Etherscan API Key missing. Skipping Whale Tracking.")
+            return None
+        if not whale_pairs:
+            return None
 
-        except Exception as e:
-            logger.error(f"[{self.name}] Error analyzing Etherscan data: {e}")
+        # Each task gets its own copy of the request context (request ID, deadline)
+        futures = [
+            (
+                p["chain_id"],
+                _whale_executor.submit(
+                    contextvars.copy_context().run,
+                    self._fetch_etherscan_whales,
+                    p["base_token_address"],
+                    p["pair_address"],
+                    p["price_usd"],
+                    etherscan_chain_id(p["chain_id"])
+                )
+            )
+            for p in whale_pairs
+        ]
+
+        chains = []
+        for chain_key, future in futures:
+            result = future.result()
+            if result:
+                chains.append({"chain_id": chain_key, **result})
+
+        if not chains:
             return None
 
+        merged = {
+            "whale_buys_usd": sum(c["whale_buys_usd"] for c in chains),
+            "whale_sells_usd": sum(c["whale_sells_usd"] for c in chains),
+            "whale_tx_count": sum(c["whale_tx_count"] for c in chains),
+            "pool_transfers_analyzed": sum(c["pool_transfers_analyzed"] for c in chains),
+            "window_hours": chains[0]["window_hours"],
+            "chains": chains
+        }
+        return merged
+
+    @instrumented("analyze_onchain_data")
     def analyze_onchain_data(self, token_symbol: str):
         """
         Queries DexScreener and optionally Etherscan for Smart Money tracking.
@@ -140,6 +239,15 @@ class AnalystAgent:
                 "details": {"error": "Token not found on DexScreener"}
             }
         
+        # Compare against stored history, then append this view to it
+        deltas = None
+        try:
+            snapshot_store = get_snapshot_store()
+            deltas = snapshot_store.deltas(token_symbol, dex_data)
+            snapshot_store.record(token_symbol, dex_data)
+        except Exception as e:
+            logger.error(f"[{self.name}] Error updating snapshot history: {e}")
+        
         # Default Flow Signal (Volume Proxy)
         buys = dex_data["txns_24h"].get("buys", 0)
         sells = dex_data["txns_24h"].get("sells", 0)
@@ -151,13 +259,9 @@ class AnalystAgent:
         whale_data = None
         tracking_type = "Volume Analysis"
         
-        # If Ethereum, try True Whale Tracking
-        if dex_data["chain_id"] == "ethereum":
-            whale_data = self._fetch_etherscan_whales(
-                dex_data["base_token_address"], 
-                dex_data["pair_address"], 
-                dex_data["price_usd"]
-            )
+        # If the token trades on Etherscan-supported chains, try True Whale Tracking on all of them
+        if dex_data["whale_pairs"]:
+            whale_data = self._fetch_multichain_whales(dex_data["whale_pairs"])
             if whale_data:
                 tracking_type = "Deep Whale Analysis"
             
@@ -199,7 +303,9 @@ class AnalystAgent:
                 "pair_url": dex_data["pair_url"],
                 "whale_data": whale_data,
                 "chain_id": dex_data["chain_id"],
+                "pair_source": dex_data["pair_source"],
                 "tracking_type": tracking_type,
-                "net_flow_usd": int(net_flow_usd) # Ensure it's sent to frontend
+                "net_flow_usd": int(net_flow_usd), # Ensure it's sent to frontend
+                "deltas": deltas
             }
         }
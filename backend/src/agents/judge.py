@@ -1,43 +1,82 @@
 import json
 from src.services.llm import LLMService
+from src.services.judge_prompt import build_judge_prompt
+from src.services.verdict_cache import verdict_cache, verdict_fingerprint, VERDICT_CACHE_ENABLED
 from src.utils.logger import get_logger
+from src.utils.metrics import instrumented
 
 logger = get_logger(__name__)
 
+
+class _UncacheableVerdict(Exception):
+    """Carries a fallback verdict out of the cache loader without caching it."""
+    def __init__(self, verdict_data: dict):
+        super().__init__("LLM verdict failed")
+        self.verdict_data = verdict_data
+
+
 class JudgeAgent:
-    def __init__(self, openai_key: str = None, gemini_key: str = None):
+    def __init__(self, openai_key: str = None, gemini_key: str = None, llm: LLMService = None):
         self.name = "The Judge"
-        self.llm = LLMService(openai_key=openai_key, gemini_key=gemini_key)
+        self.llm = llm or LLMService(openai_key=openai_key, gemini_key=gemini_key)
 
+    @instrumented("assess_risk")
     def assess_risk(self, hype_data: dict, onchain_data: dict):
         """
         Uses LLM to compare hype vs reality and issue a verdict.
+        Reuses a cached verdict when the inputs have not materially changed.
+        Verdicts on degraded inputs (a stage that ran out of time) are never cached.
         """
-        logger.info(f"[{self.name}] Assessing risk using AI...")
-        
-        # Construct Prompt
-        prompt = f"""
-        You are "The Judge", an expert crypto analyst detecting "Fake Hype" and "Rug Pulls".
-        Analyze the following data for token: {hype_data.get('token', 'Unknown')}
+        computed = []
 
-        ### Agent A (Social Hype) Data:
-        {json.dumps(hype_data, indent=2)}
+        def generate():
+            computed.append(True)
+            verdict_data = self._generate_verdict(hype_data, onchain_data)
+            if verdict_data.get("risk_level", "Unknown") == "Unknown":
+                raise _UncacheableVerdict(verdict_data)
+            return verdict_data
 
-        ### Agent B (On-Chain/Market) Data:
-        {json.dumps(onchain_data, indent=2)}
+        uncacheable = False
+        try:
+            degraded = hype_data.get("degraded") or onchain_data.get("degraded")
+            if VERDICT_CACHE_ENABLED and not degraded:
+                fingerprint = verdict_fingerprint(hype_data, onchain_data, provider=self.llm.provider)
+                verdict_data = verdict_cache.get(fingerprint, generate)
+            else:
+                verdict_data = generate()
+        except _UncacheableVerdict as e:
+            # Concurrent callers share the failed attempt, but it was never a cached verdict
+            verdict_data = e.verdict_data
+            uncacheable = True
 
-        ### Task:
-        Compare the social sentiment (Hype) against the actual on-chain metrics (Reality).
-        - If Hype is High but Liquidity/Volume is Low or Selling is High -> High Risk (Fake Hype).
-        - If Hype is High and Buying is High -> Potential Gem.
-        - If Hype is Low but Buying is High -> Accumulation (Hidden Gem).
+        reused = not computed and not uncacheable
+        if reused:
+            logger.info(f"[{self.name}] Inputs unchanged, reusing cached verdict.")
 
-        ### Output Format:
-        Return ONLY a JSON object with these keys:
-        - risk_level (Low, Medium, High, Critical)
-        - verdict (Short phrase, e.g., "Rug Pull Risk", "Organic Growth")
-        - reasoning (A concise explanation of why, max 2 sentences)
-        """
+        return {
+            "risk_level": verdict_data.get("risk_level", "Unknown"),
+            "verdict": verdict_data.get("verdict", "Unknown"),
+            "reasoning": verdict_data.get("reasoning", ""),
+            "reused": reused,
+            # Only reported when the LLM was actually called for this request
+            "prompt_stats": None if reused else verdict_data.get("prompt_stats"),
+            "input_summary": {
+                "hype_score": hype_data.get("hype_score"),
+                "smart_money_flow": onchain_data.get("net_smart_money_flow")
+            }
+        }
+
+    def _generate_verdict(self, hype_data: dict, onchain_data: dict) -> dict:
+        """Calls the LLM and parses its verdict, falling back to an AI Error verdict."""
+        logger.info(f"[{self.name}] Assessing risk using AI...")
+        
+        # Compact, token-budgeted projection of both agents' data
+        prompt, prompt_stats = build_judge_prompt(hype_data, onchain_data)
+        logger.info(
+            f"[{self.name}] Prompt ~{prompt_stats['prompt_tokens_est']} tokens "
+            f"(uncompacted ~{prompt_stats['uncompacted_tokens_est']}, "
+            f"-{prompt_stats['reduction_pct']}%, {prompt_stats['posts_included']} posts)"
+        )
 
         response_text = self.llm.generate_text(prompt)
         
@@ -54,12 +93,5 @@ class JudgeAgent:
                 "reasoning": "Failed to generate AI verdict."
             }
 
-        return {
-            "risk_level": verdict_data.get("risk_level", "Unknown"),
-            "verdict": verdict_data.get("verdict", "Unknown"),
-            "reasoning": verdict_data.get("reasoning", ""),
-            "input_summary": {
-                "hype_score": hype_data.get("hype_score"),
-                "smart_money_flow": onchain_data.get("net_smart_money_flow")
-            }
-        }
+        verdict_data["prompt_stats"] = prompt_stats
+        return verdict_data
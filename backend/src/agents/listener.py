@@ -1,21 +1,58 @@
 import os
+import math
 import random
 import time
 import praw
+import prawcore
 import requests
 from dotenv import load_dotenv
-from src.services.llm import LLMService
+from src.services.deadline import (
+    get_breaker, check_deadline, clip_timeout, note_shortfall, DeadlineExceeded
+)
+from src.services.llm import LLMService, SENTIMENT_BATCH_SIZE
+from src.services.lexicon_sentiment import lexicon_sentiment, LEXICON_MIN_CONFIDENCE
+from src.services.reddit_rss import fetch_feed, REDDIT_BASE_URL, RSS_USER_AGENT, SUBREDDITS
+from src.services.reddit_index import get_reddit_index, post_text, REDDIT_INDEX_MIN_POSTS
+from src.services.rate_limiter import rate_limiter, RateLimitExceeded
 from src.utils.logger import get_logger
+from src.utils.metrics import instrumented, upstream_span
 from src.utils.security import sanitize_error_message
 
 load_dotenv()
 logger = get_logger(__name__)
 
+# llm: every post goes to the LLM; hybrid: only low-confidence lexicon results do;
+# local: lexicon only, no LLM calls at all
+SENTIMENT_MODE = os.getenv("SENTIMENT_MODE", "hybrid").lower()
+RSS_POST_LIMIT = 10
+
+
+class DeadlineRequestor(prawcore.Requestor):
+    """
+    PRAW requestor bound by the request deadline: a request is not sent once
+    the deadline has passed, and its timeout is clipped to the time left.
+    PRAW fetches listings lazily, so every page goes through here.
+    """
+
+    def request(self, *args, timeout: float = None, **kwargs):
+        check_deadline("reddit_api request")
+        timeout, clipped = clip_timeout(timeout or self.timeout)
+        try:
+            return super().request(*args, timeout=timeout, **kwargs)
+        except prawcore.RequestException as e:
+            if clipped and isinstance(e.original_exception, requests.Timeout):
+                note_shortfall("reddit_api request")
+                raise DeadlineExceeded("Deadline exceeded during reddit_api request") from e
+            raise
+
+
 class ListenerAgent:
     def __init__(self, reddit_client_id: str = None, reddit_client_secret: str = None, 
-                 reddit_user_agent: str = None, openai_key: str = None, gemini_key: str = None):
+                 reddit_user_agent: str = None, openai_key: str = None, gemini_key: str = None,
+                 llm: LLMService = None):
         self.name = "The Listener"
-        self.llm = LLMService(openai_key=openai_key, gemini_key=gemini_key)
+        # A shared, already-warmed LLMService can be passed in to avoid rebuilding clients
+        self.llm = llm or LLMService(openai_key=openai_key, gemini_key=gemini_key)
         
         # Initialize Reddit - Priority: Passed credentials → Environment variables
         self.reddit = None
@@ -28,7 +65,8 @@ class ListenerAgent:
                 self.reddit = praw.Reddit(
                     client_id=reddit_client_id,
                     client_secret=reddit_client_secret,
-                    user_agent=reddit_user_agent
+                    user_agent=reddit_user_agent,
+                    requestor_class=DeadlineRequestor
                 )
             except Exception as e:
                 sanitized_error = sanitize_error_message(e, [reddit_client_id, reddit_client_secret])
@@ -41,69 +79,123 @@ class ListenerAgent:
         logger.info(f"[{self.name}] Fetching Reddit via RSS (Fallback Mode)...")
         
         # We'll search a combined feed of relevant subreddits
-        subreddits = "CryptoMoonShots+SatoshiStreetBets+Cryptocurrency+Solana+ethtrader+defi+altcoin+memecoin+basechain+bnb"
-        rss_url = f"https://www.reddit.com/r/{subreddits}/search.rss?q={token_symbol}&restrict_sr=1&sort=new&limit=10"
+        subreddits = "+".join(SUBREDDITS)
+        rss_url = f"{REDDIT_BASE_URL}/r/{subreddits}/search.rss?q={token_symbol}&restrict_sr=1&sort=new&limit={RSS_POST_LIMIT}"
         
         try:
             # User-Agent is required by Reddit even for RSS
-            headers = {'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'}
-            response = requests.get(rss_url, headers=headers, timeout=10)
-            
-            if response.status_code != 200:
-                logger.warning(f"[{self.name}] RSS Fetch Failed: {response.status_code}")
-                return None
-
-            # Simple XML parsing (avoiding heavy xml libraries if possible, but xml.etree is stdlib)
-            import xml.etree.ElementTree as ET
-            root = ET.fromstring(response.content)
-            
-            posts = []
-            # Reddit RSS uses Atom format usually
-            # Namespace map might be needed, but let's try simple tag search
-            # Atom namespace: {http://www.w3.org/2005/Atom}
-            
-            ns = {'atom': 'http://www.w3.org/2005/Atom'}
-            
-            for entry in root.findall('atom:entry', ns):
-                title = entry.find('atom:title', ns).text
-                link = entry.find('atom:link', ns).attrib.get('href')
-                # RSS doesn't give score easily in the standard fields, sometimes in content
-                # We'll assume a base score for visibility
-                
-                posts.append({
-                    "title": title,
-                    "url": link,
-                    "score": 10, # Placeholder as RSS doesn't guarantee score
-                    "selftext": "" # RSS content is HTML, skipping for now to keep it simple
-                })
-                
-            return posts
-
+            headers = {'User-Agent': RSS_USER_AGENT}
+            # Streams and parses only the first RSS_POST_LIMIT entries; a 304 reuses the last parse
+            return fetch_feed(rss_url, limit=RSS_POST_LIMIT, headers=headers)
         except Exception as e:
             logger.error(f"[{self.name}] Error parsing RSS: {e}")
             return None
 
-    def _fetch_reddit_sentiment(self, token_symbol: str):
-        """Fetches real posts from Reddit and analyzes sentiment using LLM."""
-        
-        posts_to_analyze = []
-        
-        # Try API first
-        if self.reddit:
-            logger.info(f"[{self.name}] Searching Reddit (API) for ${token_symbol}...")
-            subreddits = [
-                "CryptoMoonShots", "SatoshiStreetBets", "Cryptocurrency", "Solana",
-                "ethtrader", "defi", "altcoin", "memecoin", "basechain", "bnb"
-            ]
-            try:
-                subreddit_str = "+".join(subreddits)
+    def _search_reddit_api(self, token_symbol: str) -> list:
+        """
+        Searches the tracked subreddits through the Reddit API.
+
+        Bounded by the request deadline and the reddit_api circuit breaker of
+        the client ID. Only 5xx responses, timeouts and connection errors count
+        as breaker failures. Errors propagate to the caller.
+        """
+        client_id = self.reddit.config.client_id
+        breaker = get_breaker("reddit_api", rate_limiter.key_id(client_id))
+        breaker.before_call()
+        wait_clipped = False
+        posts = []
+        try:
+            check_deadline("reddit_api search")
+            max_wait, wait_clipped = clip_timeout(rate_limiter.max_wait)
+            rate_limiter.acquire("reddit_api", client_id, timeout=max_wait)
+            subreddit_str = "+".join(SUBREDDITS)
+            # PRAW fetches lazily, so the span covers the whole iteration
+            with upstream_span("reddit_api"):
                 for submission in self.reddit.subreddit(subreddit_str).search(token_symbol, limit=10, time_filter="week"):
-                    posts_to_analyze.append({
+                    posts.append({
                         "title": submission.title,
                         "url": submission.url,
                         "score": submission.score,
                         "selftext": submission.selftext
                     })
+        except (DeadlineExceeded, RateLimitExceeded) as e:
+            if isinstance(e, RateLimitExceeded) and wait_clipped:
+                note_shortfall("reddit_api rate limit")
+            breaker.record_inconclusive()
+            raise
+        except (prawcore.ServerError, prawcore.RequestException):
+            breaker.record_failure()
+            raise
+        except Exception:
+            # Auth and other 4xx errors are about the credentials, not Reddit's health
+            breaker.record_inconclusive()
+            raise
+        breaker.record_success()
+        return posts
+
+    def _score_posts(self, texts: list, mode: str = None, precomputed: list = None):
+        """
+        Scores post sentiment according to SENTIMENT_MODE.
+
+        Args:
+            precomputed: Lexicon results already stored for these texts (e.g. by the
+                mention index), used instead of scoring them again
+
+        Returns:
+            Tuple of (sentiment dicts in input order, routing stats)
+        """
+        mode = mode or SENTIMENT_MODE
+        if mode == "llm":
+            analyses = self.llm.analyze_sentiment_batch(texts)
+            escalated = list(range(len(texts)))
+        else:
+            analyses = list(precomputed) if precomputed is not None else lexicon_sentiment(texts)
+            escalated = []
+            # Without an LLM there is nothing to escalate to, so lexicon results stand
+            if mode == "hybrid" and self.llm.provider:
+                escalated = [i for i, a in enumerate(analyses) if a["confidence"] < LEXICON_MIN_CONFIDENCE]
+                if escalated:
+                    llm_analyses = self.llm.analyze_sentiment_batch([texts[i] for i in escalated])
+                    for i, analysis in zip(escalated, llm_analyses):
+                        analyses[i] = analysis
+
+        llm_requests = math.ceil(len(escalated) / SENTIMENT_BATCH_SIZE)
+        routing = {
+            "mode": mode,
+            "local": len(texts) - len(escalated),
+            "llm": len(escalated),
+            "llm_requests": llm_requests,
+            "llm_requests_saved": math.ceil(len(texts) / SENTIMENT_BATCH_SIZE) - llm_requests,
+        }
+        logger.info(f"[{self.name}] Sentiment ({mode}): {routing['local']} local, {routing['llm']} via LLM")
+        return analyses, routing
+
+    def _fetch_reddit_sentiment(self, token_symbol: str):
+        """
+        Gets recent posts about a token and analyzes their sentiment.
+        Sources in order: the local mention index, live API search, RSS search.
+        """
+        
+        posts_to_analyze = []
+        precomputed = None
+        source = None
+
+        # The ingestion worker's index answers without any upstream call
+        index = get_reddit_index()
+        if index:
+            indexed_posts = index.search(token_symbol, limit=10)
+            if len(indexed_posts) >= REDDIT_INDEX_MIN_POSTS:
+                logger.info(f"[{self.name}] Found {len(indexed_posts)} indexed posts for ${token_symbol}")
+                posts_to_analyze = indexed_posts
+                precomputed = [post["sentiment"] for post in indexed_posts]
+                source = "index"
+
+        # Then a live search through the API
+        if not posts_to_analyze and self.reddit:
+            logger.info(f"[{self.name}] Searching Reddit (API) for ${token_symbol}...")
+            try:
+                posts_to_analyze = self._search_reddit_api(token_symbol)
+                source = "api" if posts_to_analyze else None
             except Exception as e:
                 logger.error(f"[{self.name}] Reddit API Error: {e}")
         
@@ -112,6 +204,7 @@ class ListenerAgent:
             rss_posts = self._fetch_reddit_rss(token_symbol)
             if rss_posts:
                 posts_to_analyze = rss_posts
+                source = "rss"
 
         if not posts_to_analyze:
             logger.warning(f"[{self.name}] No Reddit posts found (API & RSS failed).")
@@ -126,12 +219,12 @@ class ListenerAgent:
         sentiment_scores = []
         top_posts_data = []
 
-        for post in posts_to_analyze:
+        # Score clear-cut posts locally and send the rest in a single batched LLM call
+        texts = [post_text(post) for post in posts_to_analyze]
+        analyses, routing = self._score_posts(texts, precomputed=precomputed)
+
+        for post, analysis in zip(posts_to_analyze, analyses):
             total_upvotes += post["score"]
-            
-            # Analyze sentiment
-            text_content = f"{post['title']} {post.get('selftext', '')[:200]}"
-            analysis = self.llm.analyze_sentiment(text_content)
             sentiment_scores.append(analysis.get("sentiment_score", 0.5))
             
             top_posts_data.append({
@@ -147,9 +240,12 @@ class ListenerAgent:
             "posts": len(posts_to_analyze),
             "upvotes": total_upvotes,
             "sentiment_score": avg_sentiment,
-            "top_posts": top_posts_data
+            "top_posts": top_posts_data,
+            "sentiment_routing": routing,
+            "post_source": source
         }
 
+    @instrumented("analyze_sentiment")
     def analyze_sentiment(self, token_symbol: str):
         """
         Aggregates sentiment from social sources (Reddit) and calculates a hype score.
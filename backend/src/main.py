@@ -1,19 +1,115 @@
-from fastapi import FastAPI, Header, HTTPException
+from fastapi import FastAPI, Header, HTTPException, Depends, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse, PlainTextResponse
+from pydantic import BaseModel, Field
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
 from datetime import datetime
 from src.agents.listener import ListenerAgent
 from src.agents.analyst import AnalystAgent
 from src.agents.judge import JudgeAgent
+from src.services.llm import LLMService
+from src.services.client_registry import client_registry
+from src.services.orchestrator import run_analysis, run_batch_analysis, stream_analysis, dedupe_tokens
+from src.services.market_cache import dexscreener_search_cache, dexscreener_pair_cache
+from src.services.sentiment_cache import get_sentiment_cache
+from src.services.http_client import connection_stats
+from src.services.watchlist import create_watchlist_from_env
+from src.services.verdict_cache import verdict_cache
+from src.services.rate_limiter import rate_limiter
+from src.services.deadline import breaker_stats
+from src.services.reddit_rss import feed_cache
+from src.services.reddit_index import create_reddit_ingestor_from_env
+from src.services.symbol_index import symbol_index, create_symbol_warmer_from_env
 from src.utils.security import sanitize_error_message
-from src.utils.logger import get_logger
-from typing import Optional
+from src.utils.logger import get_logger, request_id_var, logging_stats
+from src.utils.metrics import render_prometheus
+from typing import List, Optional
+import asyncio
+import json
 import os
+import re
+import time
+import uuid
 
 logger = get_logger(__name__)
 
+# Agents run in worker threads; size the pool so batch concurrency is not capped by CPU count
+AGENT_THREAD_POOL_SIZE = int(os.getenv("AGENT_THREAD_POOL_SIZE", "64"))
+BATCH_MAX_TOKENS = int(os.getenv("BATCH_MAX_TOKENS", "200"))
+BATCH_DEFAULT_CONCURRENCY = int(os.getenv("BATCH_DEFAULT_CONCURRENCY", "8"))
+BATCH_MAX_CONCURRENCY = int(os.getenv("BATCH_MAX_CONCURRENCY", "32"))
+# Watchlist snapshots older than this (seconds) are ignored and the token is analyzed live
+WATCHLIST_MAX_STALENESS = float(os.getenv("WATCHLIST_MAX_STALENESS", "900"))
+# Default time budget for one token's analysis (ms); X-Deadline-Ms overrides it, 0 disables it
+ANALYZE_DEADLINE_MS = int(os.getenv("ANALYZE_DEADLINE_MS", "25000"))
+# Client-supplied request IDs are only trusted if they look like an ID (no log injection)
+REQUEST_ID_PATTERN = re.compile(r"^[A-Za-z0-9._:-]{1,64}$")
+
+@dataclass
+class ApiCredentials:
+    """Optional BYO API keys supplied per request; None means use environment variables"""
+    openai_key: Optional[str] = None
+    gemini_key: Optional[str] = None
+    etherscan_key: Optional[str] = None
+    reddit_client_id: Optional[str] = None
+    reddit_client_secret: Optional[str] = None
+    reddit_user_agent: Optional[str] = None
+
+    def sensitive_values(self) -> list:
+        """Values to redact from logs and error messages (None values filtered out)"""
+        return [
+            v for v in [self.openai_key, self.gemini_key, self.etherscan_key,
+                        self.reddit_client_id, self.reddit_client_secret]
+            if v is not None
+        ]
+
+    def is_request_scoped(self) -> bool:
+        """True if the caller supplied any of its own keys"""
+        return any(v is not None for v in (
+            self.openai_key, self.gemini_key, self.etherscan_key,
+            self.reddit_client_id, self.reddit_client_secret, self.reddit_user_agent
+        ))
+
+class BatchAnalyzeRequest(BaseModel):
+    tokens: List[str] = Field(..., min_length=1, max_length=BATCH_MAX_TOKENS)
+    concurrency: Optional[int] = Field(None, ge=1, le=BATCH_MAX_CONCURRENCY)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    executor = ThreadPoolExecutor(max_workers=AGENT_THREAD_POOL_SIZE, thread_name_prefix="agent")
+    asyncio.get_running_loop().set_default_executor(executor)
+
+    # Precompute verdicts for tracked tokens using the environment keys
+    app.state.watchlist = create_watchlist_from_env(lambda: build_agents(ApiCredentials()))
+    if app.state.watchlist:
+        await app.state.watchlist.start()
+
+    # Follow the tracked subreddits into the local mention index (REDDIT_INGEST_ENABLED=1)
+    app.state.reddit_ingestor = create_reddit_ingestor_from_env(lambda: build_agents(ApiCredentials())[0].reddit)
+    if app.state.reddit_ingestor:
+        await app.state.reddit_ingestor.start()
+
+    # Keep the most requested token symbols resolved to their DEX pairs
+    app.state.symbol_warmer = create_symbol_warmer_from_env(lambda: build_agents(ApiCredentials())[1])
+    if app.state.symbol_warmer:
+        await app.state.symbol_warmer.start()
+
+    yield
+
+    if app.state.symbol_warmer:
+        await app.state.symbol_warmer.stop()
+    if app.state.reddit_ingestor:
+        await app.state.reddit_ingestor.stop()
+    if app.state.watchlist:
+        await app.state.watchlist.stop()
+    executor.shutdown(wait=False, cancel_futures=True)
+
 app = FastAPI(
     title="AlphaDivergence API",
-    root_path=os.getenv("ROOT_PATH", "")  # Support for running behind proxy
+    root_path=os.getenv("ROOT_PATH", ""),  # Support for running behind proxy
+    lifespan=lifespan
 )
 
 # Enable CORS for frontend
@@ -25,6 +121,20 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.middleware("http")
+async def request_id_middleware(request: Request, call_next):
+    """Tags every log line of a request with X-Request-ID (generated if absent)."""
+    request_id = request.headers.get("X-Request-ID", "")
+    if not REQUEST_ID_PATTERN.match(request_id):
+        request_id = uuid.uuid4().hex
+    token = request_id_var.set(request_id)
+    try:
+        response = await call_next(request)
+    finally:
+        request_id_var.reset(token)
+    response.headers["X-Request-ID"] = request_id
+    return response
+
 @app.get("/")
 def read_root():
     return {"message": "AlphaDivergence Backend is running"}
@@ -38,36 +148,74 @@ async def health_check():
         "timestamp": datetime.now().isoformat()
     }
 
-@app.get("/analyze/{token}")
-def analyze_token(
-    token: str,
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    """Stage and upstream latency histograms, error counters and LLM token counts (Prometheus format)"""
+    return PlainTextResponse(render_prometheus(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+@app.get("/stats")
+def cache_stats(request: Request):
+    """Hit/miss and coalescing counters for the backend caches and HTTP pools"""
+    sentiment_cache = get_sentiment_cache()
+    reddit_ingestor = getattr(request.app.state, "reddit_ingestor", None)
+    symbol_warmer = getattr(request.app.state, "symbol_warmer", None)
+    return {
+        "dexscreener_cache": dexscreener_search_cache.stats(),
+        "dexscreener_pair_cache": dexscreener_pair_cache.stats(),
+        "symbol_index": symbol_warmer.stats() if symbol_warmer else symbol_index.stats(),
+        "sentiment_cache": sentiment_cache.stats() if sentiment_cache else None,
+        "http_connections": connection_stats(),
+        "client_registry": client_registry.stats(),
+        "verdict_cache": verdict_cache.stats(),
+        "logging": logging_stats(),
+        "rate_limiter": rate_limiter.stats(),
+        "circuit_breakers": breaker_stats(),
+        "reddit_rss": feed_cache.stats(),
+        "reddit_index": reddit_ingestor.stats() if reddit_ingestor else None
+    }
+
+def get_credentials(
     x_openai_key: Optional[str] = Header(None, alias="X-OpenAI-Key"),
     x_gemini_key: Optional[str] = Header(None, alias="X-Gemini-Key"),
     x_etherscan_key: Optional[str] = Header(None, alias="X-Etherscan-Key"),
     x_reddit_client_id: Optional[str] = Header(None, alias="X-Reddit-Client-Id"),
     x_reddit_client_secret: Optional[str] = Header(None, alias="X-Reddit-Client-Secret"),
     x_reddit_user_agent: Optional[str] = Header(None, alias="X-Reddit-User-Agent")
-):
+) -> ApiCredentials:
+    """Collects optional BYO API keys from request headers"""
+    return ApiCredentials(
+        openai_key=x_openai_key,
+        gemini_key=x_gemini_key,
+        etherscan_key=x_etherscan_key,
+        reddit_client_id=x_reddit_client_id,
+        reddit_client_secret=x_reddit_client_secret,
+        reddit_user_agent=x_reddit_user_agent
+    )
+
+def build_agents(credentials: ApiCredentials):
     """
-    Orchestrates the agents to analyze a token.
-    Accepts API keys via headers (X-OpenAI-Key, X-Gemini-Key, etc.) or falls back to environment variables.
+    Returns (listener, analyst, judge) for the given credentials.
+    Agents and their LLM/Reddit clients are reused across requests via the client registry.
+    Wrapped in try-catch to prevent API key leakage in error messages.
     """
-    # Collect sensitive values for potential sanitization (filter out None values)
-    sensitive_values = [
-        v for v in [x_openai_key, x_gemini_key, x_etherscan_key,
-                    x_reddit_client_id, x_reddit_client_secret]
-        if v is not None
-    ]
-    
-    # Initialize Agents with optional API keys from headers
-    # Wrap in try-catch to prevent API key leakage in error messages
+    sensitive_values = credentials.sensitive_values()
+    llm_credentials = (credentials.openai_key, credentials.gemini_key)
+
     try:
-        listener = ListenerAgent(
-            reddit_client_id=x_reddit_client_id,
-            reddit_client_secret=x_reddit_client_secret,
-            reddit_user_agent=x_reddit_user_agent,
-            openai_key=x_openai_key,
-            gemini_key=x_gemini_key
+        llm = client_registry.get_or_create(
+            "llm", llm_credentials,
+            lambda: LLMService(openai_key=credentials.openai_key, gemini_key=credentials.gemini_key)
+        )
+        listener = client_registry.get_or_create(
+            "listener",
+            (credentials.reddit_client_id, credentials.reddit_client_secret,
+             credentials.reddit_user_agent) + llm_credentials,
+            lambda: ListenerAgent(
+                reddit_client_id=credentials.reddit_client_id,
+                reddit_client_secret=credentials.reddit_client_secret,
+                reddit_user_agent=credentials.reddit_user_agent,
+                llm=llm
+            )
         )
     except Exception as e:
         sanitized_error = sanitize_error_message(e, sensitive_values)
@@ -75,31 +223,164 @@ def analyze_token(
         raise HTTPException(status_code=500, detail="Failed to initialize Listener agent")
     
     try:
-        analyst = AnalystAgent(etherscan_api_key=x_etherscan_key)
+        analyst = client_registry.get_or_create(
+            "analyst", (credentials.etherscan_key,),
+            lambda: AnalystAgent(etherscan_api_key=credentials.etherscan_key)
+        )
     except Exception as e:
         sanitized_error = sanitize_error_message(e, sensitive_values)
         logger.error(f"Failed to initialize AnalystAgent: {sanitized_error}")
         raise HTTPException(status_code=500, detail="Failed to initialize Analyst agent")
     
     try:
-        judge = JudgeAgent(openai_key=x_openai_key, gemini_key=x_gemini_key)
+        judge = client_registry.get_or_create(
+            "judge", llm_credentials,
+            lambda: JudgeAgent(llm=llm)
+        )
     except Exception as e:
         sanitized_error = sanitize_error_message(e, sensitive_values)
         logger.error(f"Failed to initialize JudgeAgent: {sanitized_error}")
         raise HTTPException(status_code=500, detail="Failed to initialize Judge agent")
+
+    return listener, analyst, judge
+
+@app.get("/analyze/{token}")
+async def analyze_token(
+    token: str,
+    request: Request,
+    fresh: bool = False,
+    x_deadline_ms: Optional[int] = Header(None, alias="X-Deadline-Ms", gt=0),
+    credentials: ApiCredentials = Depends(get_credentials)
+):
+    """
+    Orchestrates the agents to analyze a token.
+    Accepts API keys via headers (X-OpenAI-Key, X-Gemini-Key, etc.) or falls back to environment variables.
+    Watchlist tokens are answered from their precomputed snapshot unless ?fresh=true
+    or the request brings its own keys (the snapshot was computed with the server's).
+    X-Deadline-Ms bounds the response time; stages that miss it are listed in missing_stages.
+    """
+    request_start = time.perf_counter()
+    watchlist = getattr(request.app.state, "watchlist", None)
+    if watchlist and not fresh and not credentials.is_request_scoped():
+        snapshot = watchlist.get_snapshot(token, max_staleness=WATCHLIST_MAX_STALENESS)
+        if snapshot:
+            return {
+                "token": token,
+                "hype_analysis": snapshot["hype_analysis"],
+                "onchain_analysis": snapshot["onchain_analysis"],
+                "final_verdict": snapshot["final_verdict"],
+                "source": "watchlist",
+                "staleness_s": snapshot["staleness_s"],
+                "partial": False,
+                "missing_stages": [],
+                "timings": {"total_ms": round((time.perf_counter() - request_start) * 1000, 1)}
+            }
+
+    # Warm clients come from the registry; a cold build shows up in setup_ms
+    setup_start = time.perf_counter()
+    listener, analyst, judge = await asyncio.to_thread(build_agents, credentials)
+    setup_ms = (time.perf_counter() - setup_start) * 1000
     
-    # 1. Listener Agent
-    hype_data = listener.analyze_sentiment(token)
+    # The budget covers the whole request, so time spent on setup is deducted
+    deadline_ms = x_deadline_ms or ANALYZE_DEADLINE_MS or None
+    if deadline_ms:
+        deadline_ms -= (time.perf_counter() - request_start) * 1000
+
+    # 1 & 2. Listener and Analyst run concurrently, 3. Judge waits on both
+    result = await run_analysis(listener, analyst, judge, token, deadline_ms=deadline_ms)
     
-    # 2. Analyst Agent
-    onchain_data = analyst.analyze_onchain_data(token)
+    return {
+        "token": token,
+        "hype_analysis": result["hype_data"],
+        "onchain_analysis": result["onchain_data"],
+        "final_verdict": result["verdict"],
+        "source": "live",
+        "partial": result["partial"],
+        "missing_stages": result["missing_stages"],
+        "timings": {"setup_ms": round(setup_ms, 1), **result["timings"]}
+    }
+
+@app.get("/analyze/{token}/stream")
+async def analyze_token_stream(
+    token: str,
+    x_deadline_ms: Optional[int] = Header(None, alias="X-Deadline-Ms", gt=0),
+    credentials: ApiCredentials = Depends(get_credentials)
+):
+    """
+    Streaming variant of /analyze/{token} (NDJSON, one event per line).
+    Emits onchain_analysis and hype_analysis as soon as each agent finishes,
+    then final_verdict, then a closing done event with stage timings.
+    Shares the /analyze deadline: stages that miss it are sent with "timed_out": true
+    and listed in the done event's missing_stages.
+    """
+    setup_start = time.perf_counter()
+    listener, analyst, judge = await asyncio.to_thread(build_agents, credentials)
+    setup_ms = (time.perf_counter() - setup_start) * 1000
+    sensitive_values = credentials.sensitive_values()
+
+    # The budget covers the whole request, so time spent on setup is deducted
+    deadline_ms = x_deadline_ms or ANALYZE_DEADLINE_MS or None
+    if deadline_ms:
+        deadline_ms -= setup_ms
+
+    async def event_lines():
+        try:
+            async for event in stream_analysis(listener, analyst, judge, token, deadline_ms=deadline_ms):
+                if event["event"] == "done":
+                    event["timings"] = {"setup_ms": round(setup_ms, 1), **event["timings"]}
+                yield json.dumps({"token": token, **event}) + "\n"
+        except Exception as e:
+            sanitized_error = sanitize_error_message(e, sensitive_values)
+            logger.error(f"Streaming analysis failed for {token}: {sanitized_error}")
+            yield json.dumps({"token": token, "event": "error", "error": sanitized_error}) + "\n"
+
+    return StreamingResponse(
+        event_lines(),
+        media_type="application/x-ndjson",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.post("/analyze/batch")
+async def analyze_batch(request: BatchAnalyzeRequest, credentials: ApiCredentials = Depends(get_credentials)):
+    """
+    Analyzes many tokens in one request with bounded concurrency.
+    Duplicate symbols are analyzed once; each token gets either a result or an error.
+    """
+    tokens = dedupe_tokens(request.tokens)
+    if not tokens:
+        raise HTTPException(status_code=422, detail="No valid tokens supplied")
+    concurrency = request.concurrency or BATCH_DEFAULT_CONCURRENCY
+    
+    start = time.perf_counter()
+    listener, analyst, judge = await asyncio.to_thread(build_agents, credentials)
+    outcomes = await run_batch_analysis(listener, analyst, judge, tokens, concurrency,
+                                        deadline_ms=ANALYZE_DEADLINE_MS or None)
+    total_ms = (time.perf_counter() - start) * 1000
     
-    # 3. Judge Agent
-    verdict = judge.assess_risk(hype_data, onchain_data)
+    sensitive_values = credentials.sensitive_values()
+    results = []
+    for token, outcome in outcomes.items():
+        if isinstance(outcome, Exception):
+            sanitized_error = sanitize_error_message(outcome, sensitive_values)
+            logger.error(f"Batch analysis failed for {token}: {sanitized_error}")
+            results.append({"token": token, "error": sanitized_error})
+        else:
+            results.append({
+                "token": token,
+                "hype_analysis": outcome["hype_data"],
+                "onchain_analysis": outcome["onchain_data"],
+                "final_verdict": outcome["verdict"],
+                "partial": outcome["partial"],
+                "missing_stages": outcome["missing_stages"],
+                "timings": outcome["timings"]
+            })
     
+    failed = sum(1 for r in results if "error" in r)
     return {
-        "token": token,
-        "hype_analysis": hype_data,
-        "onchain_analysis": onchain_data,
-        "final_verdict": verdict
+        "count": len(results),
+        "succeeded": len(results) - failed,
+        "failed": failed,
+        "concurrency": concurrency,
+        "results": results,
+        "timings": {"total_ms": round(total_ms, 1)}
     }
@@ -0,0 +1,27 @@
+"""
+Chain registry mapping DexScreener chain IDs to Etherscan V2 chain IDs.
+"""
+
+# DexScreener `chainId` -> Etherscan V2 `chainid`
+ETHERSCAN_CHAIN_IDS = {
+    "ethereum": 1,
+    "bsc": 56,
+    "polygon": 137,
+    "base": 8453,
+    "arbitrum": 42161,
+    "optimism": 10,
+    "avalanche": 43114,
+    "linea": 59144,
+    "blast": 81457,
+    "scroll": 534352,
+    "mantle": 5000,
+    "zksync": 324,
+    "celo": 42220,
+    "gnosis": 100,
+    "sonic": 146,
+}
+
+
+def etherscan_chain_id(dex_chain_id: str):
+    """Returns the Etherscan V2 chain ID for a DexScreener chain, or None if unsupported."""
+    return ETHERSCAN_CHAIN_IDS.get((dex_chain_id or "").lower())
@@ -0,0 +1,114 @@
+"""
+Registry of warmed agent and LLM clients, reused across requests.
+
+Entries are keyed by a SHA-256 fingerprint of the credentials they were built
+with, so raw keys are never stored as keys, logged or exposed. The registry is
+bounded in size and drops entries that have been idle for too long.
+"""
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from src.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class ClientRegistry:
+    def __init__(self, max_entries: int = 64, idle_ttl_seconds: float = 900, clock=time.monotonic):
+        """
+        Args:
+            max_entries: Most clients held; the least recently used is dropped first
+            idle_ttl_seconds: Clients unused for this long are dropped
+            clock: Monotonic time source in seconds
+        """
+        self.max_entries = max_entries
+        self.idle_ttl_seconds = idle_ttl_seconds
+        self.clock = clock
+        self._entries = OrderedDict()  # (kind, fingerprint) -> [client, last_used]
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def fingerprint(*credentials) -> str:
+        """Hashes a credential tuple; None and empty values hash identically."""
+        digest = hashlib.sha256()
+        for value in credentials:
+            digest.update((value or "").encode("utf-8"))
+            digest.update(b"\x00")
+        return digest.hexdigest()
+
+    def get_or_create(self, kind: str, credentials: tuple, factory):
+        """
+        Returns the cached client for (kind, credentials), building it on first use.
+
+        Args:
+            kind: Client type, e.g. "listener" or "llm"
+            credentials: Tuple of credential values the client depends on
+            factory: Zero-argument callable that builds the client
+
+        Returns:
+            The warmed or newly built client
+        """
+        key = (kind, self.fingerprint(*credentials))
+        now = self.clock()
+
+        with self._lock:
+            self._evict_idle_locked(now)
+            entry = self._entries.get(key)
+            if entry is not None:
+                entry[1] = now
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+
+        # Build outside the lock so a slow constructor does not block other keys
+        client = factory()
+        logger.info(f"[ClientRegistry] Built {kind} client ({key[1][:8]})")
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                # Another request built the same client concurrently, keep the first one
+                return entry[0]
+            self._entries[key] = [client, now]
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return client
+
+    def _evict_idle_locked(self, now: float):
+        expired = [key for key, (_, last_used) in self._entries.items()
+                   if now - last_used > self.idle_ttl_seconds]
+        for key in expired:
+            del self._entries[key]
+        self.evictions += len(expired)
+
+    def clear(self):
+        """Drops every cached client."""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        """Returns hit/miss counters and entry counts per kind (no credentials)."""
+        with self._lock:
+            kinds = {}
+            for kind, _ in self._entries:
+                kinds[kind] = kinds.get(kind, 0) + 1
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "entries_by_kind": kinds,
+            }
+
+
+client_registry = ClientRegistry(
+    max_entries=int(os.getenv("CLIENT_REGISTRY_MAX_ENTRIES", "64")),
+    idle_ttl_seconds=float(os.getenv("CLIENT_REGISTRY_IDLE_TTL", "900")),
+)
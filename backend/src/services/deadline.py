@@ -0,0 +1,216 @@
+"""
+Request deadlines and per-upstream circuit breakers.
+
+A deadline is an absolute time.monotonic() value held in a contextvar. It
+follows the request into worker threads: asyncio.to_thread and the Analyst's
+whale executor both copy the context. Upstream calls clip their timeouts to the
+time left and fail fast once it is gone. Each call the deadline skips or cuts
+short is noted as a shortfall, so a stage whose agent degraded gracefully
+(an empty post list, a fallback verdict) is still known to be incomplete.
+
+A circuit breaker per upstream (and per API key, where calls carry one) opens
+after CIRCUIT_FAILURE_THRESHOLD consecutive failures. Calls then fail
+immediately for CIRCUIT_RESET_SECONDS, after which a single trial call decides
+whether it closes again.
+"""
+import contextvars
+import os
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from src.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+CIRCUIT_FAILURE_THRESHOLD = int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", "5"))
+CIRCUIT_RESET_SECONDS = float(os.getenv("CIRCUIT_RESET_SECONDS", "30"))
+# Keyed breakers come and go with BYO keys; the least recently used are dropped past this many
+CIRCUIT_MAX_BREAKERS = int(os.getenv("CIRCUIT_MAX_BREAKERS", "1024"))
+
+_deadline = contextvars.ContextVar("deadline", default=None)
+# List collecting shortfalls for the enclosing stage, shared with the threads it starts
+_shortfalls = contextvars.ContextVar("deadline_shortfalls", default=None)
+
+
+class DeadlineExceeded(TimeoutError):
+    """Raised when the request's time budget is spent before an upstream call."""
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling an upstream whose circuit breaker is open."""
+
+
+@contextmanager
+def deadline_scope(deadline: float, shortfalls: list = None):
+    """
+    Sets an absolute monotonic deadline for the enclosed code (None clears it).
+
+    Args:
+        shortfalls: Optional list that collects a note for every call the deadline skips or cuts short
+    """
+    token = _deadline.set(deadline)
+    shortfalls_token = _shortfalls.set(shortfalls) if shortfalls is not None else None
+    try:
+        yield
+    finally:
+        if shortfalls_token is not None:
+            _shortfalls.reset(shortfalls_token)
+        _deadline.reset(token)
+
+
+def run_with_deadline(deadline: float, func, *args, shortfalls: list = None):
+    """Calls func(*args) under a deadline; used as the target of worker threads."""
+    with deadline_scope(deadline, shortfalls):
+        return func(*args)
+
+
+def note_shortfall(what: str):
+    """Records that the deadline skipped or cut short a call, making the current stage incomplete."""
+    shortfalls = _shortfalls.get()
+    if shortfalls is not None:
+        shortfalls.append(what)
+
+
+def remaining() -> float:
+    """Seconds left before the current deadline, or None when there is none."""
+    deadline = _deadline.get()
+    return None if deadline is None else deadline - time.monotonic()
+
+
+def check_deadline(what: str = "call"):
+    """Raises DeadlineExceeded if the current deadline has passed."""
+    left = remaining()
+    if left is not None and left <= 0:
+        note_shortfall(what)
+        raise DeadlineExceeded(f"Deadline exceeded before {what}")
+
+
+def clip_timeout(timeout):
+    """
+    Clips a requests-style timeout (float or (connect, read) tuple) to the time left.
+
+    Returns:
+        Tuple of (timeout, clipped) where clipped is True if the deadline shortened it
+    """
+    left = remaining()
+    if left is None:
+        return timeout, False
+    left = max(left, 0.001)
+    if isinstance(timeout, tuple):
+        clipped = tuple(min(t, left) for t in timeout)
+    else:
+        clipped = min(timeout, left)
+    return clipped, clipped != timeout
+
+
+class CircuitBreaker:
+    def __init__(self, name: str, failure_threshold: int = CIRCUIT_FAILURE_THRESHOLD,
+                 reset_seconds: float = CIRCUIT_RESET_SECONDS, clock=time.monotonic):
+        """
+        Args:
+            name: Upstream (and key) the breaker guards, used in logs and errors
+            failure_threshold: Consecutive failures that open the circuit
+            reset_seconds: Seconds an open circuit waits before letting a trial call through
+            clock: Monotonic time source in seconds
+        """
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at = None
+        self._trial_in_flight = False
+        self.rejected = 0
+        self.times_opened = 0
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._state_locked(self.clock())
+
+    def _state_locked(self, now: float) -> str:
+        if self._opened_at is None:
+            return "closed"
+        if now - self._opened_at >= self.reset_seconds:
+            return "half_open"
+        return "open"
+
+    def before_call(self):
+        """Raises CircuitOpenError if the upstream should not be called right now."""
+        with self._lock:
+            state = self._state_locked(self.clock())
+            if state == "closed":
+                return
+            # Half-open lets exactly one trial call through
+            if state == "half_open" and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return
+            self.rejected += 1
+        raise CircuitOpenError(f"Circuit open for {self.name}")
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            reopen = self._trial_in_flight
+            self._trial_in_flight = False
+            if reopen or (self._opened_at is None and self._failures >= self.failure_threshold):
+                self._opened_at = self.clock()
+                self.times_opened += 1
+                opened = True
+            else:
+                opened = False
+        if opened:
+            logger.warning(f"[CircuitBreaker] {self.name} opened after {self._failures} consecutive failures")
+
+    def record_inconclusive(self):
+        """Ends a call that says nothing about upstream health (e.g. cut short by our own deadline)."""
+        with self._lock:
+            self._trial_in_flight = False
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "state": self._state_locked(self.clock()),
+                "consecutive_failures": self._failures,
+                "times_opened": self.times_opened,
+                "rejected": self.rejected,
+            }
+
+
+_breakers = OrderedDict()
+_breakers_lock = threading.Lock()
+
+
+def get_breaker(upstream: str, key: str = None) -> CircuitBreaker:
+    """
+    Returns the process-wide circuit breaker for an upstream, or for one API key on it.
+
+    Args:
+        upstream: Upstream name (e.g. "openai")
+        key: Hashed API key (RateLimiter.key_id), so failures caused by one
+            caller's key never open the circuit for everyone else
+    """
+    name = upstream if key is None else f"{upstream}:{key}"
+    with _breakers_lock:
+        breaker = _breakers.get(name)
+        if breaker is None:
+            breaker = _breakers[name] = CircuitBreaker(name)
+            while len(_breakers) > CIRCUIT_MAX_BREAKERS:
+                _breakers.popitem(last=False)
+        else:
+            _breakers.move_to_end(name)
+        return breaker
+
+
+def breaker_stats() -> dict:
+    with _breakers_lock:
+        breakers = dict(_breakers)
+    return {name: breaker.stats() for name, breaker in breakers.items()}
@@ -0,0 +1,213 @@
+"""
+Incremental, paginated ingestion of Etherscan token transfers.
+
+The first sync for a contract backfills newest-first until the analysis window
+is covered. Backfill progress is stored after every page, so a failed page or
+the page limit makes the next sync resume below the oldest block fetched; the
+cursor is only stored once the backfill completes. Later syncs only request
+blocks from the stored cursor onwards, so whale stats cover a real time window
+without re-downloading known rows. A cursor last synced before the window
+started (the process was down, or paging fell behind) is dropped and the
+window is backfilled again, since paging forward from it may never reach it.
+"""
+import os
+import threading
+import time
+from src.services.http_client import http_get
+from src.services.transfer_store import TransferStore
+from src.services.whale_analysis import TransferBatch
+from src.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+ETHERSCAN_API_URL = os.getenv("ETHERSCAN_API_URL", "https://api.etherscan.io/v2/api")
+
+
+class EtherscanError(Exception):
+    """Raised when Etherscan returns an error status."""
+
+
+class EtherscanIngestor:
+    def __init__(self, api_key: str, store: TransferStore, window_seconds: int = 24 * 3600,
+                 page_size: int = 1000, max_pages: int = 10, retention_seconds: int = 7 * 24 * 3600,
+                 prune_interval_seconds: int = 3600):
+        self.api_key = api_key
+        self.store = store
+        self.window_seconds = window_seconds
+        self.page_size = page_size
+        # Etherscan rejects page * offset > 10000
+        self.max_pages = min(max_pages, 10000 // page_size)
+        self.retention_seconds = retention_seconds
+        # Pruning scans the whole table, so it runs at most this often rather than on every sync
+        self.prune_interval_seconds = prune_interval_seconds
+        self._last_prune = None
+        self._prune_lock = threading.Lock()
+        self._locks = {}
+        self._locks_guard = threading.Lock()
+
+    def _lock_for(self, chain_id: int, contract: str) -> threading.Lock:
+        with self._locks_guard:
+            return self._locks.setdefault((chain_id, contract.lower()), threading.Lock())
+
+    def _fetch_page(self, chain_id: int, contract: str, page: int, sort: str, start_block: int = 0,
+                    end_block: int = 99999999) -> list:
+        params = {
+            "chainid": chain_id,
+            "module": "account",
+            "action": "tokentx",
+            "contractaddress": contract,
+            "startblock": start_block,
+            "endblock": end_block,
+            "page": page,
+            "offset": self.page_size,
+            "sort": sort,
+            "apikey": self.api_key
+        }
+        data = http_get(ETHERSCAN_API_URL, upstream="etherscan", params=params, rate_key=self.api_key).json()
+
+        if data.get("status") != "1":
+            # An empty result is reported as status 0 with this message
+            if data.get("message") == "No transactions found":
+                return []
+            raise EtherscanError(f"{data.get('message')} - {data.get('result')}")
+        return data["result"]
+
+    def sync(self, contract: str, chain_id: int = 1) -> int:
+        """
+        Fetches transfers newer than the stored cursor for a contract, or
+        backfills the window when there is no usable cursor.
+
+        Returns:
+            Number of new transfers stored
+        """
+        with self._lock_for(chain_id, contract):
+            window_start = int(time.time()) - self.window_seconds
+            cursor = self.store.get_cursor_state(chain_id, contract)
+            backfill = self.store.get_backfill(chain_id, contract)
+
+            if backfill is not None and backfill[2] < window_start:
+                # Resuming would leave a gap above its top block wider than the window
+                backfill = None
+            if backfill is None and cursor is not None and (cursor[1] is None or cursor[1] < window_start):
+                logger.info(f"[EtherscanIngestor] Cursor for {contract} on chain {chain_id} predates the window, "
+                            f"backfilling again")
+                cursor = None
+
+            if backfill is not None or cursor is None:
+                inserted, pages = self._backfill(chain_id, contract, window_start, backfill)
+            else:
+                inserted, pages = self._catch_up(chain_id, contract, cursor[0])
+
+        self._maybe_prune()
+
+        logger.info(f"[EtherscanIngestor] Synced {contract} on chain {chain_id}: "
+                    f"{inserted} new transfers in {pages} page(s)")
+        return inserted
+
+    def _backfill(self, chain_id: int, contract: str, window_start: int, progress=None):
+        """
+        Walks back from the newest transfer, or from where an interrupted
+        backfill stopped, until the window is covered.
+
+        Returns:
+            Tuple of (new transfers stored, pages fetched)
+        """
+        if progress is not None:
+            top_block, end_block, started_ts = progress
+        else:
+            top_block, end_block, started_ts = None, 99999999, int(time.time())
+        inserted = 0
+        pages = 0
+
+        for page in range(1, self.max_pages + 1):
+            # Resume at the lowest block reached; duplicates are ignored on insert
+            rows = self._fetch_page(chain_id, contract, page, sort="desc", end_block=end_block)
+            pages += 1
+            if not rows:
+                break
+
+            blocks = [int(tx["blockNumber"]) for tx in rows]
+            if top_block is None:
+                top_block = max(blocks)
+            inserted += self.store.add_transfers(chain_id, contract, rows)
+
+            if len(rows) < self.page_size:
+                break
+            if min(int(tx["timeStamp"]) for tx in rows) < window_start:
+                break
+            self.store.save_backfill(chain_id, contract, top_block, min(blocks), started_ts)
+        else:
+            logger.warning(f"[EtherscanIngestor] Hit the {self.max_pages}-page limit backfilling {contract} "
+                           f"on chain {chain_id}, resuming on the next sync")
+            return inserted, pages
+
+        # A contract without transfers gets a cursor at block 0, so later syncs page forward
+        self.store.set_cursor(chain_id, contract, top_block or 0, started_ts)
+        return inserted, pages
+
+    def _catch_up(self, chain_id: int, contract: str, cursor_block: int):
+        """
+        Pages forward from the cursor block, advancing the cursor with every page.
+
+        Returns:
+            Tuple of (new transfers stored, pages fetched)
+        """
+        started_ts = int(time.time())
+        max_block = cursor_block
+        inserted = 0
+        pages = 0
+
+        for page in range(1, self.max_pages + 1):
+            # Restart at the cursor block itself; duplicates are ignored on insert
+            rows = self._fetch_page(chain_id, contract, page, sort="asc", start_block=cursor_block)
+            pages += 1
+            if not rows:
+                self.store.set_cursor(chain_id, contract, max_block, started_ts)
+                break
+
+            max_block = max(max_block, max(int(tx["blockNumber"]) for tx in rows))
+            caught_up = len(rows) < self.page_size
+            # Until the last page, the store is only complete up to the newest transfer seen
+            synced_ts = started_ts if caught_up else max(int(tx["timeStamp"]) for tx in rows)
+            inserted += self.store.add_transfers(
+                chain_id, contract, rows, last_block=max_block, synced_ts=synced_ts
+            )
+            if caught_up:
+                break
+        else:
+            logger.warning(f"[EtherscanIngestor] Hit the {self.max_pages}-page limit for {contract} on chain {chain_id}")
+
+        return inserted, pages
+
+    def window_covered(self, contract: str, chain_id: int = 1) -> bool:
+        """True when stored transfers are complete from the start of the window onwards."""
+        cursor = self.store.get_cursor_state(chain_id, contract)
+        return (cursor is not None and cursor[1] is not None
+                and cursor[1] >= int(time.time()) - self.window_seconds)
+
+    def _maybe_prune(self):
+        """Drops transfers past the retention period, at most once per prune interval."""
+        with self._prune_lock:
+            now = time.monotonic()
+            if self._last_prune is not None and now - self._last_prune < self.prune_interval_seconds:
+                return
+            self._last_prune = now
+        removed = self.store.prune(int(time.time()) - self.retention_seconds)
+        if removed:
+            logger.info(f"[EtherscanIngestor] Pruned {removed} transfers older than the retention period")
+
+    def pool_batch_in_window(self, contract: str, pair_address: str, chain_id: int = 1) -> TransferBatch:
+        """Returns the pool's buys/sells inside the analysis window, in columnar form."""
+        return self.store.transfer_batch_since(
+            chain_id, contract, int(time.time()) - self.window_seconds, pair_address
+        )
+
+
+def ingestor_settings_from_env() -> dict:
+    """Reads WHALE_WINDOW_HOURS and ETHERSCAN_* paging settings."""
+    return {
+        "window_seconds": int(float(os.getenv("WHALE_WINDOW_HOURS", "24")) * 3600),
+        "page_size": int(os.getenv("ETHERSCAN_PAGE_SIZE", "1000")),
+        "max_pages": int(os.getenv("ETHERSCAN_MAX_PAGES", "10")),
+        "retention_seconds": int(float(os.getenv("ETHERSCAN_RETENTION_HOURS", "168")) * 3600),
+    }
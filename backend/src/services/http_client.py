@@ -0,0 +1,175 @@
+"""
+Process-wide pooled HTTP client shared by all agents.
+
+One requests.Session per upstream host keeps TCP+TLS connections alive across
+calls. Every request gets bounded connect/read timeouts and 429/5xx responses
+are retried with exponential backoff. Under a request deadline a retry is
+only made while the time left covers its backoff plus MIN_ATTEMPT_SECONDS.
+"""
+import os
+import threading
+from urllib.parse import urlsplit
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from src.utils.logger import get_logger
+from src.utils.metrics import upstream_span
+from src.services.rate_limiter import rate_limiter, RateLimitExceeded
+from src.services.deadline import get_breaker, check_deadline, clip_timeout, note_shortfall, remaining
+
+logger = get_logger(__name__)
+
+CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "3.05"))
+READ_TIMEOUT = float(os.getenv("HTTP_READ_TIMEOUT", "10"))
+MAX_RETRIES = int(os.getenv("HTTP_MAX_RETRIES", "2"))
+BACKOFF_FACTOR = float(os.getenv("HTTP_BACKOFF_FACTOR", "0.3"))
+BACKOFF_MAX = float(os.getenv("HTTP_BACKOFF_MAX", "2"))
+POOL_MAXSIZE = int(os.getenv("HTTP_POOL_MAXSIZE", "20"))
+# Least time worth starting another attempt with under a deadline
+MIN_ATTEMPT_SECONDS = float(os.getenv("HTTP_MIN_ATTEMPT_SECONDS", "0.5"))
+
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+_sessions = {}
+_request_counts = {}
+_lock = threading.Lock()
+
+
+class DeadlineRetry(Retry):
+    """
+    Retry that gives up once the request deadline cannot cover the next
+    backoff plus MIN_ATTEMPT_SECONDS. It runs in the thread that sends the
+    request, so remaining() sees that request's deadline.
+    """
+
+    def increment(self, *args, **kwargs):
+        retry = super().increment(*args, **kwargs)
+        left = remaining()
+        if left is not None and left < retry.get_backoff_time() + MIN_ATTEMPT_SECONDS:
+            note_shortfall("HTTP retry")
+            # Exhausted: a 5xx/429 comes back as the response, an error is raised
+            return self.new(total=0).increment(*args, **kwargs)
+        return retry
+
+
+def _build_session() -> requests.Session:
+    # Retry-After is ignored on purpose: a long server-suggested wait would
+    # pin the worker thread, so backoff is capped at BACKOFF_MAX instead.
+    retry = DeadlineRetry(
+        total=MAX_RETRIES,
+        backoff_factor=BACKOFF_FACTOR,
+        backoff_max=BACKOFF_MAX,
+        status_forcelist=RETRY_STATUSES,
+        allowed_methods=frozenset(["GET"]),
+        respect_retry_after_header=False,
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=POOL_MAXSIZE, max_retries=retry)
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def get_session(url: str) -> requests.Session:
+    """Returns the shared keep-alive session for the URL's host."""
+    host = urlsplit(url).netloc
+    with _lock:
+        session = _sessions.get(host)
+        if session is None:
+            session = _sessions[host] = _build_session()
+        _request_counts[host] = _request_counts.get(host, 0) + 1
+    return session
+
+
+def http_get(url: str, upstream: str = None, params: dict = None, headers: dict = None,
+             timeout=None, stream: bool = False, rate_key: str = None) -> requests.Response:
+    """
+    Performs a GET through the pooled session for the URL's host.
+
+    Args:
+        url: Absolute URL to fetch
+        upstream: Logical upstream name (e.g. "dexscreener"), used in logs and metrics
+        params: Optional query parameters
+        headers: Optional request headers
+        timeout: Optional (connect, read) tuple or single float overriding the defaults
+        stream: Whether to stream the response body
+        rate_key: API key the upstream rate-limits by (hashed, selects the rate-limit bucket)
+
+    Returns:
+        The requests.Response (non-2xx statuses are returned, not raised)
+
+    Raises:
+        CircuitOpenError: if the upstream's circuit breaker is open
+        DeadlineExceeded: if the request deadline has already passed
+        RateLimitExceeded: if the upstream's rate limit has no capacity in time
+    """
+    name = upstream or urlsplit(url).netloc
+    breaker = get_breaker(name, rate_limiter.key_id(rate_key) if rate_key else None)
+    breaker.before_call()
+    clipped = False
+    try:
+        check_deadline(f"{name} request")
+        # Queue for capacity before sending, rather than collecting a 429
+        if upstream:
+            max_wait, wait_clipped = clip_timeout(rate_limiter.max_wait)
+            try:
+                rate_limiter.acquire(upstream, rate_key, timeout=max_wait)
+            except RateLimitExceeded:
+                if wait_clipped:
+                    note_shortfall(f"{name} rate limit")
+                raise
+        # Never wait on the socket past the request deadline
+        effective_timeout, clipped = clip_timeout(timeout or (CONNECT_TIMEOUT, READ_TIMEOUT))
+        session = get_session(url)
+        with upstream_span(name) as call:
+            response = session.get(
+                url,
+                params=params,
+                headers=headers,
+                timeout=effective_timeout,
+                stream=stream,
+            )
+            if response.status_code >= 400:
+                call["outcome"] = f"http_{response.status_code}"
+    except requests.RequestException as e:
+        logger.warning(f"[HTTPClient] {name} request failed: {type(e).__name__}")
+        if clipped and isinstance(e, requests.Timeout):
+            note_shortfall(f"{name} request")
+            breaker.record_inconclusive()
+        else:
+            breaker.record_failure()
+        raise
+    except Exception:
+        # Deadline or rate-limit rejections happen before the upstream is contacted
+        breaker.record_inconclusive()
+        raise
+
+    if response.status_code in RETRY_STATUSES:
+        breaker.record_failure()
+    else:
+        breaker.record_success()
+    return response
+
+
+def connection_stats() -> dict:
+    """
+    Returns, per host, the number of requests issued and new connections opened.
+
+    A ratio of new connections to requests well below 1 means keep-alive is working.
+    """
+    with _lock:
+        sessions = dict(_sessions)
+        request_counts = dict(_request_counts)
+
+    stats = {}
+    for host, session in sessions.items():
+        new_connections = 0
+        for adapter in set(session.adapters.values()):
+            pools = adapter.poolmanager.pools
+            for pool_key in list(pools.keys()):
+                pool = pools.get(pool_key)
+                if pool is not None:
+                    new_connections += pool.num_connections
+        stats[host] = {"requests": request_counts.get(host, 0), "new_connections": new_connections}
+    return stats
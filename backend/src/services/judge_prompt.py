@@ -0,0 +1,161 @@
+"""
+Compact, token-budgeted prompt builder for the Judge.
+
+Only the fields the Judge reasons about are projected out of the Listener and
+Analyst results and serialized as compact JSON. If the prompt still exceeds the
+budget, the post list is shortened: titles are truncated, then the lowest-ranked
+posts are folded into a per-sentiment count.
+"""
+import json
+import os
+
+JUDGE_PROMPT_TOKEN_BUDGET = int(os.getenv("JUDGE_PROMPT_TOKEN_BUDGET", "1200"))
+JUDGE_PROMPT_MAX_POSTS = int(os.getenv("JUDGE_PROMPT_MAX_POSTS", "10"))
+POST_TITLE_CHARS = 120
+MIN_POST_TITLE_CHARS = 48
+
+PROMPT_TEMPLATE = """You are "The Judge", an expert crypto analyst detecting "Fake Hype" and "Rug Pulls".
+Analyze the following data for token: {token}
+
+### Agent A (Social Hype) Data:
+{hype}
+
+### Agent B (On-Chain/Market) Data:
+{onchain}
+
+### Task:
+Compare the social sentiment (Hype) against the actual on-chain metrics (Reality).
+- If Hype is High but Liquidity/Volume is Low or Selling is High -> High Risk (Fake Hype).
+- If Hype is High and Buying is High -> Potential Gem.
+- If Hype is Low but Buying is High -> Accumulation (Hidden Gem).
+
+### Output Format:
+Return ONLY a JSON object with these keys:
+- risk_level (Low, Medium, High, Critical)
+- verdict (Short phrase, e.g., "Rug Pull Risk", "Organic Growth")
+- reasoning (A concise explanation of why, max 2 sentences)
+"""
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (~4 characters per token for English and JSON)."""
+    return (len(text) + 3) // 4
+
+
+def _compact(data) -> str:
+    return json.dumps(data, separators=(",", ":"), ensure_ascii=False, default=str)
+
+
+def _truncate(text: str, limit: int) -> str:
+    text = " ".join(str(text or "").split())
+    return text if len(text) <= limit else text[:limit - 1] + "…"
+
+
+def _round(value, digits: int = 2):
+    return round(value, digits) if isinstance(value, float) else value
+
+
+def project_hype(hype_data: dict) -> dict:
+    """Keeps the hype score, volume and per-post title/score/sentiment (no URLs)."""
+    reddit = (hype_data.get("details") or {}).get("reddit_data") or {}
+    posts = sorted(reddit.get("top_posts") or [], key=lambda p: p.get("score") or 0, reverse=True)
+    return {
+        "hype_score": hype_data.get("hype_score"),
+        "trending_volume": hype_data.get("trending_volume"),
+        "posts": reddit.get("posts", 0),
+        "upvotes": reddit.get("upvotes", 0),
+        "sentiment_score": _round(reddit.get("sentiment_score")),
+        "top_posts": [
+            {"title": _truncate(p.get("title"), POST_TITLE_CHARS), "score": p.get("score"),
+             "sentiment": p.get("sentiment")}
+            for p in posts[:JUDGE_PROMPT_MAX_POSTS]
+        ],
+    }
+
+
+def project_onchain(onchain_data: dict) -> dict:
+    """Keeps market metrics, the flow signal, whale totals and deltas."""
+    details = onchain_data.get("details") or {}
+    if "error" in details:
+        return {"net_smart_money_flow": onchain_data.get("net_smart_money_flow"), "error": details["error"]}
+
+    whale_data = details.get("whale_data")
+    whales = None
+    if whale_data:
+        whales = {
+            "buys_usd": int(whale_data.get("whale_buys_usd", 0)),
+            "sells_usd": int(whale_data.get("whale_sells_usd", 0)),
+            "tx_count": whale_data.get("whale_tx_count", 0),
+            "chains": [c.get("chain_id") for c in whale_data.get("chains") or []],
+        }
+
+    deltas = {
+        window: {k: v for k, v in delta.items() if k != "reference_age_s"}
+        for window, delta in (details.get("deltas") or {}).items() if delta
+    }
+
+    return {
+        "net_smart_money_flow": onchain_data.get("net_smart_money_flow"),
+        "tracking_type": details.get("tracking_type"),
+        "chain": details.get("chain_id"),
+        "price": details.get("price"),
+        "liquidity": _round(details.get("liquidity"), 0),
+        "volume_24h": _round(details.get("volume_24h"), 0),
+        "fdv": _round(details.get("fdv"), 0),
+        "net_flow_usd": details.get("net_flow_usd"),
+        "whales": whales,
+        "deltas": deltas or None,
+    }
+
+
+def _render(token: str, hype: dict, onchain: dict) -> str:
+    return PROMPT_TEMPLATE.format(token=token, hype=_compact(hype), onchain=_compact(onchain))
+
+
+def build_judge_prompt(hype_data: dict, onchain_data: dict, token_budget: int = JUDGE_PROMPT_TOKEN_BUDGET):
+    """
+    Builds the Judge prompt within a token budget.
+
+    Returns:
+        Tuple of (prompt, stats) where stats has the estimated prompt tokens,
+        what the uncompacted prompt would have cost, and how many posts made it in
+    """
+    token = hype_data.get("token", "Unknown")
+    hype = project_hype(hype_data)
+    onchain = project_onchain(onchain_data)
+    posts = hype["top_posts"]
+    total_posts = len(posts)
+
+    prompt = _render(token, hype, onchain)
+
+    # First shorten titles, then fold the lowest-ranked posts into sentiment counts
+    if estimate_tokens(prompt) > token_budget and posts:
+        hype["top_posts"] = posts = [
+            {**p, "title": _truncate(p["title"], MIN_POST_TITLE_CHARS)} for p in posts
+        ]
+        prompt = _render(token, hype, onchain)
+
+    folded = {}
+    while estimate_tokens(prompt) > token_budget and posts:
+        dropped = posts.pop()
+        label = dropped.get("sentiment") or "Neutral"
+        folded[label] = folded.get(label, 0) + 1
+        hype["other_posts_by_sentiment"] = folded
+        prompt = _render(token, hype, onchain)
+
+    full_prompt = PROMPT_TEMPLATE.format(
+        token=token, hype=json.dumps(hype_data, indent=2), onchain=json.dumps(onchain_data, indent=2)
+    )
+    prompt_tokens = estimate_tokens(prompt)
+    full_tokens = estimate_tokens(full_prompt)
+    stats = {
+        "prompt_chars": len(prompt),
+        "prompt_tokens_est": prompt_tokens,
+        "uncompacted_tokens_est": full_tokens,
+        "reduction_pct": round((1 - prompt_tokens / full_tokens) * 100, 1) if full_tokens else 0.0,
+        "token_budget": token_budget,
+        "over_budget": prompt_tokens > token_budget,
+        "posts_included": len(posts),
+        "posts_folded": total_posts - len(posts),
+    }
+    return prompt, stats
@@ -0,0 +1,134 @@
+"""
+Offline crypto-slang sentiment scorer.
+
+Posts are tokenized once, every lexicon hit in the batch is laid out in flat
+NumPy arrays, and per-post totals come from np.bincount. Each result has the
+same sentiment_score / sentiment_label shape as the LLM output, plus a
+confidence used to decide which posts still need the LLM.
+"""
+import os
+import re
+import numpy as np
+
+LEXICON_MIN_CONFIDENCE = float(os.getenv("LEXICON_MIN_CONFIDENCE", "0.6"))
+
+# Term weights: positive is bullish, negative is bearish
+LEXICON = {
+    # Bullish slang
+    "moon": 2.0, "mooning": 2.0, "moonshot": 2.0, "10x": 2.0, "50x": 2.5, "100x": 2.5, "1000x": 2.5,
+    "lfg": 2.0, "wagmi": 1.5, "bullish": 2.0, "bull": 1.0, "gem": 2.0, "gems": 1.5, "hodl": 1.0,
+    "pumping": 1.5, "pump": 1.0, "rocket": 1.5, "send": 1.0, "sending": 1.2, "ath": 1.5,
+    "breakout": 1.5, "undervalued": 1.5, "accumulate": 1.2, "accumulating": 1.2, "buythedip": 1.2,
+    "rally": 1.5, "surge": 1.5, "surging": 1.5, "soaring": 1.5, "gains": 1.5, "profit": 1.0,
+    "profits": 1.0, "legit": 1.5, "strong": 1.0, "growth": 1.0, "partnership": 1.0, "listing": 1.0,
+    "adoption": 1.0, "buy": 0.8, "buying": 0.8, "bought": 0.6, "long": 0.5, "green": 1.0,
+    "early": 1.0, "love": 1.0, "great": 1.0, "amazing": 1.5, "bullrun": 2.0, "diamond": 1.0,
+    "🚀": 2.0, "🌕": 1.5, "🌙": 1.5, "💎": 1.5, "🔥": 1.0, "📈": 1.5, "💰": 1.0,
+    # Bearish slang
+    "rug": -3.0, "rugged": -3.0, "rugpull": -3.0, "scam": -3.0, "scammer": -3.0, "scammers": -3.0,
+    "ponzi": -3.0, "honeypot": -3.0, "exitscam": -3.0, "fraud": -3.0, "pumpanddump": -2.5,
+    "dump": -2.0, "dumping": -2.0, "dumped": -2.0, "crash": -2.0, "crashed": -2.0, "crashing": -2.0,
+    "bearish": -2.0, "bear": -1.0, "sell": -1.0, "selling": -1.2, "sold": -0.8, "short": -0.8,
+    "rekt": -2.0, "ngmi": -2.0, "dead": -2.0, "red": -0.8, "loss": -1.5, "losses": -1.5, "lost": -1.2,
+    "drop": -1.2, "dropped": -1.2, "plunge": -2.0, "tank": -1.5, "tanking": -1.8, "fud": -0.5,
+    "avoid": -2.0, "stayaway": -2.5, "warning": -1.5, "beware": -2.0, "fake": -2.0, "hack": -2.5,
+    "hacked": -2.5, "exploit": -2.5, "exploited": -2.5, "drained": -2.5, "overvalued": -1.5,
+    "bubble": -1.5, "worthless": -2.5, "tozero": -2.5, "bagholder": -1.5, "bagholders": -1.5,
+    "capitulation": -1.5, "liquidated": -2.0, "delisted": -2.0, "delisting": -2.0, "panic": -1.5,
+    "worst": -2.0, "terrible": -2.0, "hate": -1.5, "sucks": -1.5, "stolen": -2.5,
+    "manipulation": -1.5, "manipulated": -1.5, "insider": -1.0,
+    "💀": -1.5, "🤡": -1.5, "🚩": -2.0, "📉": -1.5,
+}
+
+# Multi-word expressions are collapsed into single lexicon tokens before splitting
+PHRASES = {
+    "rug pull": "rugpull", "rug pulled": "rugpull", "pump and dump": "pumpanddump",
+    "pump & dump": "pumpanddump", "buy the dip": "buythedip", "all time high": "ath",
+    "to the moon": "moon", "going to zero": "tozero", "stay away": "stayaway",
+    "exit scam": "exitscam", "honey pot": "honeypot", "bull run": "bullrun",
+}
+
+NEGATORS = {"not", "no", "never", "dont", "isnt", "wasnt", "aint", "without", "cant", "wont", "nothing"}
+NEGATION_WINDOW = 2
+
+_PHRASE_RE = re.compile("|".join(re.escape(p) for p in sorted(PHRASES, key=len, reverse=True)))
+_TOKEN_RE = re.compile(r"[a-z0-9$']+|[\U0001F300-\U0001FAFF]")
+
+_VOCAB = {term: i for i, term in enumerate(LEXICON)}
+_WEIGHTS = np.array(list(LEXICON.values()), dtype=np.float64)
+
+
+def _tokenize(text: str) -> list:
+    text = _PHRASE_RE.sub(lambda m: f" {PHRASES[m.group(0)]} ", text.lower())
+    return [token.replace("'", "") for token in _TOKEN_RE.findall(text)]
+
+
+def score_texts(texts: list) -> dict:
+    """
+    Scores a batch of posts against the lexicon.
+
+    Returns:
+        Dict of per-post NumPy arrays: score (0..1), confidence (0..1) and hits
+    """
+    n = len(texts)
+    post_ids, term_ids, signs = [], [], []
+    has_question = np.zeros(n, dtype=bool)
+
+    for i, text in enumerate(texts):
+        text = text or ""
+        has_question[i] = "?" in text
+        negated_until = -1
+        for position, token in enumerate(_tokenize(text)):
+            if token in NEGATORS:
+                negated_until = position + NEGATION_WINDOW
+                continue
+            term = _VOCAB.get(token)
+            if term is not None:
+                post_ids.append(i)
+                term_ids.append(term)
+                signs.append(-1.0 if position <= negated_until else 1.0)
+
+    post_ids = np.asarray(post_ids, dtype=np.int64)
+    contributions = _WEIGHTS[np.asarray(term_ids, dtype=np.int64)] * np.asarray(signs, dtype=np.float64)
+
+    total = np.bincount(post_ids, weights=contributions, minlength=n)
+    magnitude = np.bincount(post_ids, weights=np.abs(contributions), minlength=n)
+    hits = np.bincount(post_ids, minlength=n)
+
+    # Confidence: how one-sided the hits are, times how much evidence there is
+    with np.errstate(invalid="ignore", divide="ignore"):
+        polarity = np.where(magnitude > 0, np.abs(total) / magnitude, 0.0)
+    strength = 1.0 - np.exp(-magnitude / 1.5)
+    confidence = polarity * strength * np.where(has_question, 0.6, 1.0)
+
+    return {
+        "score": 0.5 + 0.5 * np.tanh(total / 2.5),
+        "confidence": confidence,
+        "hits": hits,
+    }
+
+
+def _label(score: float) -> str:
+    if score >= 0.6:
+        return "Positive"
+    if score <= 0.4:
+        return "Negative"
+    return "Neutral"
+
+
+def lexicon_sentiment(texts: list) -> list:
+    """
+    Scores posts offline.
+
+    Returns:
+        List of dicts with sentiment_score, sentiment_label and confidence,
+        one per input text, in the same order
+    """
+    if not texts:
+        return []
+    scored = score_texts(texts)
+    return [
+        {"sentiment_score": round(float(score), 4), "sentiment_label": _label(score),
+         "confidence": round(float(confidence), 4)}
+        for score, confidence in zip(scored["score"], scored["confidence"])
+    ]
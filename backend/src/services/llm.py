@@ -1,19 +1,122 @@
 import os
 import json
-import google.generativeai as genai
+import time
+import google.ai.generativelanguage as glm
+from google.api_core.client_options import ClientOptions
 from openai import OpenAI
 from dotenv import load_dotenv
 from src.utils.logger import get_logger
 from src.utils.security import sanitize_error_message
+from src.utils.metrics import upstream_span, LLM_TOKENS
+from src.services.rate_limiter import rate_limiter, RateLimiter, RateLimitExceeded
+from src.services.deadline import (
+    get_breaker, check_deadline, clip_timeout, note_shortfall, remaining, DeadlineExceeded
+)
+from src.services.sentiment_cache import SentimentCache, get_sentiment_cache
 
 load_dotenv()
 logger = get_logger(__name__)
 
+SENTIMENT_LABELS = ("Positive", "Negative", "Neutral")
+SENTIMENT_BATCH_SIZE = int(os.getenv("SENTIMENT_BATCH_SIZE", "20"))
+# Upper bound (seconds) for one provider call; a request deadline can shorten it
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "30"))
+# Retries of 5xx, 408/429, timeouts and connection errors (the SDKs' own retries are off)
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "2"))
+LLM_BACKOFF_FACTOR = float(os.getenv("LLM_BACKOFF_FACTOR", "0.5"))
+LLM_BACKOFF_MAX = float(os.getenv("LLM_BACKOFF_MAX", "8"))
+# Least time worth starting another attempt with under a deadline
+LLM_MIN_ATTEMPT_SECONDS = float(os.getenv("LLM_MIN_ATTEMPT_SECONDS", "1"))
+
+
+def _neutral_sentiment() -> dict:
+    """Fallback result used when the LLM is unavailable or returns junk."""
+    return {"sentiment_score": 0.5, "sentiment_label": "Neutral", "hype_intensity": "Unknown"}
+
+
+def _parse_json_response(result_text: str):
+    """Strips markdown code fences and parses the LLM output as JSON."""
+    cleaned_text = result_text.replace("```json", "").replace("```", "").strip()
+    return json.loads(cleaned_text)
+
+
+def _gemini_client(api_key: str):
+    """
+    Returns a Gemini generation client bound to one API key.
+
+    The google-generativeai SDK holds a single process-wide key, so warm
+    services built for different users would all call Gemini with the last key
+    configured; the generativelanguage client takes its key per instance.
+    """
+    return glm.GenerativeServiceClient(client_options=ClientOptions(api_key=api_key))
+
+
+def _gemini_text(response) -> str:
+    """Text of the first candidate of a GenerateContentResponse."""
+    if not response.candidates:
+        raise ValueError(f"Gemini returned no candidates: {response.prompt_feedback}")
+    return "".join(part.text for part in response.candidates[0].content.parts)
+
+
+def _is_provider_outage(error) -> bool:
+    """
+    Whether a failed call says the provider itself is unhealthy: a 5xx, a
+    timeout or a connection error. Auth, quota and other 4xx errors are about
+    the caller's key or request, so they never count towards opening the circuit.
+    """
+    # openai.APIStatusError carries status_code, google.api_core errors carry code
+    status = getattr(error, "status_code", None)
+    if status is None:
+        status = getattr(error, "code", None)
+    if isinstance(status, int):
+        return status >= 500
+    if isinstance(error, (TimeoutError, ConnectionError)):
+        return True
+    name = type(error).__name__.lower()
+    return "timeout" in name or "connection" in name
+
+
+def _is_retryable(error) -> bool:
+    """Whether a failed call is worth repeating: an outage, a 408 or a 429, but never our own deadline."""
+    if isinstance(error, DeadlineExceeded):
+        return False
+    status = getattr(error, "status_code", None)
+    if status is None:
+        status = getattr(error, "code", None)
+    return status in (408, 429) or _is_provider_outage(error)
+
+
+def _normalize_sentiment_item(item) -> dict:
+    """
+    Validates a single sentiment entry returned by the LLM.
+
+    Returns:
+        A clean sentiment dict, or None if the entry is missing or mangled
+    """
+    if not isinstance(item, dict):
+        return None
+    try:
+        score = float(item.get("sentiment_score"))
+    except (TypeError, ValueError):
+        return None
+    if not 0.0 <= score <= 1.0:
+        return None
+
+    label = str(item.get("sentiment_label", "")).strip().capitalize()
+    if label not in SENTIMENT_LABELS:
+        return None
+
+    return {"sentiment_score": score, "sentiment_label": label}
+
+
 class LLMService:
     def __init__(self, openai_key: str = None, gemini_key: str = None):
         self.provider = None
         self.client = None
         self.model = None
+        self.model_name = None
+        self.rate_key = None
+        self.sentiment_cache = get_sentiment_cache()
         
         # Priority: Passed keys → Environment variables
         openai_key = openai_key or os.getenv("OPENAI_API_KEY")
@@ -22,8 +125,11 @@ class LLMService:
         if openai_key:
             try:
                 self.provider = "openai"
-                self.client = OpenAI(api_key=openai_key)
+                # Retries are made by _complete, which knows the request deadline
+                self.client = OpenAI(api_key=openai_key, max_retries=0)
                 self.model = "gpt-4o"
+                self.model_name = "gpt-4o"
+                self.rate_key = RateLimiter.key_id(openai_key)
                 logger.info("[LLMService] Using OpenAI (GPT-4o)")
             except Exception as e:
                 sanitized_error = sanitize_error_message(e, [openai_key])
@@ -34,8 +140,10 @@ class LLMService:
         if not openai_key and gemini_key:
             try:
                 self.provider = "gemini"
-                genai.configure(api_key=gemini_key)
-                self.model = genai.GenerativeModel('gemini-2.0-flash')
+                self.client = _gemini_client(gemini_key)
+                self.model = "models/gemini-2.0-flash"
+                self.model_name = "gemini-2.0-flash"
+                self.rate_key = RateLimiter.key_id(gemini_key)
                 logger.info("[LLMService] Using Gemini (Flash)")
             except Exception as e:
                 sanitized_error = sanitize_error_message(e, [gemini_key])
@@ -44,6 +152,105 @@ class LLMService:
         if not self.provider:
             logger.warning("[LLMService] No valid API keys found (OpenAI or Gemini). LLM features disabled.")
 
+    def _complete(self, operation: str, prompt: str, system_prompt: str,
+                  temperature: float, json_output: bool = False) -> str:
+        """
+        Sends one prompt to the configured provider and returns the raw text.
+
+        Retryable failures are repeated up to LLM_MAX_RETRIES times with
+        exponential backoff. Under a request deadline a retry is only made
+        while the time left covers its backoff plus LLM_MIN_ATTEMPT_SECONDS.
+        The last error propagates to the caller.
+        """
+        for attempt in range(LLM_MAX_RETRIES + 1):
+            try:
+                return self._complete_once(operation, prompt, system_prompt, temperature, json_output)
+            except Exception as e:
+                if attempt == LLM_MAX_RETRIES or not _is_retryable(e):
+                    raise
+                backoff = min(LLM_BACKOFF_MAX, LLM_BACKOFF_FACTOR * 2 ** attempt)
+                left = remaining()
+                if left is not None and left < backoff + LLM_MIN_ATTEMPT_SECONDS:
+                    note_shortfall(f"{self.provider} retry")
+                    raise
+                logger.warning(f"[LLMService] {self.provider} call failed ({type(e).__name__}), "
+                               f"retrying in {backoff:.1f}s")
+                time.sleep(backoff)
+
+    def _complete_once(self, operation: str, prompt: str, system_prompt: str,
+                       temperature: float, json_output: bool) -> str:
+        """
+        Makes one provider call.
+
+        The call is timed as an upstream span and the provider-reported token
+        usage is added to the LLM token counters. It is bounded by LLM_TIMEOUT
+        and the request deadline, and goes through the circuit breaker of the
+        provider and API key.
+        """
+        breaker = get_breaker(self.provider, self.rate_key)
+        breaker.before_call()
+        clipped = wait_clipped = False
+        try:
+            check_deadline(f"{self.provider} call")
+            max_wait, wait_clipped = clip_timeout(rate_limiter.max_wait)
+            rate_limiter.acquire(self.provider, self.rate_key, timeout=max_wait)
+            # Never wait on the provider past the request deadline
+            timeout, clipped = clip_timeout(LLM_TIMEOUT)
+            with upstream_span(self.provider):
+                if self.provider == "openai":
+                    kwargs = {"response_format": {"type": "json_object"}} if json_output else {}
+                    response = self.client.chat.completions.create(
+                        model=self.model,
+                        messages=[
+                            {"role": "system", "content": system_prompt},
+                            {"role": "user", "content": prompt}
+                        ],
+                        temperature=temperature,
+                        timeout=timeout,
+                        **kwargs
+                    )
+                    usage = getattr(response, "usage", None)
+                    prompt_tokens = getattr(usage, "prompt_tokens", 0)
+                    completion_tokens = getattr(usage, "completion_tokens", 0)
+                    text = response.choices[0].message.content
+
+                elif self.provider == "gemini":
+                    # The client's default retry of 503s runs for up to 10 minutes; _complete retries instead
+                    response = self.client.generate_content(
+                        request=glm.GenerateContentRequest(
+                            model=self.model,
+                            contents=[glm.Content(role="user", parts=[glm.Part(text=prompt)])],
+                        ),
+                        timeout=timeout,
+                        retry=None,
+                    )
+                    usage = getattr(response, "usage_metadata", None)
+                    prompt_tokens = getattr(usage, "prompt_token_count", 0)
+                    completion_tokens = getattr(usage, "candidates_token_count", 0)
+                    text = _gemini_text(response)
+        except (DeadlineExceeded, RateLimitExceeded) as e:
+            # Rejected before the provider was contacted
+            if isinstance(e, RateLimitExceeded) and wait_clipped:
+                note_shortfall(f"{self.provider} rate limit")
+            breaker.record_inconclusive()
+            raise
+        except Exception as e:
+            # A timeout the deadline shortened says nothing about the provider
+            cut_short = clipped and "timeout" in type(e).__name__.lower()
+            if cut_short:
+                note_shortfall(f"{self.provider} call")
+            if _is_provider_outage(e) and not cut_short:
+                breaker.record_failure()
+            else:
+                breaker.record_inconclusive()
+            raise
+        breaker.record_success()
+
+        labels = {"provider": self.provider, "model": self.model_name, "operation": operation}
+        LLM_TOKENS.inc(prompt_tokens or 0, kind="prompt", **labels)
+        LLM_TOKENS.inc(completion_tokens or 0, kind="completion", **labels)
+        return text
+
     def generate_text(self, prompt: str) -> str:
         """
         Generates text using the configured provider.
@@ -52,21 +259,10 @@ class LLMService:
             return "Error: No LLM API Key configured."
 
         try:
-            if self.provider == "openai":
-                response = self.client.chat.completions.create(
-                    model=self.model,
-                    messages=[
-                        {"role": "system", "content": "You are a helpful crypto analyst."},
-                        {"role": "user", "content": prompt}
-                    ],
-                    temperature=0.7
-                )
-                return response.choices[0].message.content
-            
-            elif self.provider == "gemini":
-                response = self.model.generate_content(prompt)
-                return response.text
-                
+            return self._complete(
+                "generate_text", prompt,
+                system_prompt="You are a helpful crypto analyst.", temperature=0.7
+            )
         except Exception as e:
             sanitized_error = sanitize_error_message(e, [])
             logger.error(f"[LLMService] Error generating text: {sanitized_error}")
@@ -77,7 +273,14 @@ class LLMService:
         Analyzes sentiment of a text and returns structured JSON.
         """
         if not self.provider:
-            return {"sentiment_score": 0.5, "sentiment_label": "Neutral", "hype_intensity": "Unknown"}
+            return _neutral_sentiment()
+
+        cache_key = None
+        if self.sentiment_cache:
+            cache_key = SentimentCache.make_key(text, self.provider, self.model_name)
+            cached = self.sentiment_cache.get(cache_key)
+            if cached:
+                return cached
 
         prompt = f"""
         Analyze the sentiment of this crypto social media post.
@@ -89,31 +292,120 @@ class LLMService:
         """
 
         try:
-            if self.provider == "openai":
-                response = self.client.chat.completions.create(
-                    model=self.model,
-                    messages=[
-                        {"role": "system", "content": "You are a sentiment analysis engine. Output JSON only."},
-                        {"role": "user", "content": prompt}
-                    ],
-                    response_format={"type": "json_object"},
-                    temperature=0
-                )
-                result_text = response.choices[0].message.content
-            
-            elif self.provider == "gemini":
-                response = self.model.generate_content(prompt)
-                result_text = response.text
+            result_text = self._complete(
+                "analyze_sentiment", prompt,
+                system_prompt="You are a sentiment analysis engine. Output JSON only.",
+                temperature=0, json_output=True
+            )
 
             # Clean and parse JSON
-            cleaned_text = result_text.replace("```json", "").replace("```", "").strip()
-            return json.loads(cleaned_text)
+            result = _parse_json_response(result_text)
+            normalized = _normalize_sentiment_item(result)
+            if cache_key and normalized:
+                self.sentiment_cache.set(cache_key, normalized)
+            return result
 
         except Exception as e:
             sanitized_error = sanitize_error_message(e, [])
             logger.error(f"[LLMService] Error analyzing sentiment: {sanitized_error}")
-            return {
-                "sentiment_score": 0.5,
-                "sentiment_label": "Neutral",
-                "hype_intensity": "Unknown"
-            }
+            return _neutral_sentiment()
+
+    def analyze_sentiment_batch(self, texts: list) -> list:
+        """
+        Analyzes sentiment of several texts with one LLM call per chunk.
+
+        Results are mapped back by index. Entries the model drops or mangles
+        fall back to a neutral 0.5 score.
+
+        Args:
+            texts: List of post texts to score
+
+        Returns:
+            List of sentiment dicts, one per input text, in the same order
+        """
+        if not texts:
+            return []
+        if not self.provider:
+            return [_neutral_sentiment() for _ in texts]
+
+        results = [None] * len(texts)
+        keys = []
+        if self.sentiment_cache:
+            keys = [SentimentCache.make_key(text, self.provider, self.model_name) for text in texts]
+            cached = self.sentiment_cache.get_many(keys)
+            for i, key in enumerate(keys):
+                results[i] = cached.get(key)
+
+        # Only the posts we have not scored before go to the LLM
+        pending = [i for i, result in enumerate(results) if result is None]
+        if pending:
+            logger.info(f"[LLMService] Scoring {len(pending)}/{len(texts)} posts (rest served from cache)")
+
+        fresh = {}
+        for start in range(0, len(pending), SENTIMENT_BATCH_SIZE):
+            chunk = pending[start:start + SENTIMENT_BATCH_SIZE]
+            chunk_results = self._analyze_sentiment_chunk([texts[i] for i in chunk])
+            for i, result in zip(chunk, chunk_results):
+                results[i] = result
+                if result is not None and keys:
+                    fresh[keys[i]] = result
+
+        if fresh:
+            self.sentiment_cache.set_many(fresh)
+
+        return [result or _neutral_sentiment() for result in results]
+
+    def _analyze_sentiment_chunk(self, texts: list) -> list:
+        """
+        Scores one chunk of texts in a single structured-JSON call.
+
+        Returns:
+            List aligned with texts, holding None for entries the model dropped
+        """
+        numbered_posts = "\n".join(
+            f"{i}. {json.dumps(text, ensure_ascii=False)}" for i, text in enumerate(texts)
+        )
+        prompt = f"""
+        Analyze the sentiment of each of these {len(texts)} crypto social media posts.
+        Posts (index. text):
+        {numbered_posts}
+        
+        Return ONLY a JSON object with a "results" array containing one object per post, with:
+        - index (integer, the post index above)
+        - sentiment_score (float between 0.0 and 1.0, where 0 is negative, 1 is positive)
+        - sentiment_label (Positive, Negative, Neutral)
+        """
+
+        try:
+            result_text = self._complete(
+                "analyze_sentiment_batch", prompt,
+                system_prompt="You are a sentiment analysis engine. Output JSON only.",
+                temperature=0, json_output=True
+            )
+
+            parsed = _parse_json_response(result_text)
+        except Exception as e:
+            sanitized_error = sanitize_error_message(e, [])
+            logger.error(f"[LLMService] Error analyzing sentiment batch: {sanitized_error}")
+            return [None] * len(texts)
+
+        items = parsed.get("results", []) if isinstance(parsed, dict) else parsed
+        if not isinstance(items, list):
+            items = []
+
+        by_index = {}
+        for position, item in enumerate(items):
+            index = item.get("index", position) if isinstance(item, dict) else position
+            try:
+                index = int(index)
+            except (TypeError, ValueError):
+                continue
+            normalized = _normalize_sentiment_item(item)
+            if normalized and 0 <= index < len(texts) and index not in by_index:
+                by_index[index] = normalized
+
+        missing = len(texts) - len(by_index)
+        if missing:
+            logger.warning(f"[LLMService] Batch sentiment missing {missing}/{len(texts)} entries, using Neutral fallback")
+
+        return [by_index.get(i) for i in range(len(texts))]
@@ -0,0 +1,183 @@
+"""
+Short-TTL market-data cache with single-flight request coalescing.
+
+Concurrent lookups for the same key share one in-flight upstream call. Entries
+past their TTL but still inside the staleness window are served immediately
+while a single background refresh runs.
+
+Waiting callers keep their own request deadline: they stop waiting when it
+runs out, and when the shared load failed only because its owner's deadline
+ran out, they load for themselves instead of inheriting that error.
+"""
+import contextvars
+import os
+import threading
+import time
+from collections import OrderedDict
+from src.services.deadline import DeadlineExceeded, note_shortfall, remaining
+from src.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class _Flight:
+    """An in-flight upstream load that other callers can wait on."""
+    def __init__(self):
+        self.event = threading.Event()
+        self.value = None
+        self.error = None
+        # The load failed because the owner's deadline ran out, not because of the upstream
+        self.owner_deadline_error = False
+
+
+class CoalescingTTLCache:
+    def __init__(self, name: str, ttl_seconds: float, stale_seconds: float = 0, max_entries: int = 1024):
+        self.name = name
+        self.ttl_seconds = ttl_seconds
+        self.stale_seconds = stale_seconds
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # key -> (value, fetched_at)
+        self._flights = {}
+        self._lock = threading.Lock()
+        self._counters = {
+            "requests": 0,
+            "fresh_hits": 0,
+            "stale_hits": 0,
+            "misses": 0,
+            "coalesced": 0,
+            "shared_errors": 0,
+            "wait_timeouts": 0,
+            "deadline_retries": 0,
+            "loads": 0,
+            "load_errors": 0,
+            "background_refreshes": 0,
+        }
+
+    def get(self, key, loader):
+        """
+        Returns the value for key, calling loader() at most once per key at a time.
+
+        Args:
+            key: Cache key (e.g. the upper-cased token symbol)
+            loader: Zero-argument callable that fetches a fresh value; exceptions
+                    propagate to every caller waiting on the same flight, except
+                    those caused by the loading caller's own deadline
+
+        Returns:
+            The cached, coalesced or freshly loaded value
+        """
+        with self._lock:
+            self._counters["requests"] += 1
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, fetched_at = entry
+                age = time.monotonic() - fetched_at
+                if age <= self.ttl_seconds:
+                    self._counters["fresh_hits"] += 1
+                    self._entries.move_to_end(key)
+                    return value
+                if age <= self.ttl_seconds + self.stale_seconds:
+                    self._counters["stale_hits"] += 1
+                    self._entries.move_to_end(key)
+                    if key not in self._flights:
+                        self._counters["background_refreshes"] += 1
+                        flight = self._flights[key] = _Flight()
+                        # The refresh runs under the caller's context (deadline, request ID)
+                        threading.Thread(
+                            target=contextvars.copy_context().run, args=(self._load, key, loader, flight),
+                            name=f"{self.name}-refresh", daemon=True
+                        ).start()
+                    return value
+            self._counters["misses"] += 1
+
+        while True:
+            with self._lock:
+                flight = self._flights.get(key)
+                owner = flight is None
+                if owner:
+                    flight = self._flights[key] = _Flight()
+
+            if owner:
+                self._load(key, loader, flight)
+                if flight.error is not None:
+                    raise flight.error
+                return flight.value
+
+            left = remaining()
+            if not flight.event.wait(timeout=None if left is None else max(0.0, left)):
+                with self._lock:
+                    self._counters["wait_timeouts"] += 1
+                note_shortfall(f"{self.name} load")
+                raise DeadlineExceeded(f"Deadline exceeded waiting for the {self.name} load of {key!r}")
+
+            with self._lock:
+                if flight.error is None:
+                    self._counters["coalesced"] += 1
+                    return flight.value
+                if not flight.owner_deadline_error:
+                    # A shared failure is not a value served from the cache
+                    self._counters["shared_errors"] += 1
+                    raise flight.error
+                # Only the owner ran out of time; this caller loads (or joins a newer load) itself
+                self._counters["deadline_retries"] += 1
+
+    def _load(self, key, loader, flight: _Flight):
+        try:
+            flight.value = loader()
+        except Exception as e:
+            flight.error = e
+            left = remaining()
+            flight.owner_deadline_error = isinstance(e, DeadlineExceeded) or (left is not None and left <= 0)
+
+        with self._lock:
+            self._counters["loads"] += 1
+            if flight.error is None:
+                self._entries[key] = (flight.value, time.monotonic())
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+            else:
+                self._counters["load_errors"] += 1
+                logger.warning(f"[{self.name}] Load failed for {key!r}: {flight.error}")
+            self._flights.pop(key, None)
+
+        flight.event.set()
+
+    def invalidate(self, key=None):
+        """Drops one key, or every key when none is given."""
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+
+    def stats(self) -> dict:
+        """
+        Returns cache counters.
+
+        coalesce_ratio is the share of would-be upstream calls that piggybacked
+        on an in-flight load instead of issuing their own request.
+        """
+        with self._lock:
+            counters = dict(self._counters)
+            counters["entries"] = len(self._entries)
+        upstream_demand = counters["coalesced"] + counters["loads"]
+        counters["coalesce_ratio"] = round(counters["coalesced"] / upstream_demand, 3) if upstream_demand else 0.0
+        served_from_cache = counters["fresh_hits"] + counters["stale_hits"]
+        counters["hit_ratio"] = round(served_from_cache / counters["requests"], 3) if counters["requests"] else 0.0
+        return counters
+
+
+# DexScreener search results, keyed by upper-cased token symbol
+dexscreener_search_cache = CoalescingTTLCache(
+    name="DexScreenerCache",
+    ttl_seconds=float(os.getenv("DEXSCREENER_CACHE_TTL", "15")),
+    stale_seconds=float(os.getenv("DEXSCREENER_CACHE_STALE", "45")),
+)
+
+# DexScreener per-pair data, keyed by (chain ID, pair address)
+dexscreener_pair_cache = CoalescingTTLCache(
+    name="DexScreenerPairCache",
+    ttl_seconds=float(os.getenv("DEXSCREENER_CACHE_TTL", "15")),
+    stale_seconds=float(os.getenv("DEXSCREENER_CACHE_STALE", "45")),
+)
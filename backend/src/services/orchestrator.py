@@ -0,0 +1,280 @@
+"""
+Async orchestration of the Listener, Analyst and Judge agents.
+
+The Listener (Reddit + LLM) and the Analyst (DexScreener + Etherscan) are
+independent, network-bound stages, so they run concurrently in worker threads.
+The Judge only starts once both have finished.
+
+With a deadline, the Listener and Analyst share the first part of the budget
+and the Judge gets the rest (at least JUDGE_BUDGET_SHARE of it). A stage that
+runs out of time is reported in missing_stages instead of holding up the
+response. So is a stage that returned a degraded result because the deadline
+skipped or cut short one of its upstream calls. Its output is replaced by a
+"Timed out" placeholder marked "degraded", and the Judge does not cache
+verdicts built on such inputs.
+"""
+import asyncio
+import os
+import time
+from src.services.deadline import run_with_deadline
+from src.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+JUDGE_BUDGET_SHARE = float(os.getenv("JUDGE_BUDGET_SHARE", "0.4"))
+# Extra wait past a stage's deadline so an agent that degrades gracefully can still return
+STAGE_GRACE_SECONDS = 0.05
+
+
+async def _timed_stage(name: str, func, *args, deadline: float = None, shortfalls: list = None) -> tuple:
+    """
+    Runs a blocking agent method in a worker thread and measures it.
+
+    With a deadline (absolute time.monotonic()), the agent's upstream calls see
+    it through the context and the wait raises TimeoutError once it has passed.
+    The worker thread is not killed; it fails fast on its next upstream call.
+    Calls the deadline skipped or cut short are noted in shortfalls.
+    """
+    start = time.perf_counter()
+    if deadline is None:
+        result = await asyncio.to_thread(func, *args)
+    else:
+        result = await asyncio.wait_for(
+            asyncio.to_thread(run_with_deadline, deadline, func, *args, shortfalls=shortfalls),
+            timeout=max(0.0, deadline - time.monotonic()) + STAGE_GRACE_SECONDS,
+        )
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    logger.info(f"[Orchestrator] Stage '{name}' finished in {elapsed_ms:.0f}ms",
+                extra={"stage": name, "stage_ms": round(elapsed_ms, 1)})
+    return result, elapsed_ms
+
+
+async def _stage_or_timeout(name: str, func, *args, deadline: float = None) -> tuple:
+    """
+    Like _timed_stage, but returns (None, elapsed_ms) when the stage runs out of
+    time, including when it returned a result degraded by the deadline.
+    """
+    start = time.perf_counter()
+    shortfalls = []
+    try:
+        result, elapsed_ms = await _timed_stage(name, func, *args, deadline=deadline, shortfalls=shortfalls)
+    except TimeoutError:
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        logger.warning(f"[Orchestrator] Stage '{name}' missed its deadline after {elapsed_ms:.0f}ms",
+                       extra={"stage": name, "stage_ms": round(elapsed_ms, 1)})
+        return None, elapsed_ms
+    if shortfalls:
+        logger.warning(f"[Orchestrator] Stage '{name}' ran out of time for {', '.join(sorted(set(shortfalls)))}",
+                       extra={"stage": name, "stage_ms": round(elapsed_ms, 1)})
+        return None, elapsed_ms
+    return result, elapsed_ms
+
+
+def _timed_out_hype(token: str) -> dict:
+    return {"token": token, "hype_score": None, "trending_volume": "Unknown", "degraded": True,
+            "details": {"error": "Timed out"}}
+
+
+def _timed_out_onchain(token: str) -> dict:
+    return {"token": token, "net_smart_money_flow": "Unknown", "whale_concentration": 0, "degraded": True,
+            "details": {"error": "Timed out"}}
+
+
+def _timed_out_verdict(hype_data: dict, onchain_data: dict) -> dict:
+    return {
+        "risk_level": "Unknown",
+        "verdict": "Incomplete",
+        "reasoning": "The analysis ran out of time before a verdict was reached.",
+        "reused": False,
+        "prompt_stats": None,
+        "input_summary": {
+            "hype_score": hype_data.get("hype_score"),
+            "smart_money_flow": onchain_data.get("net_smart_money_flow")
+        }
+    }
+
+
+async def run_analysis(listener, analyst, judge, token: str, deadline_ms: float = None) -> dict:
+    """
+    Runs the full Listener/Analyst -> Judge pipeline for a token.
+
+    Args:
+        deadline_ms: Optional time budget; stages still running when their share
+            of it is spent are dropped and the result is marked partial
+
+    Returns:
+        Dict with hype_data, onchain_data, verdict, per-stage timings (ms),
+        partial and missing_stages
+    """
+    start = time.perf_counter()
+    deadline = gather_deadline = None
+    if deadline_ms is not None:
+        now = time.monotonic()
+        deadline = now + deadline_ms / 1000
+        gather_deadline = now + deadline_ms * (1 - JUDGE_BUDGET_SHARE) / 1000
+
+    (hype_data, listener_ms), (onchain_data, analyst_ms) = await asyncio.gather(
+        _stage_or_timeout("listener", listener.analyze_sentiment, token, deadline=gather_deadline),
+        _stage_or_timeout("analyst", analyst.analyze_onchain_data, token, deadline=gather_deadline),
+    )
+    missing_stages = []
+    if hype_data is None:
+        missing_stages.append("listener")
+        hype_data = _timed_out_hype(token)
+    if onchain_data is None:
+        missing_stages.append("analyst")
+        onchain_data = _timed_out_onchain(token)
+
+    # With neither input there is nothing to judge; otherwise the Judge gets what finished
+    verdict, judge_ms = None, 0.0
+    if len(missing_stages) < 2:
+        verdict, judge_ms = await _stage_or_timeout(
+            "judge", judge.assess_risk, hype_data, onchain_data, deadline=deadline
+        )
+    if verdict is None:
+        missing_stages.append("judge")
+        verdict = _timed_out_verdict(hype_data, onchain_data)
+
+    total_ms = (time.perf_counter() - start) * 1000
+    timings = {
+        "listener_ms": round(listener_ms, 1),
+        "analyst_ms": round(analyst_ms, 1),
+        "judge_ms": round(judge_ms, 1),
+        "total_ms": round(total_ms, 1),
+    }
+    logger.info(f"[Orchestrator] Analysis for {token} finished in {total_ms:.0f}ms "
+                f"(listener={listener_ms:.0f}ms, analyst={analyst_ms:.0f}ms, judge={judge_ms:.0f}ms)"
+                + (f", missing {', '.join(missing_stages)}" if missing_stages else ""),
+                extra={"token": token, "timings": timings, "missing_stages": missing_stages})
+
+    return {
+        "hype_data": hype_data,
+        "onchain_data": onchain_data,
+        "verdict": verdict,
+        "timings": timings,
+        "partial": bool(missing_stages),
+        "missing_stages": missing_stages,
+    }
+
+
+async def stream_analysis(listener, analyst, judge, token: str, deadline_ms: float = None):
+    """
+    Runs the pipeline and yields each agent's output as soon as it is ready.
+
+    Yields event dicts in completion order: "onchain_analysis" and
+    "hype_analysis" (whichever finishes first), then "final_verdict", then a
+    closing "done" event. Each event carries stage_ms and elapsed_ms.
+
+    deadline_ms splits the budget like run_analysis. A stage that runs out of
+    time still gets its event, with the "Timed out" placeholder as data and
+    "timed_out": true, and the done event lists it in missing_stages.
+    """
+    start = time.perf_counter()
+    deadline = gather_deadline = None
+    if deadline_ms is not None:
+        now = time.monotonic()
+        deadline = now + deadline_ms / 1000
+        gather_deadline = now + deadline_ms * (1 - JUDGE_BUDGET_SHARE) / 1000
+
+    stages = {
+        "hype_analysis": ("listener", listener.analyze_sentiment, _timed_out_hype),
+        "onchain_analysis": ("analyst", analyst.analyze_onchain_data, _timed_out_onchain),
+    }
+    stage_names = {}
+    pending = set()
+    for name, (stage, func, _) in stages.items():
+        task = asyncio.create_task(_stage_or_timeout(stage, func, token, deadline=gather_deadline))
+        stage_names[task] = name
+        pending.add(task)
+
+    outputs = {}
+    timings = {}
+    missing_stages = []
+    try:
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                name = stage_names[task]
+                stage, _, placeholder = stages[name]
+                outputs[name], stage_ms = task.result()
+                timed_out = outputs[name] is None
+                if timed_out:
+                    missing_stages.append(stage)
+                    outputs[name] = placeholder(token)
+                timings[name] = round(stage_ms, 1)
+                yield {
+                    "event": name,
+                    "data": outputs[name],
+                    "stage_ms": timings[name],
+                    "elapsed_ms": round((time.perf_counter() - start) * 1000, 1),
+                    "timed_out": timed_out,
+                }
+    finally:
+        for task in pending:
+            task.cancel()
+
+    # With neither input there is nothing to judge; otherwise the Judge gets what finished
+    verdict, judge_ms = None, 0.0
+    if len(missing_stages) < 2:
+        verdict, judge_ms = await _stage_or_timeout(
+            "judge", judge.assess_risk, outputs["hype_analysis"], outputs["onchain_analysis"], deadline=deadline
+        )
+    if verdict is None:
+        missing_stages.append("judge")
+        verdict = _timed_out_verdict(outputs["hype_analysis"], outputs["onchain_analysis"])
+    yield {
+        "event": "final_verdict",
+        "data": verdict,
+        "stage_ms": round(judge_ms, 1),
+        "elapsed_ms": round((time.perf_counter() - start) * 1000, 1),
+        "timed_out": "judge" in missing_stages,
+    }
+
+    yield {
+        "event": "done",
+        "partial": bool(missing_stages),
+        "missing_stages": missing_stages,
+        "timings": {
+            "listener_ms": timings["hype_analysis"],
+            "analyst_ms": timings["onchain_analysis"],
+            "judge_ms": round(judge_ms, 1),
+            "total_ms": round((time.perf_counter() - start) * 1000, 1),
+        },
+    }
+
+
+def dedupe_tokens(tokens: list) -> list:
+    """Strips symbols and drops case-insensitive duplicates, keeping the first spelling."""
+    seen = set()
+    unique = []
+    for token in tokens:
+        token = token.strip()
+        if token and token.upper() not in seen:
+            seen.add(token.upper())
+            unique.append(token)
+    return unique
+
+
+async def run_batch_analysis(listener, analyst, judge, tokens: list, concurrency: int,
+                             deadline_ms: float = None) -> dict:
+    """
+    Runs the pipeline for many tokens with at most `concurrency` in flight.
+    Each token gets its own deadline_ms budget, starting when it leaves the queue.
+
+    Upstream work is shared through the agents' caches (DexScreener coalescing,
+    sentiment cache), so overlapping tokens do not repeat fetches.
+
+    Returns:
+        Dict mapping each token to its run_analysis result, or to the exception it raised
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def analyze_one(token: str):
+        async with semaphore:
+            try:
+                return await run_analysis(listener, analyst, judge, token, deadline_ms=deadline_ms)
+            except Exception as e:
+                return e
+
+    results = await asyncio.gather(*(analyze_one(token) for token in tokens))
+    return dict(zip(tokens, results))
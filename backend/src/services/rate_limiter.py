@@ -0,0 +1,251 @@
+"""
+Token-bucket rate limiting for upstream APIs.
+
+There is one bucket per (upstream, API key). Callers reserve a token and sleep
+until their slot comes up, instead of firing the request and getting a 429 or
+an Etherscan "rate limit reached" status. A reservation that would wait longer
+than the timeout raises RateLimitExceeded right away.
+
+Buckets live in memory (shared by all threads), or in SQLite when
+RATE_LIMIT_BACKEND=sqlite, so several worker processes on one host share them.
+"""
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from src.utils.logger import get_logger
+from src.utils.metrics import Counter, Histogram
+
+logger = get_logger(__name__)
+
+DATA_DIR = Path(__file__).parent.parent.parent / "data"
+
+# upstream -> (requests per second, burst capacity); RATE_LIMIT_<UPSTREAM>="rate:burst" overrides
+DEFAULT_LIMITS = {
+    "etherscan": (5.0, 5),
+    "dexscreener": (5.0, 10),
+    "reddit_rss": (1.0, 5),
+    "reddit_api": (1.0, 10),
+    "openai": (8.0, 16),
+    "gemini": (4.0, 8),
+}
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "1") != "0"
+RATE_LIMIT_MAX_WAIT = float(os.getenv("RATE_LIMIT_MAX_WAIT", "5"))
+RATE_LIMIT_BACKEND = os.getenv("RATE_LIMIT_BACKEND", "memory").lower()
+
+RATE_LIMIT_WAIT = Histogram(
+    "alphadiv_rate_limit_wait_seconds", "Time spent queued for rate-limit capacity.", ("upstream",),
+    buckets=(0.001, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+)
+RATE_LIMIT_REJECTED = Counter(
+    "alphadiv_rate_limit_rejected_total", "Calls rejected because the wait would exceed the timeout.", ("upstream",)
+)
+
+
+class RateLimitExceeded(Exception):
+    """Raised when capacity would not free up within the caller's timeout."""
+
+
+def _take(tokens: float, updated: float, now: float, rate: float, capacity: float):
+    """
+    Refills a bucket up to now and takes one token, allowing it to go negative.
+
+    Returns:
+        Tuple of (remaining tokens, seconds the caller must wait for its token)
+    """
+    tokens = min(capacity, tokens + max(0.0, now - updated) * rate) - 1
+    return tokens, max(0.0, -tokens / rate)
+
+
+class MemoryBucketStore:
+    """
+    Buckets in a dict; shared by every thread of this process.
+
+    A bucket that has refilled to capacity behaves exactly like a missing one,
+    so idle buckets are dropped once they are full again. Per-key buckets for
+    BYO keys therefore do not accumulate.
+    """
+    def __init__(self, sweep_interval: float = 60.0, clock=time.monotonic):
+        """
+        Args:
+            sweep_interval: Seconds between sweeps for refilled buckets
+            clock: Monotonic time source in seconds
+        """
+        self.sweep_interval = sweep_interval
+        self.clock = clock
+        self._buckets = {}  # key -> (tokens, updated, full_at)
+        self._lock = threading.Lock()
+        self._next_sweep = clock() + sweep_interval
+
+    def reserve(self, key: str, rate: float, capacity: float, max_wait: float):
+        """Returns the wait for a reserved token, or None (nothing reserved) if over max_wait."""
+        now = self.clock()
+        with self._lock:
+            if now >= self._next_sweep:
+                self._sweep(now)
+            tokens, updated, _ = self._buckets.get(key, (capacity, now, now))
+            tokens, wait = _take(tokens, updated, now, rate, capacity)
+            if wait > max_wait:
+                return None
+            self._buckets[key] = (tokens, now, now + (capacity - tokens) / rate)
+        return wait
+
+    def _sweep(self, now: float):
+        """Drops buckets that have refilled to capacity. Caller holds the lock."""
+        self._buckets = {key: bucket for key, bucket in self._buckets.items() if bucket[2] > now}
+        self._next_sweep = now + self.sweep_interval
+
+    def size(self) -> int:
+        """Number of buckets currently held."""
+        with self._lock:
+            return len(self._buckets)
+
+
+class SQLiteBucketStore:
+    """Buckets in a SQLite file, so worker processes on one host share them."""
+    def __init__(self, path: str):
+        self.path = str(path)
+        if self.path != ":memory:":
+            Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        # Autocommit mode; reservations use explicit BEGIN IMMEDIATE transactions
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None, timeout=5)
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS buckets (
+                    key TEXT PRIMARY KEY,
+                    tokens REAL NOT NULL,
+                    updated REAL NOT NULL
+                )
+            """)
+
+    def reserve(self, key: str, rate: float, capacity: float, max_wait: float):
+        """Returns the wait for a reserved token, or None (nothing reserved) if over max_wait."""
+        with self._lock:
+            # Takes the write lock up front so concurrent processes serialize on the bucket
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                now = time.time()  # Wall clock: monotonic clocks are not comparable across processes
+                row = self._conn.execute("SELECT tokens, updated FROM buckets WHERE key = ?", (key,)).fetchone()
+                tokens, updated = row if row else (capacity, now)
+                tokens, wait = _take(tokens, updated, now, rate, capacity)
+                if wait > max_wait:
+                    self._conn.execute("ROLLBACK")
+                    return None
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO buckets (key, tokens, updated) VALUES (?, ?, ?)", (key, tokens, now)
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return wait
+
+
+def _parse_limit(value: str):
+    rate, _, burst = value.partition(":")
+    rate = float(rate)
+    return rate, float(burst) if burst else max(1.0, rate)
+
+
+def limits_from_env() -> dict:
+    """DEFAULT_LIMITS with RATE_LIMIT_<UPSTREAM> overrides applied ("0" disables an upstream)."""
+    limits = dict(DEFAULT_LIMITS)
+    for name, value in os.environ.items():
+        suffix = name[len("RATE_LIMIT_"):]
+        if not name.startswith("RATE_LIMIT_") or suffix in ("ENABLED", "MAX_WAIT", "BACKEND", "DB_PATH"):
+            continue
+        try:
+            limits[suffix.lower()] = _parse_limit(value)
+        except ValueError:
+            logger.warning(f"[RateLimiter] Ignoring malformed {name}={value!r}")
+    return {upstream: limit for upstream, limit in limits.items() if limit[0] > 0}
+
+
+class RateLimiter:
+    def __init__(self, limits: dict, store=None, max_wait: float = RATE_LIMIT_MAX_WAIT, sleep=time.sleep):
+        """
+        Args:
+            limits: upstream -> (requests per second, burst capacity); others are unlimited
+            store: MemoryBucketStore (default) or SQLiteBucketStore
+            max_wait: Default longest time a caller queues before RateLimitExceeded
+            sleep: Called with the seconds a caller must queue for its token
+        """
+        self.limits = limits
+        self.store = store or MemoryBucketStore()
+        self.max_wait = max_wait
+        self.sleep = sleep
+        self._stats = {}
+        self._stats_lock = threading.Lock()
+
+    @staticmethod
+    def key_id(api_key: str) -> str:
+        """Short hash identifying an API key in bucket names, never the key itself."""
+        return hashlib.sha256((api_key or "").encode("utf-8")).hexdigest()[:16]
+
+    def acquire(self, upstream: str, api_key: str = None, timeout: float = None) -> float:
+        """
+        Blocks until the (upstream, api_key) bucket has capacity.
+
+        Returns:
+            Seconds spent waiting (0.0 for unlimited upstreams)
+
+        Raises:
+            RateLimitExceeded: if the wait would exceed timeout (or max_wait)
+        """
+        limit = self.limits.get(upstream)
+        if limit is None:
+            return 0.0
+        rate, capacity = limit
+        timeout = self.max_wait if timeout is None else timeout
+
+        wait = self.store.reserve(f"{upstream}:{self.key_id(api_key)}", rate, capacity, timeout)
+        if wait is None:
+            self._record(upstream, 0.0, rejected=True)
+            RATE_LIMIT_REJECTED.inc(upstream=upstream)
+            raise RateLimitExceeded(f"{upstream} rate limit: no capacity within {timeout:.1f}s")
+
+        if wait > 0:
+            if wait > 0.25:
+                logger.info(f"[RateLimiter] Queued {wait * 1000:.0f}ms for {upstream} capacity")
+            self.sleep(wait)
+        self._record(upstream, wait)
+        RATE_LIMIT_WAIT.observe(wait, upstream=upstream)
+        return wait
+
+    def _record(self, upstream: str, wait: float, rejected: bool = False):
+        with self._stats_lock:
+            stats = self._stats.setdefault(upstream, {"acquired": 0, "delayed": 0, "rejected": 0,
+                                                      "total_wait_s": 0.0, "max_wait_s": 0.0})
+            if rejected:
+                stats["rejected"] += 1
+                return
+            stats["acquired"] += 1
+            if wait > 0:
+                stats["delayed"] += 1
+                stats["total_wait_s"] += wait
+                stats["max_wait_s"] = max(stats["max_wait_s"], wait)
+
+    def stats(self) -> dict:
+        """Per upstream: calls acquired, delayed and rejected, plus total and max wait."""
+        with self._stats_lock:
+            return {
+                upstream: {**s, "total_wait_s": round(s["total_wait_s"], 3), "max_wait_s": round(s["max_wait_s"], 3)}
+                for upstream, s in self._stats.items()
+            }
+
+
+def _create_rate_limiter() -> RateLimiter:
+    if not RATE_LIMIT_ENABLED:
+        return RateLimiter({})
+    store = None
+    if RATE_LIMIT_BACKEND == "sqlite":
+        store = SQLiteBucketStore(os.getenv("RATE_LIMIT_DB_PATH", str(DATA_DIR / "rate_limits.sqlite3")))
+    return RateLimiter(limits_from_env(), store=store)
+
+
+# Process-wide limiter shared by the HTTP client and LLMService
+rate_limiter = _create_rate_limiter()
@@ -0,0 +1,322 @@
+"""
+Local index of token mentions in the tracked crypto subreddits.
+
+A background worker polls the newest submissions of SUBREDDITS (through the
+Reddit API when credentials are configured, otherwise the /new RSS feed) and
+scores each new post once with the local sentiment lexicon. It then writes the
+post to a SQLite inverted index keyed by its symbol-like terms: cashtags
+($pepe), all-caps tokens (PEPE, 1INCH) and words the symbol index already
+resolved to a DEX pair, so ordinary words never become terms. The Listener looks a token up in milliseconds instead of running a
+live search; live search is only the fallback for tokens with too few
+indexed mentions.
+"""
+import asyncio
+import os
+import random
+import re
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from src.services.lexicon_sentiment import lexicon_sentiment
+from src.services.rate_limiter import rate_limiter
+from src.services.reddit_rss import fetch_feed, REDDIT_BASE_URL, RSS_USER_AGENT, SUBREDDITS
+from src.services.symbol_index import SymbolIndex, symbol_index
+from src.utils.logger import get_logger
+from src.utils.metrics import upstream_span
+
+logger = get_logger(__name__)
+
+DATA_DIR = Path(__file__).parent.parent.parent / "data"
+
+REDDIT_INGEST_ENABLED = os.getenv("REDDIT_INGEST_ENABLED", "0") == "1"
+# Mentions older than this are pruned and never returned (matches the live search's time_filter="week")
+REDDIT_INDEX_RETENTION = float(os.getenv("REDDIT_INDEX_RETENTION", str(7 * 24 * 3600)))
+# Fewer indexed mentions than this and the Listener falls back to a live search
+REDDIT_INDEX_MIN_POSTS = int(os.getenv("REDDIT_INDEX_MIN_POSTS", "3"))
+
+# Terms are 2-12 letters/digits with at least one letter, so prices and years are not terms
+_CASHTAG = re.compile(r"\$((?=[A-Za-z0-9]*[A-Za-z])[A-Za-z0-9]{2,12})\b")
+_CAPS_TERM = re.compile(r"\b(?=[A-Z0-9]*[A-Z])[A-Z0-9]{2,12}\b")
+_WORD = re.compile(r"\b[A-Za-z0-9]{2,12}\b")
+# Body text indexed per post; tokens are named near the top of a post
+INDEXED_SELFTEXT_CHARS = 2000
+NEW_POSTS_LIMIT = 100
+
+
+def extract_terms(text: str, known_symbols: frozenset = frozenset()) -> set:
+    """
+    Upper-cased symbol-like terms in a text: cashtags, all-caps tokens, and
+    words of any case found in known_symbols ("$pepe" and "PEPE" both give "PEPE").
+    """
+    text = text or ""
+    terms = {term.upper() for term in _CASHTAG.findall(text)}
+    terms.update(_CAPS_TERM.findall(text))
+    if known_symbols:
+        terms.update(word.upper() for word in _WORD.findall(text) if word.upper() in known_symbols)
+    return terms
+
+
+def post_text(post: dict) -> str:
+    """The text the Listener scores for a post (title plus the start of the body)."""
+    return f"{post['title']} {post.get('selftext', '')[:200]}"
+
+
+class RedditMentionIndex:
+    def __init__(self, path: str, symbols: SymbolIndex = None):
+        """
+        Args:
+            path: SQLite database path, or ":memory:"
+            symbols: Index whose resolved symbols are indexed in any case (defaults to the process-wide one)
+        """
+        self.path = str(path)
+        self.symbol_index = symbols if symbols is not None else symbol_index
+        self._lock = threading.Lock()
+        self._counters = {"searches": 0, "hits": 0}
+
+        if self.path != ":memory:":
+            Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS posts (
+                    id TEXT PRIMARY KEY,
+                    title TEXT NOT NULL,
+                    url TEXT,
+                    score INTEGER NOT NULL,
+                    selftext TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    sentiment_score REAL NOT NULL,
+                    sentiment_label TEXT NOT NULL,
+                    confidence REAL NOT NULL
+                )
+            """)
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_posts_created ON posts (created_at)")
+            # The inverted index: newest mentions of a term come first in key order
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS mentions (
+                    term TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    post_id TEXT NOT NULL,
+                    PRIMARY KEY (term, created_at, post_id)
+                ) WITHOUT ROWID
+            """)
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_mentions_created ON mentions (created_at)")
+            self._conn.commit()
+
+    def known_ids(self, ids: list) -> set:
+        """Returns which of the given post IDs are already indexed."""
+        if not ids:
+            return set()
+        placeholders = ",".join("?" * len(ids))
+        with self._lock:
+            rows = self._conn.execute(f"SELECT id FROM posts WHERE id IN ({placeholders})", ids).fetchall()
+        return {row[0] for row in rows}
+
+    def add_posts(self, posts: list) -> int:
+        """
+        Scores and indexes the posts not seen before; already indexed posts only get their score updated.
+
+        Args:
+            posts: Dicts with id, title, url, score, selftext and created_at (epoch seconds)
+
+        Returns:
+            Number of posts that were new to the index
+        """
+        known = self.known_ids([post["id"] for post in posts])
+        new_posts = [post for post in posts if post["id"] not in known]
+        # Sentiment is computed once per post here, never again at query time
+        analyses = lexicon_sentiment([post_text(post) for post in new_posts]) if new_posts else []
+        known_symbols = self.symbol_index.symbols()
+        post_rows, mention_rows = [], []
+        for post, analysis in zip(new_posts, analyses):
+            post_rows.append((
+                post["id"], post["title"], post["url"], post["score"], post["selftext"], post["created_at"],
+                analysis["sentiment_score"], analysis["sentiment_label"], analysis["confidence"],
+            ))
+            text = f"{post['title']} {post['selftext'][:INDEXED_SELFTEXT_CHARS]}"
+            for term in extract_terms(text, known_symbols):
+                mention_rows.append((term, post["created_at"], post["id"]))
+        score_rows = [(post["score"], post["id"]) for post in posts if post["id"] in known]
+
+        with self._lock:
+            self._conn.executemany("INSERT OR IGNORE INTO posts VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", post_rows)
+            self._conn.executemany("INSERT OR IGNORE INTO mentions VALUES (?, ?, ?)", mention_rows)
+            self._conn.executemany("UPDATE posts SET score = ? WHERE id = ?", score_rows)
+            self._conn.commit()
+        return len(post_rows)
+
+    def search(self, symbol: str, limit: int = 10, max_age: float = REDDIT_INDEX_RETENTION) -> list:
+        """
+        Returns the newest indexed posts mentioning a symbol, each with its precomputed "sentiment".
+        """
+        term = symbol.strip().lstrip("$").upper()
+        with self._lock:
+            self._counters["searches"] += 1
+            rows = self._conn.execute("""
+                SELECT p.id, p.title, p.url, p.score, p.selftext, p.created_at,
+                       p.sentiment_score, p.sentiment_label, p.confidence
+                FROM mentions m JOIN posts p ON p.id = m.post_id
+                WHERE m.term = ? AND m.created_at >= ?
+                ORDER BY m.created_at DESC
+                LIMIT ?
+            """, (term, time.time() - max_age, limit)).fetchall()
+            if rows:
+                self._counters["hits"] += 1
+        return [
+            {
+                "id": row[0], "title": row[1], "url": row[2], "score": row[3], "selftext": row[4],
+                "created_at": row[5],
+                "sentiment": {"sentiment_score": row[6], "sentiment_label": row[7], "confidence": row[8]},
+            }
+            for row in rows
+        ]
+
+    def prune(self, max_age: float = REDDIT_INDEX_RETENTION) -> int:
+        """Deletes posts and mentions older than max_age seconds; returns the number of posts removed."""
+        cutoff = time.time() - max_age
+        with self._lock:
+            self._conn.execute("DELETE FROM mentions WHERE created_at < ?", (cutoff,))
+            cursor = self._conn.execute("DELETE FROM posts WHERE created_at < ?", (cutoff,))
+            self._conn.commit()
+        return cursor.rowcount
+
+    def stats(self) -> dict:
+        with self._lock:
+            posts = self._conn.execute("SELECT COUNT(*) FROM posts").fetchone()[0]
+            return {**self._counters, "posts": posts}
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_reddit_index():
+    """
+    Returns the process-wide mention index (REDDIT_INDEX_PATH), or None when
+    ingestion is disabled, since nothing would keep the index current.
+    """
+    global _index
+    if not REDDIT_INGEST_ENABLED:
+        return None
+    with _index_lock:
+        if _index is None:
+            _index = RedditMentionIndex(os.getenv("REDDIT_INDEX_PATH", str(DATA_DIR / "reddit_index.sqlite3")))
+    return _index
+
+
+def _parse_published(value: str) -> float:
+    try:
+        return datetime.fromisoformat(value).timestamp()
+    except (TypeError, ValueError):
+        return time.time()
+
+
+class RedditIngestor:
+    def __init__(self, index: RedditMentionIndex, reddit_factory=None, interval: float = 60,
+                 jitter: float = 0.1):
+        """
+        Args:
+            index: Index the new posts are written to
+            reddit_factory: Callable returning a praw.Reddit client, or None to poll RSS
+            interval: Seconds between polls of the newest submissions
+            jitter: Random fraction (+/-) applied to every sleep
+        """
+        self.index = index
+        self.reddit_factory = reddit_factory
+        self.interval = interval
+        self.jitter = jitter
+        self._reddit = None
+        self._task = None
+        self._counters = {"polls": 0, "poll_errors": 0, "posts_added": 0, "last_poll_at": None}
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None
+
+    async def start(self):
+        """Starts the polling loop."""
+        if self.running:
+            return
+        if self.reddit_factory:
+            self._reddit = await asyncio.to_thread(self.reddit_factory)
+        self._task = asyncio.create_task(self._poll_loop())
+        source = "Reddit API" if self._reddit else "RSS"
+        logger.info(f"[RedditIngestor] Following {len(SUBREDDITS)} subreddits via {source} every {self.interval:.0f}s")
+
+    async def stop(self):
+        """Cancels the polling loop."""
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _poll_loop(self):
+        while True:
+            try:
+                await asyncio.to_thread(self.ingest_once)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self._counters["poll_errors"] += 1
+                logger.error(f"[RedditIngestor] Poll failed: {e}")
+            await asyncio.sleep(max(0.0, self.interval * (1 + random.uniform(-self.jitter, self.jitter))))
+
+    def _fetch_new(self) -> list:
+        """Returns the newest submissions across SUBREDDITS as post dicts with id and created_at."""
+        subreddits = "+".join(SUBREDDITS)
+        if self._reddit:
+            rate_limiter.acquire("reddit_api", self._reddit.config.client_id)
+            with upstream_span("reddit_api"):
+                return [
+                    {"id": submission.name, "title": submission.title, "url": submission.url,
+                     "score": submission.score, "selftext": submission.selftext or "",
+                     "created_at": float(submission.created_utc)}
+                    for submission in self._reddit.subreddit(subreddits).new(limit=NEW_POSTS_LIMIT)
+                ]
+
+        posts = fetch_feed(f"{REDDIT_BASE_URL}/r/{subreddits}/new.rss?limit={NEW_POSTS_LIMIT}", limit=NEW_POSTS_LIMIT,
+                           headers={"User-Agent": RSS_USER_AGENT})
+        return [
+            {**post, "id": post.get("id") or post["url"], "created_at": _parse_published(post.get("published"))}
+            for post in posts or []
+        ]
+
+    def ingest_once(self) -> int:
+        """
+        Polls once, indexes the posts not seen before, refreshes the scores of
+        the known ones, and prunes old mentions.
+
+        Returns:
+            Number of newly indexed posts
+        """
+        posts = self._fetch_new()
+        added = self.index.add_posts(posts) if posts else 0
+        pruned = self.index.prune()
+
+        self._counters["polls"] += 1
+        self._counters["posts_added"] += added
+        self._counters["last_poll_at"] = time.time()
+        logger.info(f"[RedditIngestor] Indexed {added} new posts ({len(posts)} polled, {pruned} pruned)")
+        return added
+
+    def stats(self) -> dict:
+        return {**self._counters, **self.index.stats()}
+
+
+def create_reddit_ingestor_from_env(reddit_factory=None):
+    """
+    Builds the ingestion worker from REDDIT_INGEST_* environment variables, or
+    returns None unless REDDIT_INGEST_ENABLED=1.
+    """
+    index = get_reddit_index()
+    if index is None:
+        return None
+    return RedditIngestor(
+        index=index,
+        reddit_factory=reddit_factory,
+        interval=float(os.getenv("REDDIT_INGEST_INTERVAL", "60")),
+    )
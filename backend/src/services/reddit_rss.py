@@ -0,0 +1,197 @@
+"""
+Incremental Reddit Atom feed parsing with conditional GETs.
+
+The feed body is streamed into an XMLPullParser, and parsing stops as soon as
+enough entries are complete. Each entry's HTML content is reduced to the post's
+body text. The ETag and Last-Modified of every feed URL are remembered with
+its parsed posts. A repeat poll sends them back, and a 304 Not Modified
+returns the cached posts without downloading or parsing anything.
+"""
+import html
+import os
+import re
+import threading
+import xml.etree.ElementTree as ET
+from collections import OrderedDict
+from src.services.http_client import http_get
+from src.utils.logger import get_logger
+from src.utils.metrics import Counter
+
+logger = get_logger(__name__)
+
+# Overridable so benchmarks can point Reddit traffic at a local stub
+REDDIT_BASE_URL = os.getenv("REDDIT_BASE_URL", "https://www.reddit.com").rstrip("/")
+# Crypto subreddits searched by the Listener and followed by the ingestion worker
+SUBREDDITS = (
+    "CryptoMoonShots", "SatoshiStreetBets", "Cryptocurrency", "Solana",
+    "ethtrader", "defi", "altcoin", "memecoin", "basechain", "bnb"
+)
+# Reddit rejects RSS requests without a browser-like User-Agent
+RSS_USER_AGENT = ("Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 "
+                  "(KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36")
+RSS_FEED_CACHE_SIZE = int(os.getenv("RSS_FEED_CACHE_SIZE", "512"))
+# Body text kept per post; sentiment only looks at the first few hundred characters
+RSS_SELFTEXT_MAX_CHARS = int(os.getenv("RSS_SELFTEXT_MAX_CHARS", "2000"))
+# RSS carries no vote counts, so every post gets the same nominal score
+RSS_PLACEHOLDER_SCORE = 10
+
+ATOM = "{http://www.w3.org/2005/Atom}"
+CHUNK_SIZE = 16 * 1024
+# Unread bytes left after the last needed entry that are still read so the
+# connection can return to the pool; anything larger closes the connection
+DRAIN_LIMIT = 64 * 1024
+
+# Self posts wrap their markdown-rendered body in <div class="md">; link posts have none
+_BODY_PATTERN = re.compile(r'<div class="md">(.*?)</div>', re.S)
+_TAG_PATTERN = re.compile(r"<[^>]+>")
+_SPACE_PATTERN = re.compile(r"\s+")
+
+RSS_RESPONSES = Counter(
+    "alphadiv_reddit_rss_responses_total", "Reddit RSS polls by result (fetched or not_modified).", ("result",)
+)
+
+
+def extract_body(content_html: str) -> str:
+    """Returns the plain body text of a self post from an entry's HTML content."""
+    match = _BODY_PATTERN.search(content_html or "")
+    if not match:
+        return ""
+    text = html.unescape(_TAG_PATTERN.sub(" ", match.group(1)))
+    return _SPACE_PATTERN.sub(" ", text).strip()[:RSS_SELFTEXT_MAX_CHARS]
+
+
+def _entry_to_post(entry: ET.Element) -> dict:
+    link = entry.find(f"{ATOM}link")
+    return {
+        "id": entry.findtext(f"{ATOM}id"),
+        "title": (entry.findtext(f"{ATOM}title") or "").strip(),
+        "url": link.get("href") if link is not None else None,
+        "score": RSS_PLACEHOLDER_SCORE,
+        "selftext": extract_body(entry.findtext(f"{ATOM}content")),
+        "author": entry.findtext(f"{ATOM}author/{ATOM}name"),
+        "published": entry.findtext(f"{ATOM}published") or entry.findtext(f"{ATOM}updated"),
+    }
+
+
+def parse_feed(chunks, limit: int) -> list:
+    """
+    Parses Atom entries from an iterable of byte chunks, consuming only what is needed.
+
+    Stops reading chunks as soon as `limit` entries are complete, and clears
+    each parsed entry so memory stays flat however long the feed is.
+    """
+    parser = ET.XMLPullParser(events=("end",))
+    posts = []
+    for chunk in chunks:
+        parser.feed(chunk)
+        for _, element in parser.read_events():
+            if element.tag != f"{ATOM}entry":
+                continue
+            posts.append(_entry_to_post(element))
+            element.clear()
+            if len(posts) >= limit:
+                return posts
+    return posts
+
+
+class RedditFeedCache:
+    """Validators (ETag, Last-Modified) and parsed posts per feed URL, least-recently-used first out."""
+    def __init__(self, max_entries: int = RSS_FEED_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # url -> (etag, last_modified, posts)
+        self._lock = threading.Lock()
+        self._counters = {"fetched": 0, "not_modified": 0}
+
+    def conditional_headers(self, url: str) -> dict:
+        with self._lock:
+            entry = self._entries.get(url)
+        if entry is None:
+            return {}
+        etag, last_modified, _ = entry
+        headers = {}
+        if etag:
+            headers["If-None-Match"] = etag
+        if last_modified:
+            headers["If-Modified-Since"] = last_modified
+        return headers
+
+    def store(self, url: str, etag: str, last_modified: str, posts: list):
+        with self._lock:
+            self._counters["fetched"] += 1
+            if not (etag or last_modified):
+                # Nothing to revalidate with, so there is no point keeping the posts
+                self._entries.pop(url, None)
+                return
+            self._entries[url] = (etag, last_modified, posts)
+            self._entries.move_to_end(url)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def not_modified(self, url: str):
+        """Returns a copy of the cached posts for a 304, or None if they were evicted meanwhile."""
+        with self._lock:
+            entry = self._entries.get(url)
+            if entry is None:
+                return None
+            self._counters["not_modified"] += 1
+            self._entries.move_to_end(url)
+            return [dict(post) for post in entry[2]]
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {**self._counters, "feeds": len(self._entries)}
+
+
+def _release(response):
+    """Reads a short unread remainder so the keep-alive connection is reused, else closes it."""
+    try:
+        drained = 0
+        for chunk in response.iter_content(CHUNK_SIZE):
+            drained += len(chunk)
+            if drained > DRAIN_LIMIT:
+                break
+    except Exception:
+        pass
+    finally:
+        response.close()
+
+
+def fetch_feed(url: str, limit: int, headers: dict = None, cache: RedditFeedCache = None):
+    """
+    Fetches and parses a Reddit Atom feed, revalidating against the cached copy.
+
+    Returns:
+        List of post dicts (id, title, url, score, selftext, author, published),
+        or None if Reddit answered with an error status
+    """
+    cache = cache or feed_cache
+    request_headers = {**(headers or {}), **cache.conditional_headers(url)}
+    response = http_get(url, upstream="reddit_rss", headers=request_headers, stream=True)
+
+    if response.status_code == 304:
+        response.close()
+        posts = cache.not_modified(url)
+        if posts is not None:
+            RSS_RESPONSES.inc(result="not_modified")
+            logger.info(f"[RedditRSS] Feed not modified, reusing {len(posts)} cached posts")
+            return posts
+        # The cached copy was evicted between request and response: fetch unconditionally
+        response = http_get(url, upstream="reddit_rss", headers=headers, stream=True)
+
+    if response.status_code != 200:
+        response.close()
+        logger.warning(f"[RedditRSS] Feed fetch failed: {response.status_code}")
+        return None
+
+    try:
+        posts = parse_feed(response.iter_content(CHUNK_SIZE), limit)
+    finally:
+        _release(response)
+
+    RSS_RESPONSES.inc(result="fetched")
+    cache.store(url, response.headers.get("ETag"), response.headers.get("Last-Modified"), posts)
+    return [dict(post) for post in posts]
+
+
+# Process-wide cache shared by all Listener instances
+feed_cache = RedditFeedCache()
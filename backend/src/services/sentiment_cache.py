@@ -0,0 +1,189 @@
+"""
+Persistent, content-addressed cache for per-post sentiment results.
+
+Entries are keyed by a SHA-256 hash of the post text plus the LLM provider and
+model, stored in SQLite, expired after a TTL and evicted least-recently-used
+once the table grows past its size limit.
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from src.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+DATA_DIR = Path(__file__).parent.parent.parent / "data"
+# After a failed open, the cache is skipped quietly for this long before the next attempt
+OPEN_RETRY_SECONDS = 300
+
+
+class SentimentCache:
+    def __init__(self, path: str, max_entries: int = 50000, ttl_seconds: int = 7 * 24 * 3600):
+        self.path = str(path)
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+
+        if self.path != ":memory:":
+            Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS sentiment_cache (
+                    key TEXT PRIMARY KEY,
+                    value TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    last_access REAL NOT NULL
+                )
+            """)
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_sentiment_cache_last_access ON sentiment_cache (last_access)"
+            )
+            self._conn.commit()
+
+    @staticmethod
+    def make_key(text: str, provider: str, model: str) -> str:
+        """Builds the content-addressed cache key for a post."""
+        digest = hashlib.sha256()
+        for part in (provider or "", model or "", text or ""):
+            digest.update(part.encode("utf-8"))
+            digest.update(b"\x00")
+        return digest.hexdigest()
+
+    def get_many(self, keys: list) -> dict:
+        """
+        Looks up several keys at once.
+
+        Returns:
+            Dict mapping each cached (and unexpired) key to its stored result
+        """
+        if not keys:
+            return {}
+
+        now = time.time()
+        unique_keys = list(dict.fromkeys(keys))
+        placeholders = ",".join("?" for _ in unique_keys)
+
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT key, value, created_at FROM sentiment_cache WHERE key IN ({placeholders})",
+                unique_keys
+            ).fetchall()
+
+            found = {}
+            expired = []
+            for key, value, created_at in rows:
+                if now - created_at > self.ttl_seconds:
+                    expired.append((key,))
+                else:
+                    found[key] = json.loads(value)
+
+            if expired:
+                self._conn.executemany("DELETE FROM sentiment_cache WHERE key = ?", expired)
+            if found:
+                self._conn.executemany(
+                    "UPDATE sentiment_cache SET last_access = ? WHERE key = ?",
+                    [(now, key) for key in found]
+                )
+            self._conn.commit()
+
+            self.hits += sum(1 for key in keys if key in found)
+            self.misses += sum(1 for key in keys if key not in found)
+
+        return found
+
+    def get(self, key: str):
+        """Returns the cached result for a key, or None on a miss."""
+        return self.get_many([key]).get(key)
+
+    def set_many(self, items: dict):
+        """Stores several key -> result pairs and evicts LRU entries if needed."""
+        if not items:
+            return
+
+        now = time.time()
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO sentiment_cache (key, value, created_at, last_access) VALUES (?, ?, ?, ?)",
+                [(key, json.dumps(value), now, now) for key, value in items.items()]
+            )
+            self._evict_locked()
+            self._conn.commit()
+
+    def set(self, key: str, value: dict):
+        """Stores a single result."""
+        self.set_many({key: value})
+
+    def _evict_locked(self):
+        count = self._conn.execute("SELECT COUNT(*) FROM sentiment_cache").fetchone()[0]
+        overflow = count - self.max_entries
+        if overflow > 0:
+            self._conn.execute(
+                "DELETE FROM sentiment_cache WHERE key IN "
+                "(SELECT key FROM sentiment_cache ORDER BY last_access ASC LIMIT ?)",
+                (overflow,)
+            )
+            self.evictions += overflow
+
+    def clear(self):
+        """Removes every cached entry and resets the counters."""
+        with self._lock:
+            self._conn.execute("DELETE FROM sentiment_cache")
+            self._conn.commit()
+            self.hits = self.misses = self.evictions = 0
+
+    def stats(self) -> dict:
+        """Returns hit/miss counters and the current number of entries."""
+        with self._lock:
+            size = self._conn.execute("SELECT COUNT(*) FROM sentiment_cache").fetchone()[0]
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": round(self.hits / lookups, 3) if lookups else 0.0,
+            "entries": size,
+        }
+
+
+_cache = None
+_cache_lock = threading.Lock()
+_open_failed_at = None
+
+
+def get_sentiment_cache():
+    """
+    Returns the process-wide sentiment cache, or None if it is disabled.
+
+    Configured via SENTIMENT_CACHE_ENABLED, SENTIMENT_CACHE_PATH,
+    SENTIMENT_CACHE_MAX_ENTRIES and SENTIMENT_CACHE_TTL (seconds).
+    """
+    global _cache, _open_failed_at
+    if os.getenv("SENTIMENT_CACHE_ENABLED", "1") == "0":
+        return None
+
+    with _cache_lock:
+        if _cache is None:
+            if _open_failed_at is not None and time.monotonic() - _open_failed_at < OPEN_RETRY_SECONDS:
+                return None
+            try:
+                _cache = SentimentCache(
+                    path=os.getenv("SENTIMENT_CACHE_PATH", str(DATA_DIR / "sentiment_cache.sqlite3")),
+                    max_entries=int(os.getenv("SENTIMENT_CACHE_MAX_ENTRIES", "50000")),
+                    ttl_seconds=int(os.getenv("SENTIMENT_CACHE_TTL", str(7 * 24 * 3600))),
+                )
+            except Exception as e:
+                _open_failed_at = time.monotonic()
+                logger.error(f"[SentimentCache] Failed to open cache, continuing without it for "
+                             f"{OPEN_RETRY_SECONDS}s: {e}")
+                return None
+    return _cache
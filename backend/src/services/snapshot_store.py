@@ -0,0 +1,164 @@
+"""
+Append-only local time-series store of on-chain market snapshots.
+
+Every DexScreener view the Analyst computes is recorded per token and pair in
+SQLite, clustered by (token, pair, timestamp) so range lookups are a single
+index seek. The Analyst uses it to report price/liquidity deltas over fixed
+windows without extra upstream calls.
+"""
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from src.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+DATA_DIR = Path(__file__).parent.parent.parent / "data"
+
+DELTA_WINDOWS = {"1h": 3600, "6h": 6 * 3600, "24h": 24 * 3600}
+SNAPSHOT_FIELDS = ("price", "liquidity", "volume_24h", "fdv", "buys_24h", "sells_24h")
+
+
+def _pct_change(old, new):
+    if not old:
+        return None
+    return round((new - old) / old * 100, 2)
+
+
+class SnapshotStore:
+    def __init__(self, path: str, min_interval_seconds: int = 300,
+                 retention_seconds: int = 180 * 24 * 3600, cache_kib: int = 2048):
+        """
+        Args:
+            path: SQLite file path (":memory:" for tests)
+            min_interval_seconds: Snapshots closer together than this for the
+                same pair are skipped, which bounds storage per token
+            retention_seconds: Snapshots older than this are pruned
+            cache_kib: SQLite page cache budget, keeps memory flat as data grows
+        """
+        self.path = str(path)
+        self.min_interval_seconds = min_interval_seconds
+        self.retention_seconds = retention_seconds
+        self._lock = threading.Lock()
+        self._last_prune = 0.0
+
+        if self.path != ":memory:":
+            Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute(f"PRAGMA cache_size=-{int(cache_kib)}")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS snapshots (
+                    token TEXT NOT NULL,
+                    pair_address TEXT NOT NULL,
+                    ts INTEGER NOT NULL,
+                    chain_id TEXT,
+                    price REAL,
+                    liquidity REAL,
+                    volume_24h REAL,
+                    fdv REAL,
+                    buys_24h INTEGER,
+                    sells_24h INTEGER,
+                    PRIMARY KEY (token, pair_address, ts)
+                ) WITHOUT ROWID
+            """)
+            self._conn.commit()
+
+    def record(self, token: str, dex_data: dict, ts: int = None) -> bool:
+        """
+        Appends a snapshot built from the Analyst's DexScreener view.
+
+        Returns:
+            True if stored, False if skipped because the last one is too recent
+        """
+        ts = int(ts if ts is not None else time.time())
+        token = token.upper()
+        pair_address = dex_data.get("pair_address") or ""
+        txns = dex_data.get("txns_24h") or {}
+
+        with self._lock:
+            last = self._conn.execute(
+                "SELECT MAX(ts) FROM snapshots WHERE token = ? AND pair_address = ?",
+                (token, pair_address)
+            ).fetchone()[0]
+            if last is not None and ts - last < self.min_interval_seconds:
+                return False
+
+            self._conn.execute(
+                "INSERT OR REPLACE INTO snapshots "
+                "(token, pair_address, ts, chain_id, price, liquidity, volume_24h, fdv, buys_24h, sells_24h) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (token, pair_address, ts, dex_data.get("chain_id"), dex_data.get("price_usd"),
+                 dex_data.get("liquidity_usd"), dex_data.get("volume_24h"), dex_data.get("fdv"),
+                 txns.get("buys"), txns.get("sells"))
+            )
+            if time.time() - self._last_prune > 3600:
+                self._conn.execute("DELETE FROM snapshots WHERE ts < ?", (ts - self.retention_seconds,))
+                self._last_prune = time.time()
+            self._conn.commit()
+        return True
+
+    def range(self, token: str, pair_address: str, start_ts: int, end_ts: int) -> list:
+        """Returns snapshots for a pair with start_ts <= ts <= end_ts, oldest first."""
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT ts, {', '.join(SNAPSHOT_FIELDS)} FROM snapshots "
+                "WHERE token = ? AND pair_address = ? AND ts BETWEEN ? AND ? ORDER BY ts",
+                (token.upper(), pair_address or "", start_ts, end_ts)
+            ).fetchall()
+        return [dict(zip(("ts",) + SNAPSHOT_FIELDS, row)) for row in rows]
+
+    def latest_at_or_before(self, token: str, pair_address: str, ts: int, tolerance_seconds: int):
+        """Returns the newest snapshot in [ts - tolerance, ts], or None."""
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT ts, {', '.join(SNAPSHOT_FIELDS)} FROM snapshots "
+                "WHERE token = ? AND pair_address = ? AND ts BETWEEN ? AND ? ORDER BY ts DESC LIMIT 1",
+                (token.upper(), pair_address or "", ts - tolerance_seconds, ts)
+            ).fetchone()
+        return dict(zip(("ts",) + SNAPSHOT_FIELDS, row)) if row else None
+
+    def deltas(self, token: str, dex_data: dict, now: int = None) -> dict:
+        """
+        Compares the current view against stored snapshots ~1h/6h/24h ago.
+
+        Returns:
+            Dict per window with price/liquidity/volume percentage changes and
+            the age of the reference snapshot, or None where no history exists
+        """
+        now = int(now if now is not None else time.time())
+        result = {}
+        for label, window in DELTA_WINDOWS.items():
+            tolerance = max(2 * self.min_interval_seconds, window // 10)
+            past = self.latest_at_or_before(token, dex_data.get("pair_address"), now - window, tolerance)
+            if not past:
+                result[label] = None
+                continue
+            result[label] = {
+                "price_pct": _pct_change(past["price"], dex_data.get("price_usd") or 0),
+                "liquidity_pct": _pct_change(past["liquidity"], dex_data.get("liquidity_usd") or 0),
+                "volume_24h_pct": _pct_change(past["volume_24h"], dex_data.get("volume_24h") or 0),
+                "reference_age_s": now - past["ts"],
+            }
+        return result
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_snapshot_store() -> SnapshotStore:
+    """Returns the process-wide snapshot store (SNAPSHOT_STORE_* settings)."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = SnapshotStore(
+                path=os.getenv("SNAPSHOT_STORE_PATH", str(DATA_DIR / "snapshots.sqlite3")),
+                min_interval_seconds=int(os.getenv("SNAPSHOT_MIN_INTERVAL", "300")),
+                retention_seconds=int(float(os.getenv("SNAPSHOT_RETENTION_DAYS", "180")) * 24 * 3600),
+            )
+    return _store
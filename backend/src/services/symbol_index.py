@@ -0,0 +1,253 @@
+"""
+Local token symbol -> DEX pair resolution index.
+
+A DexScreener search is fuzzy and returns dozens of pairs. The Analyst reduces
+a search result once to a short ranked list: the deepest pair on each chain,
+most liquid first, with its chain, pair address, base token address, liquidity
+and price. Later requests for the symbol skip the search and fetch fresh
+numbers for the chosen pair from the per-pair endpoint. Entries expire after
+SYMBOL_INDEX_TTL. A background warmer re-resolves the most requested symbols
+(and SYMBOL_INDEX_WARM_TOKENS) before they expire.
+"""
+import asyncio
+import os
+import random
+import threading
+import time
+from collections import OrderedDict
+from src.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Seconds a resolved symbol is trusted before it is searched again
+SYMBOL_INDEX_TTL = float(os.getenv("SYMBOL_INDEX_TTL", "600"))
+SYMBOL_INDEX_SIZE = int(os.getenv("SYMBOL_INDEX_SIZE", "2048"))
+
+# Whale tracking favours Ethereum pairs over deeper pairs elsewhere
+PREFERRED_CHAIN = "ethereum"
+
+
+def pair_entry(pair: dict) -> dict:
+    """Index entry for a DexScreener pair."""
+    return {
+        "chain_id": pair.get("chainId"),
+        "pair_address": pair.get("pairAddress"),
+        "base_token_address": (pair.get("baseToken") or {}).get("address"),
+        "liquidity_usd": (pair.get("liquidity") or {}).get("usd") or 0,
+        "price_usd": float(pair.get("priceUsd") or 0),
+    }
+
+
+def rank_pairs(pairs: list) -> list:
+    """
+    Returns the deepest pair of each chain, most liquid first, in one pass over a search result.
+    """
+    top_by_chain = {}  # chain -> (liquidity, pair)
+    for pair in pairs:
+        if not pair.get("pairAddress"):
+            continue
+        chain = pair.get("chainId")
+        liquidity = (pair.get("liquidity") or {}).get("usd") or 0
+        current = top_by_chain.get(chain)
+        if current is None or liquidity > current[0]:
+            top_by_chain[chain] = (liquidity, pair)
+    return [pair for _, pair in sorted(top_by_chain.values(), key=lambda item: item[0], reverse=True)]
+
+
+def primary_position(entries: list) -> int:
+    """Position of the pair the Analyst reports on: the Ethereum pair if there is one, else the deepest."""
+    for position, entry in enumerate(entries):
+        if entry["chain_id"] == PREFERRED_CHAIN:
+            return position
+    return 0
+
+
+class SymbolIndex:
+    def __init__(self, ttl_seconds: float = SYMBOL_INDEX_TTL, max_entries: int = SYMBOL_INDEX_SIZE,
+                 clock=time.monotonic):
+        """
+        Args:
+            ttl_seconds: Seconds a resolved symbol is trusted
+            max_entries: Most symbols (and lookup counts) held; least recently used go first
+            clock: Monotonic time source in seconds
+        """
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.clock = clock
+        self._entries = OrderedDict()  # symbol -> (entries, indexed_at)
+        # symbol -> recent lookups, halved by decay_lookups(); least recently looked-up symbols
+        # beyond max_entries are dropped, so misses on junk symbols cannot grow it without bound
+        self._lookups = OrderedDict()
+        self._lock = threading.Lock()
+        self._counters = {"lookups": 0, "hits": 0, "misses": 0, "expired": 0, "indexed": 0}
+
+    def resolve(self, symbol: str):
+        """Returns the ranked entries of a symbol, or None if it is unknown or expired."""
+        symbol = symbol.upper()
+        with self._lock:
+            self._counters["lookups"] += 1
+            self._lookups[symbol] = self._lookups.get(symbol, 0) + 1
+            self._lookups.move_to_end(symbol)
+            while len(self._lookups) > self.max_entries:
+                self._lookups.popitem(last=False)
+            item = self._entries.get(symbol)
+            if item is None:
+                self._counters["misses"] += 1
+                return None
+            entries, indexed_at = item
+            if self.clock() - indexed_at > self.ttl_seconds:
+                self._counters["expired"] += 1
+                del self._entries[symbol]
+                return None
+            self._counters["hits"] += 1
+            self._entries.move_to_end(symbol)
+            return entries
+
+    def put(self, symbol: str, ranked_pairs: list) -> list:
+        """
+        Stores the ranked pairs of a symbol (see rank_pairs) and returns their entries.
+        Symbols without pairs are not stored, so they are searched again next time.
+        """
+        entries = [pair_entry(pair) for pair in ranked_pairs]
+        if not entries:
+            return entries
+        symbol = symbol.upper()
+        with self._lock:
+            self._counters["indexed"] += 1
+            self._entries[symbol] = (entries, self.clock())
+            self._entries.move_to_end(symbol)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return entries
+
+    def invalidate(self, symbol: str):
+        with self._lock:
+            self._entries.pop(symbol.upper(), None)
+
+    def symbols(self) -> frozenset:
+        """Every symbol currently held by the index, resolved to at least one pair."""
+        with self._lock:
+            return frozenset(self._entries)
+
+    def popular(self, limit: int) -> list:
+        """The most looked-up symbols since the counts last decayed."""
+        with self._lock:
+            ranked = sorted(self._lookups.items(), key=lambda item: item[1], reverse=True)
+        return [symbol for symbol, _ in ranked[:limit]]
+
+    def decay_lookups(self):
+        """Halves every lookup count, so popularity follows recent demand."""
+        with self._lock:
+            self._lookups = OrderedDict(
+                (symbol, count // 2) for symbol, count in self._lookups.items() if count > 1
+            )
+
+    def stats(self) -> dict:
+        with self._lock:
+            counters = dict(self._counters)
+            counters["symbols"] = len(self._entries)
+        counters["hit_ratio"] = round(counters["hits"] / counters["lookups"], 3) if counters["lookups"] else 0.0
+        return counters
+
+
+# Process-wide index shared by all Analyst instances
+symbol_index = SymbolIndex()
+
+
+class SymbolIndexWarmer:
+    def __init__(self, index: SymbolIndex, analyst_factory, interval: float = 300, top: int = 20,
+                 tokens: list = (), jitter: float = 0.1):
+        """
+        Args:
+            index: Index whose popular symbols are refreshed
+            analyst_factory: Callable returning an AnalystAgent, built on the first refresh
+            interval: Seconds between refresh rounds (keep it below the index TTL)
+            top: Number of most looked-up symbols refreshed per round
+            tokens: Symbols refreshed every round regardless of demand
+            jitter: Random fraction (+/-) applied to every sleep
+        """
+        self.index = index
+        self.analyst_factory = analyst_factory
+        self.interval = interval
+        self.top = top
+        self.tokens = [t.upper() for t in tokens]
+        self.jitter = jitter
+        self._analyst = None
+        self._task = None
+        self._counters = {"rounds": 0, "refreshed": 0, "refresh_errors": 0, "last_round_at": None}
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None
+
+    async def start(self):
+        """Starts the refresh loop."""
+        if self.running:
+            return
+        self._task = asyncio.create_task(self._warm_loop())
+        logger.info(f"[SymbolIndex] Refreshing the top {self.top} symbols every {self.interval:.0f}s")
+
+    async def stop(self):
+        """Cancels the refresh loop."""
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _warm_loop(self):
+        while True:
+            try:
+                await asyncio.to_thread(self.warm_once)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"[SymbolIndex] Refresh round failed: {e}")
+            await asyncio.sleep(max(0.0, self.interval * (1 + random.uniform(-self.jitter, self.jitter))))
+
+    def warm_once(self) -> int:
+        """
+        Re-resolves the configured and most looked-up symbols.
+
+        Returns:
+            Number of symbols refreshed
+        """
+        symbols = self.tokens + [s for s in self.index.popular(self.top) if s not in self.tokens]
+        self.index.decay_lookups()
+        refreshed = 0
+        for symbol in symbols:
+            if self._analyst is None:
+                self._analyst = self.analyst_factory()
+            try:
+                if self._analyst.index_symbol(symbol)[1]:
+                    refreshed += 1
+            except Exception as e:
+                self._counters["refresh_errors"] += 1
+                logger.warning(f"[SymbolIndex] Refresh of {symbol} failed: {e}")
+
+        self._counters["rounds"] += 1
+        self._counters["refreshed"] += refreshed
+        self._counters["last_round_at"] = time.time()
+        if symbols:
+            logger.info(f"[SymbolIndex] Refreshed {refreshed}/{len(symbols)} symbols")
+        return refreshed
+
+    def stats(self) -> dict:
+        return {**self._counters, **self.index.stats()}
+
+
+def create_symbol_warmer_from_env(analyst_factory):
+    """
+    Builds the symbol index warmer from SYMBOL_INDEX_WARM_* environment
+    variables, or returns None when SYMBOL_INDEX_WARM_INTERVAL=0.
+    """
+    interval = float(os.getenv("SYMBOL_INDEX_WARM_INTERVAL", "300"))
+    if interval <= 0:
+        return None
+    tokens = [t.strip() for t in os.getenv("SYMBOL_INDEX_WARM_TOKENS", "").split(",") if t.strip()]
+    return SymbolIndexWarmer(
+        index=symbol_index,
+        analyst_factory=analyst_factory,
+        interval=interval,
+        top=int(os.getenv("SYMBOL_INDEX_WARM_TOP", "20")),
+        tokens=tokens,
+    )
@@ -0,0 +1,195 @@
+"""
+Local SQLite store of ERC-20 transfers with a per-contract ingestion cursor.
+
+A cursor records the last ingested block and `synced_ts`, the time the store
+is known to be complete up to. An unfinished newest-first backfill keeps its
+own progress row until it completes and is replaced by a cursor.
+"""
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from src.services.whale_analysis import TransferBatch, BUY, SELL, OTHER
+from src.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+DATA_DIR = Path(__file__).parent.parent.parent / "data"
+
+
+class TransferStore:
+    def __init__(self, path: str):
+        self.path = str(path)
+        self._lock = threading.Lock()
+
+        if self.path != ":memory:":
+            Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            # A transaction can move the same token several times, so a transfer
+            # is identified by its hash plus its parties and amount
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS transfers (
+                    chain_id INTEGER NOT NULL,
+                    contract TEXT NOT NULL,
+                    hash TEXT NOT NULL,
+                    from_addr TEXT NOT NULL,
+                    to_addr TEXT NOT NULL,
+                    value TEXT NOT NULL,
+                    decimals INTEGER NOT NULL,
+                    block INTEGER NOT NULL,
+                    ts INTEGER NOT NULL,
+                    PRIMARY KEY (chain_id, contract, hash, from_addr, to_addr, value)
+                ) WITHOUT ROWID
+            """)
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_transfers_window ON transfers (chain_id, contract, ts)"
+            )
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS ingestion_cursors (
+                    chain_id INTEGER NOT NULL,
+                    contract TEXT NOT NULL,
+                    last_block INTEGER NOT NULL,
+                    updated_at REAL NOT NULL,
+                    synced_ts INTEGER,
+                    PRIMARY KEY (chain_id, contract)
+                )
+            """)
+            columns = {row[1] for row in self._conn.execute("PRAGMA table_info(ingestion_cursors)")}
+            if "synced_ts" not in columns:
+                # Cursors written before synced_ts existed read as stale and are backfilled once
+                self._conn.execute("ALTER TABLE ingestion_cursors ADD COLUMN synced_ts INTEGER")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS backfills (
+                    chain_id INTEGER NOT NULL,
+                    contract TEXT NOT NULL,
+                    top_block INTEGER NOT NULL,
+                    end_block INTEGER NOT NULL,
+                    started_ts INTEGER NOT NULL,
+                    PRIMARY KEY (chain_id, contract)
+                )
+            """)
+            self._conn.commit()
+
+    def get_cursor(self, chain_id: int, contract: str):
+        """Returns the last ingested block for a contract, or None if never synced."""
+        state = self.get_cursor_state(chain_id, contract)
+        return state[0] if state else None
+
+    def get_cursor_state(self, chain_id: int, contract: str):
+        """Returns (last_block, synced_ts) for a contract, or None if never synced."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT last_block, synced_ts FROM ingestion_cursors WHERE chain_id = ? AND contract = ?",
+                (chain_id, contract.lower())
+            ).fetchone()
+        return tuple(row) if row else None
+
+    def _write_cursor(self, chain_id: int, contract: str, last_block: int, synced_ts: int):
+        self._conn.execute(
+            "INSERT OR REPLACE INTO ingestion_cursors (chain_id, contract, last_block, updated_at, synced_ts) "
+            "VALUES (?, ?, ?, ?, ?)",
+            (chain_id, contract, last_block, time.time(), synced_ts)
+        )
+
+    def set_cursor(self, chain_id: int, contract: str, last_block: int, synced_ts: int):
+        """Records the last ingested block for a contract and ends any backfill in progress."""
+        contract = contract.lower()
+        with self._lock:
+            self._write_cursor(chain_id, contract, last_block, synced_ts)
+            self._conn.execute(
+                "DELETE FROM backfills WHERE chain_id = ? AND contract = ?", (chain_id, contract)
+            )
+            self._conn.commit()
+
+    def get_backfill(self, chain_id: int, contract: str):
+        """Returns (top_block, end_block, started_ts) of an unfinished backfill, or None."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT top_block, end_block, started_ts FROM backfills WHERE chain_id = ? AND contract = ?",
+                (chain_id, contract.lower())
+            ).fetchone()
+        return tuple(row) if row else None
+
+    def save_backfill(self, chain_id: int, contract: str, top_block: int, end_block: int, started_ts: int):
+        """Records how far down a backfill has paged, so an interrupted one can resume from end_block."""
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO backfills (chain_id, contract, top_block, end_block, started_ts) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (chain_id, contract.lower(), top_block, end_block, started_ts)
+            )
+            self._conn.commit()
+
+    def add_transfers(self, chain_id: int, contract: str, rows: list, last_block: int = None,
+                      synced_ts: int = None) -> int:
+        """
+        Appends raw Etherscan tokentx rows, ignoring ones already stored, and
+        optionally advances the cursor in the same transaction.
+
+        Returns:
+            Number of newly stored transfers
+        """
+        contract = contract.lower()
+        records = [
+            (chain_id, contract, tx["hash"], tx["from"].lower(), tx["to"].lower(), tx["value"],
+             int(tx["tokenDecimal"] or 0), int(tx["blockNumber"]), int(tx["timeStamp"]))
+            for tx in rows
+        ]
+        with self._lock:
+            before = self._conn.total_changes
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO transfers "
+                "(chain_id, contract, hash, from_addr, to_addr, value, decimals, block, ts) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                records
+            )
+            inserted = self._conn.total_changes - before
+            if last_block is not None:
+                self._write_cursor(chain_id, contract, last_block, synced_ts)
+            self._conn.commit()
+        return inserted
+
+    def transfer_batch_since(self, chain_id: int, contract: str, since_ts: int, pair_address: str) -> TransferBatch:
+        """
+        Returns pool transfers at or after since_ts as a columnar TransferBatch.
+
+        Direction is resolved in SQL and wallet-to-wallet transfers are
+        filtered out before any rows reach Python.
+        """
+        pair = pair_address.lower()
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT value, decimals, "
+                "CASE WHEN from_addr = ? THEN ? WHEN to_addr = ? THEN ? ELSE ? END AS direction, ts "
+                "FROM transfers WHERE chain_id = ? AND contract = ? AND ts >= ? "
+                "AND (from_addr = ? OR to_addr = ?)",
+                (pair, BUY, pair, SELL, OTHER, chain_id, contract.lower(), since_ts, pair, pair)
+            ).fetchall()
+        if not rows:
+            return TransferBatch.from_columns([], [], [], [])
+        value, decimals, direction, ts = zip(*rows)
+        return TransferBatch.from_columns(value, decimals, direction, ts)
+
+    def prune(self, before_ts: int) -> int:
+        """Deletes transfers older than before_ts. Returns the number removed."""
+        with self._lock:
+            cursor = self._conn.execute("DELETE FROM transfers WHERE ts < ?", (before_ts,))
+            self._conn.commit()
+        return cursor.rowcount
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_transfer_store() -> TransferStore:
+    """Returns the process-wide transfer store (TRANSFER_STORE_PATH)."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = TransferStore(os.getenv("TRANSFER_STORE_PATH", str(DATA_DIR / "transfers.sqlite3")))
+    return _store
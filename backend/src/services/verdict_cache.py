@@ -0,0 +1,60 @@
+"""
+Verdict cache for the Judge, keyed by a quantized fingerprint of its inputs.
+
+Inputs that differ only by noise (a few hype points, a small liquidity move)
+map to the same fingerprint, so a repeat analysis reuses the last verdict
+instead of calling the LLM again.
+"""
+import hashlib
+import math
+import os
+from src.services.market_cache import CoalescingTTLCache
+
+VERDICT_CACHE_ENABLED = os.getenv("VERDICT_CACHE_ENABLED", "1") != "0"
+VERDICT_CACHE_TTL = float(os.getenv("VERDICT_CACHE_TTL", "300"))
+# Higher sensitivity means finer buckets, so smaller input changes trigger a fresh verdict
+VERDICT_CACHE_SENSITIVITY = float(os.getenv("VERDICT_CACHE_SENSITIVITY", "1.0"))
+
+
+def _log_bucket(value, buckets_per_decade: float) -> str:
+    """Buckets a signed magnitude on a log10 scale."""
+    try:
+        value = float(value or 0)
+    except (TypeError, ValueError):
+        return "na"
+    if abs(value) < 1:
+        return "0"
+    sign = "-" if value < 0 else "+"
+    return f"{sign}{math.floor(math.log10(abs(value)) * buckets_per_decade)}"
+
+
+def verdict_fingerprint(hype_data: dict, onchain_data: dict, provider: str = None,
+                        sensitivity: float = VERDICT_CACHE_SENSITIVITY) -> str:
+    """
+    Builds the quantized fingerprint of the Judge's inputs.
+
+    With sensitivity 1.0, hype scores are bucketed in steps of 10 points and
+    liquidity, volume and net flow in quarter-decades (~1.78x) on a log scale.
+    """
+    sensitivity = max(sensitivity, 0.01)
+    hype_step = 10 / sensitivity
+    per_decade = 4 * sensitivity
+    details = onchain_data.get("details") or {}
+
+    parts = [
+        str(provider or ""),
+        str(hype_data.get("token") or onchain_data.get("token") or "").upper(),
+        str(int((hype_data.get("hype_score") or 0) // hype_step)),
+        str(hype_data.get("trending_volume")),
+        str(onchain_data.get("net_smart_money_flow")),
+        str(details.get("tracking_type")),
+        str(details.get("chain_id")),
+        _log_bucket(details.get("liquidity"), per_decade),
+        _log_bucket(details.get("volume_24h"), per_decade),
+        _log_bucket(details.get("net_flow_usd"), per_decade),
+    ]
+    return hashlib.sha256("|".join(parts).encode("utf-8")).hexdigest()
+
+
+# Single-flight as well: identical concurrent requests share one LLM call
+verdict_cache = CoalescingTTLCache(name="VerdictCache", ttl_seconds=VERDICT_CACHE_TTL, max_entries=4096)
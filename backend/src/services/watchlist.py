@@ -0,0 +1,149 @@
+"""
+Background watchlist that precomputes verdicts for frequently requested tokens.
+
+An in-process asyncio scheduler refreshes each stage (on-chain, sentiment,
+verdict) for every tracked token on its own interval, with jitter and a cap on
+concurrent refreshes. /analyze/{token} can then answer from the latest snapshot.
+"""
+import asyncio
+import os
+import random
+import time
+from src.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+STAGES = ("onchain", "sentiment", "verdict")
+
+
+class WatchlistScheduler:
+    def __init__(self, tokens: list, agents_factory, intervals: dict,
+                 jitter: float = 0.1, max_concurrency: int = 4):
+        """
+        Args:
+            tokens: Token symbols to track
+            agents_factory: Callable returning (listener, analyst, judge)
+            intervals: Refresh interval in seconds per stage ("onchain", "sentiment", "verdict")
+            jitter: Random fraction (+/-) applied to every sleep to spread upstream load
+            max_concurrency: Maximum number of stage refreshes running at once
+        """
+        self.tokens = [t.upper() for t in tokens]
+        self.agents_factory = agents_factory
+        self.intervals = intervals
+        self.jitter = jitter
+        self.max_concurrency = max_concurrency
+        self._snapshots = {token: {} for token in self.tokens}  # token -> stage -> (data, updated_at)
+        self._tasks = []
+        self._semaphore = None
+        self._agents = None
+
+    @property
+    def running(self) -> bool:
+        return bool(self._tasks)
+
+    def _jittered(self, seconds: float) -> float:
+        return max(0.0, seconds * (1 + random.uniform(-self.jitter, self.jitter)))
+
+    async def start(self):
+        """Starts one refresh loop per (token, stage)."""
+        if self.running or not self.tokens:
+            return
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        self._agents = await asyncio.to_thread(self.agents_factory)
+        for token in self.tokens:
+            for stage in STAGES:
+                self._tasks.append(asyncio.create_task(self._refresh_loop(token, stage)))
+        logger.info(f"[Watchlist] Tracking {len(self.tokens)} tokens: {', '.join(self.tokens)}")
+
+    async def stop(self):
+        """Cancels every refresh loop."""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def _refresh_loop(self, token: str, stage: str):
+        # Stagger the first run so tokens do not all hit upstreams at once
+        await asyncio.sleep(random.uniform(0, self.jitter * self.intervals[stage]))
+        while True:
+            delay = self.intervals[stage]
+            try:
+                if not await self.refresh(token, stage):
+                    delay = min(delay, 5)  # Verdict inputs not ready yet, retry soon
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"[Watchlist] Refresh of {stage} for {token} failed: {e}")
+            await asyncio.sleep(self._jittered(delay))
+
+    async def refresh(self, token: str, stage: str) -> bool:
+        """
+        Recomputes one stage for one token.
+
+        Returns:
+            False if the stage could not run yet (verdict without both inputs)
+        """
+        listener, analyst, judge = self._agents
+        snapshot = self._snapshots[token]
+
+        async with self._semaphore:
+            start = time.perf_counter()
+            if stage == "onchain":
+                data = await asyncio.to_thread(analyst.analyze_onchain_data, token)
+            elif stage == "sentiment":
+                data = await asyncio.to_thread(listener.analyze_sentiment, token)
+            else:
+                if "onchain" not in snapshot or "sentiment" not in snapshot:
+                    return False
+                data = await asyncio.to_thread(
+                    judge.assess_risk, snapshot["sentiment"][0], snapshot["onchain"][0]
+                )
+                if data.get("risk_level") == "Unknown":
+                    logger.warning(f"[Watchlist] Discarding failed verdict for {token}")
+                    return True
+
+        snapshot[stage] = (data, time.time())
+        logger.info(f"[Watchlist] Refreshed {stage} for {token} in {(time.perf_counter() - start) * 1000:.0f}ms")
+        return True
+
+    def get_snapshot(self, token: str, max_staleness: float = None):
+        """
+        Returns the precomputed analysis for a token, or None if it is not tracked,
+        not fully computed yet, or any stage is older than max_staleness seconds.
+        """
+        snapshot = self._snapshots.get(token.upper())
+        if not snapshot or any(stage not in snapshot for stage in STAGES):
+            return None
+
+        now = time.time()
+        staleness = {stage: round(now - snapshot[stage][1], 1) for stage in STAGES}
+        if max_staleness is not None and max(staleness.values()) > max_staleness:
+            return None
+
+        return {
+            "hype_analysis": snapshot["sentiment"][0],
+            "onchain_analysis": snapshot["onchain"][0],
+            "final_verdict": snapshot["verdict"][0],
+            "staleness_s": staleness,
+        }
+
+
+def create_watchlist_from_env(agents_factory):
+    """
+    Builds the scheduler from WATCHLIST_* environment variables, or returns None
+    when WATCHLIST_TOKENS is empty.
+    """
+    tokens = [t.strip() for t in os.getenv("WATCHLIST_TOKENS", "").split(",") if t.strip()]
+    if not tokens:
+        return None
+    return WatchlistScheduler(
+        tokens=tokens,
+        agents_factory=agents_factory,
+        intervals={
+            "onchain": float(os.getenv("WATCHLIST_ONCHAIN_INTERVAL", "60")),
+            "sentiment": float(os.getenv("WATCHLIST_SENTIMENT_INTERVAL", "300")),
+            "verdict": float(os.getenv("WATCHLIST_VERDICT_INTERVAL", "300")),
+        },
+        jitter=float(os.getenv("WATCHLIST_JITTER", "0.1")),
+        max_concurrency=int(os.getenv("WATCHLIST_MAX_CONCURRENCY", "4")),
+    )
@@ -0,0 +1,104 @@
+"""
+Columnar, vectorized whale classification over large transfer batches.
+
+Transfers are held as NumPy arrays (value, decimals, direction, timestamp) so
+buy/sell/whale aggregation over tens of thousands of rows is a handful of array
+operations instead of a per-row Python loop.
+"""
+import os
+from dataclasses import dataclass
+import numpy as np
+
+BUY = 1    # Tokens leaving the pool (pool -> wallet)
+SELL = -1  # Tokens entering the pool (wallet -> pool)
+OTHER = 0  # Wallet-to-wallet transfer
+
+WHALE_THRESHOLD_USD = float(os.getenv("WHALE_THRESHOLD_USD", "100000"))
+WHALE_BUCKET_MINUTES = int(os.getenv("WHALE_BUCKET_MINUTES", "0"))
+
+
+@dataclass
+class TransferBatch:
+    value: np.ndarray      # float64, raw on-chain integer amount
+    decimals: np.ndarray   # int16, token decimals
+    direction: np.ndarray  # int8, BUY / SELL / OTHER relative to the pool
+    timestamp: np.ndarray  # int64, unix seconds
+
+    def __len__(self) -> int:
+        return len(self.value)
+
+    @classmethod
+    def from_columns(cls, value, decimals, direction, timestamp) -> "TransferBatch":
+        return cls(
+            value=np.asarray(value, dtype=np.float64),
+            decimals=np.asarray(decimals, dtype=np.int16),
+            direction=np.asarray(direction, dtype=np.int8),
+            timestamp=np.asarray(timestamp, dtype=np.int64),
+        )
+
+    @classmethod
+    def from_rows(cls, rows: list, pair_address: str) -> "TransferBatch":
+        """Builds a batch from Etherscan-shaped tokentx dicts."""
+        if not rows:
+            return cls.from_columns([], [], [], [])
+
+        pair = pair_address.lower()
+        # A transfer out of the pool is a buy, checked first like the original loop
+        direction = np.fromiter(
+            (BUY if tx["from"].lower() == pair else SELL if tx["to"].lower() == pair else OTHER for tx in rows),
+            dtype=np.int8, count=len(rows)
+        )
+
+        return cls.from_columns(
+            value=np.array([tx["value"] for tx in rows], dtype=np.float64),
+            decimals=np.array([tx["tokenDecimal"] for tx in rows], dtype=np.int16),
+            direction=direction,
+            timestamp=np.array([tx["timeStamp"] for tx in rows], dtype=np.int64),
+        )
+
+
+def classify_whales(batch: TransferBatch, price_usd: float, threshold_usd: float = WHALE_THRESHOLD_USD,
+                    bucket_seconds: int = 0) -> dict:
+    """
+    Aggregates whale buys and sells in a transfer batch.
+
+    Args:
+        batch: Columnar transfers
+        price_usd: Token price used to value each transfer
+        threshold_usd: Minimum trade size (USD, exclusive) counted as a whale
+        bucket_seconds: If > 0, also returns per-time-bucket totals
+
+    Returns:
+        Dict with whale_buys_usd, whale_sells_usd, whale_tx_count and,
+        when bucketing, a "buckets" list ordered by time
+    """
+    value_usd = batch.value / np.power(10.0, batch.decimals) * price_usd
+    is_whale = (batch.direction != OTHER) & (value_usd > threshold_usd)
+    is_buy = is_whale & (batch.direction == BUY)
+    is_sell = is_whale & (batch.direction == SELL)
+
+    result = {
+        "whale_buys_usd": float(value_usd[is_buy].sum()),
+        "whale_sells_usd": float(value_usd[is_sell].sum()),
+        "whale_tx_count": int(is_whale.sum()),
+    }
+
+    if bucket_seconds and is_whale.any():
+        ts = batch.timestamp[is_whale]
+        origin = int(ts.min()) // bucket_seconds * bucket_seconds
+        index = (ts - origin) // bucket_seconds
+        size = int(index.max()) + 1
+        whale_usd = value_usd[is_whale]
+        whale_direction = batch.direction[is_whale]
+        buys = np.bincount(index, weights=np.where(whale_direction == BUY, whale_usd, 0.0), minlength=size)
+        sells = np.bincount(index, weights=np.where(whale_direction == SELL, whale_usd, 0.0), minlength=size)
+        counts = np.bincount(index, minlength=size)
+        result["buckets"] = [
+            {"start": int(origin + i * bucket_seconds), "buys_usd": float(buys[i]),
+             "sells_usd": float(sells[i]), "tx_count": int(counts[i])}
+            for i in np.flatnonzero(counts)
+        ]
+    elif bucket_seconds:
+        result["buckets"] = []
+
+    return result
@@ -1,46 +1,179 @@
 import logging
 import sys
 import os
-from logging.handlers import RotatingFileHandler
+import json
+import queue
+import atexit
+import threading
+import contextvars
+from datetime import datetime, timezone
+from logging.handlers import RotatingFileHandler, QueueHandler, QueueListener
 from pathlib import Path
+from src.utils.security import RedactingFilter, env_redactor
+
+# queue: request threads only enqueue records, one background thread writes them
+# sync: handlers write on the calling thread
+LOG_MODE = os.getenv("LOG_MODE", "queue").lower()
+# text: human-readable lines; json: one JSON object per line
+LOG_FORMAT = os.getenv("LOG_FORMAT", "text").lower()
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+# Mask API keys in every record before it is written (LOG_REDACT=0 turns it off)
+LOG_REDACT = os.getenv("LOG_REDACT", "1") != "0"
+
+LOG_DIR = Path(__file__).parent.parent.parent / "logs"
+TEXT_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+# Set per request by the HTTP middleware; copied into worker threads with the context
+request_id_var = contextvars.ContextVar("request_id", default=None)
+
+# Attributes every LogRecord has; anything else came in through `extra`
+_RECORD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime", "request_id"}
+
+
+class RequestContextFilter(logging.Filter):
+    """Stamps each record with the current request ID on the emitting thread."""
+    def filter(self, record: logging.LogRecord) -> bool:
+        if not hasattr(record, "request_id"):
+            record.request_id = request_id_var.get()
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """Formats records as JSON lines, including request_id and any `extra` fields."""
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "request_id": getattr(record, "request_id", None),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info or record.exc_text:
+            # exc_text is set (and already redacted) when RedactingFilter ran first
+            entry["exc_info"] = record.exc_text or self.formatException(record.exc_info)
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class DroppingQueueHandler(QueueHandler):
+    """QueueHandler that drops records instead of blocking or raising when the queue is full."""
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class _DrainingQueueListener(QueueListener):
+    """Waits for room to enqueue the stop sentinel, so stop() works on a full queue."""
+    def enqueue_sentinel(self):
+        self.queue.put(self._sentinel)
+
+
+def _build_sinks(fmt: str = None) -> list:
+    """Creates the stdout and rotating-file handlers shared by every logger."""
+    formatter = JsonFormatter() if (fmt or LOG_FORMAT) == "json" else logging.Formatter(TEXT_FORMAT)
+
+    # Console handler (stdout)
+    console_handler = logging.StreamHandler(sys.stdout)
+    console_handler.setLevel(logging.INFO)
+    console_handler.setFormatter(formatter)
+
+    # RotatingFileHandler: max 10MB per file, keep 5 backup files
+    LOG_DIR.mkdir(exist_ok=True)
+    file_handler = RotatingFileHandler(
+        LOG_DIR / "app.log",
+        maxBytes=10 * 1024 * 1024,  # 10 MB
+        backupCount=5,
+        encoding='utf-8'
+    )
+    file_handler.setLevel(logging.INFO)
+    file_handler.setFormatter(formatter)
+
+    sinks = [console_handler, file_handler]
+    if LOG_REDACT:
+        # On the sinks, so in queue mode scrubbing runs on the listener thread, not the caller's
+        redacting_filter = RedactingFilter(env_redactor())
+        for sink in sinks:
+            sink.addFilter(redacting_filter)
+    return sinks
+
+
+def build_queue_handler(sinks: list, maxsize: int = LOG_QUEUE_SIZE):
+    """
+    Puts a non-blocking QueueHandler in front of the given sinks.
+
+    Returns:
+        Tuple of (queue handler, started QueueListener that owns the sinks)
+    """
+    handler = DroppingQueueHandler(queue.Queue(maxsize=maxsize))
+    handler.addFilter(RequestContextFilter())
+    listener = _DrainingQueueListener(handler.queue, *sinks, respect_handler_level=True)
+    listener.start()
+    return handler, listener
+
+
+_handlers = None
+_listener = None
+_queue_handler = None
+_handlers_lock = threading.Lock()
+
+
+def _get_handlers() -> list:
+    """Returns the process-wide handlers, creating the sinks (and listener thread) once."""
+    global _handlers, _listener, _queue_handler
+    with _handlers_lock:
+        if _handlers is None:
+            sinks = _build_sinks()
+            if LOG_MODE == "queue":
+                _queue_handler, _listener = build_queue_handler(sinks)
+                atexit.register(shutdown_logging)
+                _handlers = [_queue_handler]
+            else:
+                for sink in sinks:
+                    sink.addFilter(RequestContextFilter())
+                _handlers = sinks
+    return _handlers
+
+
+def shutdown_logging():
+    """Flushes queued records and stops the background listener thread."""
+    global _listener
+    with _handlers_lock:
+        listener, _listener = _listener, None
+    if listener:
+        listener.stop()
+
+
+def logging_stats() -> dict:
+    """Returns the logging mode plus queue depth and dropped records in queue mode."""
+    stats = {"mode": LOG_MODE, "format": LOG_FORMAT}
+    if _queue_handler is not None:
+        stats["queued"] = _queue_handler.queue.qsize()
+        stats["dropped"] = _queue_handler.dropped
+    return stats
+
 
 def get_logger(name: str) -> logging.Logger:
     """
     Returns a configured logger with the given name.
-    Logs to both console (stdout) and a rotating file.
+    Logs to both console (stdout) and a rotating file, through a background
+    thread in queue mode (LOG_MODE) so callers never block on disk.
     """
     logger = logging.getLogger(name)
-    
+
     # If the logger has no handlers, configure it
     if not logger.handlers:
         logger.setLevel(logging.INFO)
-        
-        # Create formatter
-        formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
-        
-        # Console handler (stdout)
-        console_handler = logging.StreamHandler(sys.stdout)
-        console_handler.setLevel(logging.INFO)
-        console_handler.setFormatter(formatter)
-        logger.addHandler(console_handler)
-        
-        # File handler with rotation
-        # Determine log file path relative to the backend directory
-        log_dir = Path(__file__).parent.parent.parent / "logs"
-        log_dir.mkdir(exist_ok=True)
-        log_file = log_dir / "app.log"
-        
-        # RotatingFileHandler: max 10MB per file, keep 5 backup files
-        file_handler = RotatingFileHandler(
-            log_file,
-            maxBytes=10 * 1024 * 1024,  # 10 MB
-            backupCount=5,
-            encoding='utf-8'
-        )
-        file_handler.setLevel(logging.INFO)
-        file_handler.setFormatter(formatter)
-        logger.addHandler(file_handler)
-        
+        for handler in _get_handlers():
+            logger.addHandler(handler)
+
         # Prevent propagation to root logger to avoid double logging
         logger.propagate = False
 
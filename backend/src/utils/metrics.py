@@ -0,0 +1,210 @@
+"""
+Lightweight in-process metrics with Prometheus text exposition.
+
+Counters and histograms are plain dicts keyed by label values behind a lock,
+so an observation costs a bisect and a few additions. That is cheap enough to
+leave on in production. Metrics register in the process-wide REGISTRY unless
+given their own CollectorRegistry; `render_prometheus()` serves REGISTRY on
+the /metrics endpoint.
+"""
+import time
+import threading
+from bisect import bisect_left
+from contextlib import contextmanager
+from functools import wraps
+
+# Seconds; covers cache hits (ms) up to slow LLM calls (tens of seconds)
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: tuple, values: tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class CollectorRegistry:
+    """A set of metrics that are rendered together."""
+
+    def __init__(self):
+        self._metrics = []
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            self._metrics.append(metric)
+
+    def render(self) -> str:
+        """Renders every metric in the Prometheus text exposition format (0.0.4)."""
+        with self._lock:
+            metrics = list(self._metrics)
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+# Served on /metrics
+REGISTRY = CollectorRegistry()
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = (), registry: CollectorRegistry = None):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        (REGISTRY if registry is None else registry).register(self)
+
+    def _key(self, labels: dict) -> tuple:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self._samples())
+        return lines
+
+
+class Counter(_Metric):
+    """Monotonically increasing count per label set."""
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = (), registry: CollectorRegistry = None):
+        super().__init__(name, documentation, labelnames, registry)
+        self._values = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+    def _samples(self) -> list:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(v)}" for key, v in items]
+
+
+class Histogram(_Metric):
+    """Bucketed distribution (cumulative on export) with sum and count per label set."""
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = (), buckets: tuple = DEFAULT_BUCKETS,
+                 registry: CollectorRegistry = None):
+        super().__init__(name, documentation, labelnames, registry)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}  # key -> [per-bucket counts (+Inf last), sum, count]
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def count(self, **labels) -> int:
+        with self._lock:
+            series = self._series.get(self._key(labels))
+            return series[2] if series else 0
+
+    def _samples(self) -> list:
+        with self._lock:
+            items = sorted((key, (list(s[0]), s[1], s[2])) for key, s in self._series.items())
+        lines = []
+        for key, (counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                labels = _format_labels(self.labelnames, key, 'le="' + le + '"')
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {repr(float(total))}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {count}")
+        return lines
+
+
+STAGE_DURATION = Histogram(
+    "alphadiv_stage_duration_seconds", "Duration of agent stages.", ("stage",)
+)
+STAGE_ERRORS = Counter(
+    "alphadiv_stage_errors_total", "Agent stages that raised.", ("stage",)
+)
+UPSTREAM_DURATION = Histogram(
+    "alphadiv_upstream_request_duration_seconds", "Duration of calls to external services.", ("upstream", "outcome")
+)
+UPSTREAM_ERRORS = Counter(
+    "alphadiv_upstream_errors_total", "Failed calls to external services.", ("upstream", "reason")
+)
+LLM_TOKENS = Counter(
+    "alphadiv_llm_tokens_total", "LLM tokens reported by the provider.", ("provider", "model", "operation", "kind")
+)
+
+
+@contextmanager
+def span(stage: str):
+    """Times an agent stage into STAGE_DURATION and counts it in STAGE_ERRORS if it raises."""
+    start = time.perf_counter()
+    try:
+        yield
+    except BaseException:
+        STAGE_ERRORS.inc(stage=stage)
+        raise
+    finally:
+        STAGE_DURATION.observe(time.perf_counter() - start, stage=stage)
+
+
+def instrumented(stage: str):
+    """Decorator form of span() for agent methods."""
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(stage):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+@contextmanager
+def upstream_span(upstream: str):
+    """
+    Times an external call into UPSTREAM_DURATION.
+
+    Yields a dict; set its "outcome" (e.g. "http_429") to record a failure
+    that did not raise. Exceptions are recorded by type.
+    """
+    start = time.perf_counter()
+    call = {"outcome": "ok"}
+    try:
+        yield call
+    except BaseException as e:
+        call["outcome"] = "error"
+        UPSTREAM_ERRORS.inc(upstream=upstream, reason=type(e).__name__)
+        raise
+    finally:
+        if call["outcome"] not in ("ok", "error"):
+            UPSTREAM_ERRORS.inc(upstream=upstream, reason=call["outcome"])
+        UPSTREAM_DURATION.observe(time.perf_counter() - start, upstream=upstream, outcome=call["outcome"])
+
+
+def render_prometheus() -> str:
+    """Renders the process-wide metrics for /metrics."""
+    return REGISTRY.render()
@@ -1,67 +1,173 @@
 """
 Security utilities for sanitizing sensitive data in logs and error messages.
+
+A Redactor is built once per set of secret values. It maps the text to a byte
+string of key characters vs. everything else and finds the long runs with
+bytes.find, so text without anything key-shaped is handled at C speed; only
+those runs are matched against the known values and key patterns. Redactors
+holding per-request secrets are built per call and never cached, and known
+values are matched with str.replace rather than a compiled pattern, since re
+caches compiled patterns process-wide. RedactingFilter applies a Redactor to
+log records.
 """
+import logging
+import os
 import re
+import string
+from dotenv import load_dotenv
+
+# Environment variables holding secrets that must never reach the logs
+SECRET_ENV_VARS = ("OPENAI_API_KEY", "GEMINI_API_KEY", "ETHERSCAN_API_KEY", "REDDIT_CLIENT_ID", "REDDIT_CLIENT_SECRET")
+
+OPENAI_KEY_MASK = 'sk-****REDACTED****'
+GENERIC_KEY_MASK = '****REDACTED****'
+
+_KEY_CHARS = string.ascii_letters + string.digits + "_-"
+# Key characters become "a" and everything else (including non-ASCII bytes) a space
+_RUN_TABLE = bytes(ord("a") if chr(c) in _KEY_CHARS else ord(" ") for c in range(256))
+# "sk-" plus 20 characters: no key pattern matches a shorter run
+_PATTERN_MIN_RUN = 23
+
+# OpenAI keys: sk-... or sk-proj-...
+_OPENAI_KEY = re.compile(r'sk-[a-zA-Z0-9\-]{20,}')
+# Generic long alphanumeric strings that look like keys (40+ chars); only
+# redacted if they have both letters and numbers, to spare UUIDs and words
+_GENERIC_KEY = re.compile(r'\b[a-zA-Z0-9_\-]{40,}\b')
+_LETTER = re.compile(r'[a-zA-Z]')
+_DIGIT = re.compile(r'[0-9]')
+
+
+def _mask_generic(match: re.Match) -> str:
+    token = match.group()
+    return GENERIC_KEY_MASK if _LETTER.search(token) and _DIGIT.search(token) else token
+
+
+def mask_value(value: str) -> str:
+    """Shows the first and last 4 characters of a secret and masks the rest."""
+    return f"{value[:4]}...{value[-4:]}"
+
+
+class Redactor:
+    def __init__(self, sensitive_values=()):
+        """
+        Args:
+            sensitive_values: Secret values to mask (values of 8 characters or less are ignored)
+        """
+        masks = {value: mask_value(value) for value in sensitive_values if value and len(value) > 8}
+        # Values made of key characters can only occur inside a run; the rest are replaced up front
+        # Longest first, so a value that contains another is masked whole
+        run_values = sorted((v for v in masks if v.isascii() and not v.strip(_KEY_CHARS)), key=len, reverse=True)
+        self._run_masks = [(v, masks[v]) for v in run_values]
+        self._other_masks = [(v, masks[v]) for v in sorted(masks, key=len, reverse=True) if v not in run_values]
+
+        min_run = min([_PATTERN_MIN_RUN] + [len(v) for v in run_values])
+        self._probe = b"a" * min_run
+        # Same runs as _RUN_TABLE finds, for text that is not ASCII
+        self._run_pattern = re.compile(rf"(?<![a-zA-Z0-9_\-])[a-zA-Z0-9_\-]{{{min_run},}}")
+
+    def _redact_run(self, run: str) -> str:
+        for value, masked in self._run_masks:
+            if value in run:
+                run = run.replace(value, masked)
+        if len(run) >= _PATTERN_MIN_RUN:
+            run = _OPENAI_KEY.sub(OPENAI_KEY_MASK, run)
+            run = _GENERIC_KEY.sub(_mask_generic, run)
+        return run
+
+    def redact(self, text: str) -> str:
+        """Masks every known value and key-shaped string in the text."""
+        if not text:
+            return text
+        for value, masked in self._other_masks:
+            if value in text:
+                text = text.replace(value, masked)
+        if not text.isascii():
+            return self._run_pattern.sub(lambda m: self._redact_run(m.group()), text)
+
+        runs = text.encode("ascii").translate(_RUN_TABLE)
+        start = runs.find(self._probe)
+        if start < 0:
+            return text
+        pieces, last = [], 0
+        while start >= 0:
+            # find() returns the first position of a long run, i.e. where it starts
+            end = runs.find(b" ", start)
+            if end < 0:
+                end = len(runs)
+            pieces.append(text[last:start])
+            pieces.append(self._redact_run(text[start:end]))
+            last = end
+            start = runs.find(self._probe, end)
+        pieces.append(text[last:])
+        return "".join(pieces)
+
+
+# Holds no secrets, so one instance serves every call without values
+_PATTERN_REDACTOR = Redactor()
+
+
+def _redactor_for(values: tuple) -> Redactor:
+    return Redactor(values) if values else _PATTERN_REDACTOR
 
 
 def sanitize_api_key(text: str, key_value: str = None) -> str:
     """
     Sanitizes API keys from text by replacing them with masked versions.
-    
+
     Args:
         text: The text that might contain API keys
         key_value: Optional specific key value to sanitize
-        
+
     Returns:
         Text with API keys masked
     """
     if not text:
         return text
-    
-    # If a specific key value is provided, mask it
-    if key_value and len(key_value) > 8:
-        # Show first 4 and last 4 characters, mask the rest
-        masked = f"{key_value[:4]}...{key_value[-4:]}"
-        text = text.replace(key_value, masked)
-    
-    # Pattern-based sanitization for common API key formats
-    # OpenAI keys: sk-... or sk-proj-...
-    text = re.sub(r'sk-[a-zA-Z0-9\-]{20,}', 'sk-****REDACTED****', text)
-    
-    # Generic long alphanumeric strings that look like keys (40+ chars with mix of letters/numbers/underscores)
-    # More conservative threshold to reduce false positives
-    # Only redact if it has both letters and numbers (more likely to be a key)
-    pattern = r'\b[a-zA-Z0-9_\-]{40,}\b'
-    for match in re.finditer(pattern, text):
-        matched_text = match.group(0)
-        # Only redact if it contains both letters and numbers
-        if re.search(r'[a-zA-Z]', matched_text) and re.search(r'[0-9]', matched_text):
-            text = text.replace(matched_text, '****REDACTED****', 1)
-    
-    return text
+    return _redactor_for((key_value,) if key_value else ()).redact(text)
 
 
 def sanitize_error_message(error: Exception, sensitive_values: list = None) -> str:
     """
     Creates a sanitized error message safe for logging.
-    
+
     Args:
         error: The exception to sanitize
         sensitive_values: List of sensitive values (like API keys) to redact
-        
+
     Returns:
         Sanitized error message
     """
-    message = str(error)
-    
-    # Sanitize any provided sensitive values
-    if sensitive_values:
-        for value in sensitive_values:
-            if value and len(value) > 8:
-                masked = f"{value[:4]}...{value[-4:]}"
-                message = message.replace(value, masked)
-    
-    # Apply pattern-based sanitization
-    message = sanitize_api_key(message)
-    
-    return message
+    values = tuple(value for value in sensitive_values or () if value)
+    return _redactor_for(values).redact(str(error))
+
+
+def env_redactor(names: tuple = SECRET_ENV_VARS) -> Redactor:
+    """Returns a Redactor for the key patterns plus the secrets set in the environment (or .env)."""
+    load_dotenv()
+    return Redactor(os.getenv(name) for name in names)
+
+
+class RedactingFilter(logging.Filter):
+    """
+    Masks secrets in a record's message and traceback before any handler formats it.
+
+    The record is rewritten in place and marked, so when the filter sits on
+    several handlers each record is only scanned once.
+    """
+    def __init__(self, redactor: Redactor = None):
+        super().__init__()
+        self.redactor = redactor or Redactor()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if getattr(record, "_redacted", False):
+            return True
+        message = record.getMessage()
+        redacted = self.redactor.redact(message)
+        if redacted != message:
+            record.msg, record.args = redacted, None
+        if record.exc_info and not record.exc_text:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+        if record.exc_text:
+            record.exc_text = self.redactor.redact(record.exc_text)
+        record._redacted = True
+        return True
@@ -0,0 +1,84 @@
+"""
+Shared test setup.
+
+Every on-disk store the backend opens lazily is pointed at a throwaway
+directory, so running the suite never writes to backend/data. The helpers
+below build LLM services and agents through their real constructors with fake
+clients swapped in; test modules import them with `from conftest import ...`,
+which also works when a test file is run directly.
+"""
+import sys
+import os
+import json
+import tempfile
+from types import SimpleNamespace
+
+_STORE_DIR = tempfile.mkdtemp(prefix="alphadiv-tests-")
+
+# Set before any test module imports the stores; .env values never override these
+for _name, _filename in (
+    ("SNAPSHOT_STORE_PATH", "snapshots.sqlite3"),
+    ("SENTIMENT_CACHE_PATH", "sentiment_cache.sqlite3"),
+    ("TRANSFER_STORE_PATH", "transfers.sqlite3"),
+    ("REDDIT_INDEX_PATH", "reddit_index.sqlite3"),
+    ("RATE_LIMIT_DB_PATH", "rate_limits.sqlite3"),
+):
+    os.environ[_name] = os.path.join(_STORE_DIR, _filename)
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.agents.analyst import AnalystAgent
+from src.agents.listener import ListenerAgent
+from src.services.llm import LLMService
+
+
+class FakeCompletions:
+    """Mimics client.chat.completions: returns a canned payload, or whatever `create` returns."""
+    def __init__(self, payload=None, create=None, usage=None):
+        self.payload = payload
+        self._create = create
+        self.usage = usage
+        self.calls = []
+
+    def create(self, **kwargs):
+        self.calls.append(kwargs)
+        if self._create:
+            return self._create(**kwargs)
+        content = self.payload if isinstance(self.payload, str) else json.dumps(self.payload)
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))], usage=self.usage)
+
+
+def make_llm_service(payload=None, create=None, usage=None, sentiment_cache=None, openai_key: str = "sk-test"):
+    """
+    LLMService on the OpenAI provider whose completions are faked.
+
+    Returns:
+        Tuple of (service, FakeCompletions)
+    """
+    service = LLMService(openai_key=openai_key)
+    service.sentiment_cache = sentiment_cache
+    completions = FakeCompletions(payload, create, usage)
+    service.client = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+    return service, completions
+
+
+def make_offline_llm_service():
+    """LLMService with no provider configured, whatever keys the environment holds."""
+    service, _ = make_llm_service()
+    service.provider = service.client = service.model = service.model_name = service.rate_key = None
+    return service
+
+
+def make_listener(llm):
+    """ListenerAgent around the given LLM, without a Reddit API client."""
+    listener = ListenerAgent(llm=llm)
+    listener.reddit = None
+    return listener
+
+
+def make_analyst(etherscan_api_key: str = None):
+    """AnalystAgent without the Etherscan ingestor, so whale tracking never pages real transfers."""
+    analyst = AnalystAgent(etherscan_api_key=etherscan_api_key)
+    analyst.etherscan_api_key = etherscan_api_key
+    analyst.ingestor = None
+    return analyst
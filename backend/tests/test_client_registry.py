@@ -0,0 +1,104 @@
+"""
+Tests for the warmed client registry.
+"""
+import sys
+import os
+from types import SimpleNamespace
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import google.ai.generativelanguage as glm
+from src.services.client_registry import ClientRegistry
+from src.services.llm import LLMService
+
+
+def test_same_credentials_reuse_client():
+    """Test that the same credentials return the same warmed client"""
+    registry = ClientRegistry()
+    builds = []
+
+    def factory():
+        builds.append(1)
+        return object()
+
+    first = registry.get_or_create("llm", ("sk-test-key", None), factory)
+    second = registry.get_or_create("llm", ("sk-test-key", None), factory)
+    other = registry.get_or_create("llm", ("sk-other-key", None), factory)
+    assert first is second
+    assert first is not other
+    assert len(builds) == 2
+    assert registry.stats()["hits"] == 1
+    print("✓ Clients are reused per credential set")
+
+
+def test_raw_keys_are_never_exposed():
+    """Test that neither fingerprints nor stats contain the raw key"""
+    registry = ClientRegistry()
+    key = "sk-proj-abc123def456ghi789jkl012mno345pqr678stu901"
+    registry.get_or_create("llm", (key,), object)
+    assert key not in ClientRegistry.fingerprint(key)
+    assert key not in repr(registry.stats())
+    assert all(key not in fp for _, fp in registry._entries)
+    print("✓ Raw keys are never exposed")
+
+
+def test_bounded_size_and_idle_eviction():
+    """Test LRU bounding and idle-time eviction"""
+    clock = SimpleNamespace(now=1000.0)
+    registry = ClientRegistry(max_entries=2, idle_ttl_seconds=60, clock=lambda: clock.now)
+    registry.get_or_create("analyst", ("a",), object)
+    registry.get_or_create("analyst", ("b",), object)
+    registry.get_or_create("analyst", ("c",), object)
+    assert registry.stats()["entries"] == 2
+
+    clock.now += 61
+    registry.get_or_create("analyst", ("d",), object)
+    assert registry.stats()["entries"] == 1
+    print("✓ Registry is bounded and evicts idle clients")
+
+
+class FakeGenerativeClient:
+    """Stands in for glm.GenerativeServiceClient and records the key of every call."""
+    calls = []
+    requests = []
+
+    def __init__(self, client_options=None, **kwargs):
+        self.api_key = client_options.api_key
+
+    def generate_content(self, request, **kwargs):
+        FakeGenerativeClient.calls.append(self.api_key)
+        FakeGenerativeClient.requests.append((request, kwargs))
+        return glm.GenerateContentResponse(candidates=[{"content": {"parts": [{"text": "ok"}]}}])
+
+
+def test_warm_gemini_services_keep_their_own_key():
+    """Test that two warm Gemini services each call Gemini with their own key"""
+    registry = ClientRegistry()
+    original = glm.GenerativeServiceClient
+    glm.GenerativeServiceClient = FakeGenerativeClient
+    # An OpenAI key in the environment would take priority over Gemini
+    openai_env = os.environ.pop("OPENAI_API_KEY", None)
+    try:
+        first = registry.get_or_create("llm", (None, "gemini-key-a"), lambda: LLMService(openai_key="", gemini_key="gemini-key-a"))
+        second = registry.get_or_create("llm", (None, "gemini-key-b"), lambda: LLMService(openai_key="", gemini_key="gemini-key-b"))
+        for service in (first, second, first, second):
+            assert service.generate_text("hello") == "ok"
+    finally:
+        glm.GenerativeServiceClient = original
+        if openai_env is not None:
+            os.environ["OPENAI_API_KEY"] = openai_env
+    assert first.provider == second.provider == "gemini"
+    assert FakeGenerativeClient.calls == ["gemini-key-a", "gemini-key-b", "gemini-key-a", "gemini-key-b"]
+    request, kwargs = FakeGenerativeClient.requests[0]
+    assert request.model == "models/gemini-2.0-flash"
+    assert request.contents[0].parts[0].text == "hello"
+    # The client's own 503 retry would outlive any request deadline
+    assert kwargs["retry"] is None and kwargs["timeout"] > 0
+    print("✓ Each Gemini service uses its own key")
+
+
+if __name__ == "__main__":
+    test_same_credentials_reuse_client()
+    test_raw_keys_are_never_exposed()
+    test_bounded_size_and_idle_eviction()
+    test_warm_gemini_services_keep_their_own_key()
+    print("\n✅ All client registry tests passed!")
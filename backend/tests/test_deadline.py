@@ -0,0 +1,361 @@
+"""
+Tests for request deadlines, circuit breakers and partial analysis results.
+"""
+import sys
+import os
+import asyncio
+import threading
+import time
+from types import SimpleNamespace
+import httpx
+import openai
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import src.services.llm as llm_module
+from conftest import make_llm_service, make_listener
+from src.agents.listener import DeadlineRequestor
+from src.services.deadline import (
+    CircuitBreaker, CircuitOpenError, DeadlineExceeded, CIRCUIT_FAILURE_THRESHOLD,
+    deadline_scope, remaining, clip_timeout, check_deadline, get_breaker, note_shortfall
+)
+from src.services.rate_limiter import RateLimiter
+from src.services.http_client import http_get
+from src.services.orchestrator import run_analysis, stream_analysis
+
+
+class FakeClock:
+    """Monotonic clock that only moves when the test advances it."""
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_breaker_opens_and_half_opens():
+    """Test that consecutive failures open the breaker and one trial call may close it"""
+    clock = FakeClock()
+    breaker = CircuitBreaker("test", failure_threshold=3, reset_seconds=30, clock=clock)
+    for _ in range(3):
+        breaker.before_call()
+        breaker.record_failure()
+    assert breaker.state == "open"
+    try:
+        breaker.before_call()
+        assert False, "open breaker should reject calls"
+    except CircuitOpenError:
+        pass
+
+    clock.now += 30
+    assert breaker.state == "half_open"
+    breaker.before_call()
+    # Only one trial call is let through while half-open
+    try:
+        breaker.before_call()
+        assert False, "second half-open call should be rejected"
+    except CircuitOpenError:
+        pass
+    breaker.record_success()
+    assert breaker.state == "closed"
+    stats = breaker.stats()
+    assert stats["times_opened"] == 1 and stats["rejected"] == 2
+    print("✓ Breaker opens after failures and closes after a good trial call")
+
+
+def test_failed_trial_reopens_breaker():
+    """Test that a failing half-open trial reopens the breaker immediately"""
+    clock = FakeClock()
+    breaker = CircuitBreaker("test", failure_threshold=1, reset_seconds=30, clock=clock)
+    breaker.record_failure()
+    clock.now += 30
+    breaker.before_call()
+    breaker.record_failure()
+    assert breaker.state == "open"
+    assert breaker.stats()["times_opened"] == 2
+    print("✓ Failed trial reopens the breaker")
+
+
+def api_error(error_class, status):
+    request = httpx.Request("POST", "https://api.openai.com/v1/chat/completions")
+    return error_class(f"HTTP {status}", response=httpx.Response(status, request=request), body=None)
+
+
+def test_bad_byo_key_does_not_open_the_shared_circuit():
+    """Test that auth errors never count as failures and outages only open the breaker of the key that saw them"""
+    def rejected(**kwargs):
+        raise api_error(openai.AuthenticationError, 401)
+
+    def outage(**kwargs):
+        raise api_error(openai.InternalServerError, 503)
+
+    byo, _ = make_llm_service(create=rejected, openai_key="sk-byo-bad")
+    for _ in range(CIRCUIT_FAILURE_THRESHOLD + 1):
+        assert byo.generate_text("hi").startswith("Error generating text")
+    assert get_breaker("openai", RateLimiter.key_id("sk-byo-bad")).stats()["consecutive_failures"] == 0
+
+    down, _ = make_llm_service(create=outage, openai_key="sk-byo-down")
+    original = llm_module.LLM_MAX_RETRIES
+    llm_module.LLM_MAX_RETRIES = 0
+    try:
+        for _ in range(CIRCUIT_FAILURE_THRESHOLD):
+            down.generate_text("hi")
+    finally:
+        llm_module.LLM_MAX_RETRIES = original
+    assert get_breaker("openai", RateLimiter.key_id("sk-byo-down")).state == "open"
+
+    server, completions = make_llm_service("hello", openai_key="sk-server")
+    assert server.generate_text("hi") == "hello"
+    assert len(completions.calls) == 1
+    print("✓ Breakers are per key and ignore auth errors")
+
+
+def test_llm_retries_fit_the_deadline():
+    """Test that a 5xx is retried while the budget allows another attempt and a 401 never is"""
+    failures = []
+
+    def flaky(**kwargs):
+        if not failures:
+            failures.append(kwargs)
+            raise api_error(openai.InternalServerError, 500)
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content="hello"))], usage=None)
+
+    def rejected(**kwargs):
+        raise api_error(openai.AuthenticationError, 401)
+
+    original = llm_module.LLM_BACKOFF_FACTOR
+    llm_module.LLM_BACKOFF_FACTOR = 0.01
+    try:
+        service, completions = make_llm_service(create=flaky, openai_key="sk-retry")
+        with deadline_scope(time.monotonic() + 30):
+            assert service.generate_text("hi") == "hello"
+        assert len(completions.calls) == 2
+
+        failures.clear()
+        service, completions = make_llm_service(create=flaky, openai_key="sk-retry")
+        with deadline_scope(time.monotonic() + llm_module.LLM_MIN_ATTEMPT_SECONDS / 2):
+            assert service.generate_text("hi").startswith("Error generating text")
+        assert len(completions.calls) == 1
+
+        service, completions = make_llm_service(create=rejected, openai_key="sk-retry")
+        service.generate_text("hi")
+        assert len(completions.calls) == 1
+    finally:
+        llm_module.LLM_BACKOFF_FACTOR = original
+    print("✓ LLM retries fit the deadline")
+
+
+def test_clip_timeout_to_remaining_budget():
+    """Test that timeouts are only shortened inside a deadline scope"""
+    assert clip_timeout((3.05, 10)) == ((3.05, 10), False)
+    with deadline_scope(time.monotonic() + 5):
+        (connect, read), clipped = clip_timeout((3.05, 10))
+        assert clipped and connect <= 3.05 and read <= 5
+        assert clip_timeout(0.1) == (0.1, False)
+    assert remaining() is None
+    print("✓ Timeouts are clipped to the remaining budget")
+
+
+def test_expired_deadline_fails_before_request():
+    """Test that http_get raises DeadlineExceeded without contacting the upstream"""
+    with deadline_scope(time.monotonic() - 1):
+        try:
+            check_deadline()
+            assert False, "expired deadline should raise"
+        except DeadlineExceeded:
+            pass
+        try:
+            http_get("http://127.0.0.1:9/never-contacted", upstream="deadline_test")
+            assert False, "expired deadline should raise"
+        except DeadlineExceeded:
+            pass
+    print("✓ Expired deadline fails fast")
+
+
+class StuckListener:
+    """Blocks until released, recording whether the result was produced while it was still running."""
+    def __init__(self, released: bool = False):
+        self.release = threading.Event()
+        if released:
+            self.release.set()
+        self.finished = False
+
+    def analyze_sentiment(self, token):
+        self.release.wait(timeout=5)
+        self.finished = True
+        return {"token": token, "hype_score": 90}
+
+
+async def without_waiting_for(listener: StuckListener, run):
+    """Awaits run, then frees the stuck Listener so its worker thread can exit."""
+    try:
+        return await run, listener.finished
+    finally:
+        listener.release.set()
+
+
+class QuickAnalyst:
+    def analyze_onchain_data(self, token):
+        # The deadline follows the stage into its worker thread
+        assert remaining() is not None
+        return {"token": token, "net_smart_money_flow": "Sell Pressure"}
+
+
+class RecordingJudge:
+    def assess_risk(self, hype_data, onchain_data):
+        return {"risk_level": "High", "hype": hype_data["hype_score"], "flow": onchain_data["net_smart_money_flow"]}
+
+
+def test_partial_result_when_stage_misses_deadline():
+    """Test that a stuck Listener is dropped and the Judge still runs on the Analyst output"""
+    listener = StuckListener()
+    result, listener_finished = asyncio.run(without_waiting_for(
+        listener, run_analysis(listener, QuickAnalyst(), RecordingJudge(), "PEPE", deadline_ms=500)
+    ))
+    # The response is built while the Listener is still blocked
+    assert listener_finished is False
+    assert result["partial"] is True
+    assert result["missing_stages"] == ["listener"]
+    assert result["hype_data"]["details"]["error"] == "Timed out"
+    assert result["verdict"] == {"risk_level": "High", "hype": None, "flow": "Sell Pressure"}
+    print(f"✓ Partial result returned after {result['timings']['total_ms']:.0f}ms")
+
+
+class DegradingListener:
+    """Swallows a call the deadline cut short and returns an empty result, like the RSS fallback does."""
+    def analyze_sentiment(self, token):
+        note_shortfall("reddit_rss request")
+        return {"token": token, "hype_score": 0, "details": {"reddit_data": {"posts": 0}}}
+
+
+def test_degraded_stage_counts_as_missing():
+    """Test that a stage that returned in time on degraded data is reported missing, not complete"""
+    result = asyncio.run(run_analysis(DegradingListener(), QuickAnalyst(), RecordingJudge(), "PEPE", deadline_ms=5000))
+    assert result["partial"] is True
+    assert result["missing_stages"] == ["listener"]
+    assert result["hype_data"]["degraded"] is True
+    assert result["verdict"]["hype"] is None
+    print("✓ Degraded stages are reported missing")
+
+
+def test_expired_deadline_is_noted_as_shortfall():
+    """Test that a call skipped by the deadline is recorded for the enclosing stage"""
+    shortfalls = []
+    with deadline_scope(time.monotonic() - 1, shortfalls):
+        try:
+            check_deadline("reddit_rss request")
+        except DeadlineExceeded:
+            pass
+    with deadline_scope(None):
+        note_shortfall("outside a stage")
+    assert shortfalls == ["reddit_rss request"]
+    print("✓ Skipped calls are noted as shortfalls")
+
+
+class RecordingHTTP:
+    def __init__(self):
+        self.headers = {}
+        self.timeouts = []
+
+    def request(self, method, url, timeout=None, **kwargs):
+        self.timeouts.append(timeout)
+        return SimpleNamespace(status_code=200)
+
+
+def test_praw_requests_follow_the_deadline():
+    """Test that PRAW requests get the remaining time as timeout and are not sent once it is gone"""
+    http = RecordingHTTP()
+    requestor = DeadlineRequestor(user_agent="alphadiv-tests/1.0", session=http)
+    requestor.request("GET", "https://oauth.reddit.com/search", timeout=16)
+    with deadline_scope(time.monotonic() + 2):
+        requestor.request("GET", "https://oauth.reddit.com/search", timeout=16)
+    with deadline_scope(time.monotonic() - 1):
+        try:
+            requestor.request("GET", "https://oauth.reddit.com/search", timeout=16)
+            assert False, "expired deadline should raise"
+        except DeadlineExceeded:
+            pass
+    assert http.timeouts[0] == 16 and http.timeouts[1] <= 2 and len(http.timeouts) == 2
+    print("✓ PRAW requests follow the deadline")
+
+
+class FakeRedditAPI:
+    config = SimpleNamespace(client_id="deadline-test-client")
+
+    def __init__(self):
+        self.searches = 0
+
+    def subreddit(self, name):
+        api = self
+
+        class Listing:
+            def search(self, query, **kwargs):
+                api.searches += 1
+                return []
+        return Listing()
+
+
+def test_live_search_is_skipped_past_the_deadline():
+    """Test that the Listener's API search is not started once the deadline has passed, and notes the shortfall"""
+    listener = make_listener(SimpleNamespace(provider=None))
+    listener.reddit = FakeRedditAPI()
+    shortfalls = []
+    with deadline_scope(time.monotonic() - 1, shortfalls):
+        try:
+            listener._search_reddit_api("PEPE")
+            assert False, "expired deadline should raise"
+        except DeadlineExceeded:
+            pass
+    assert listener.reddit.searches == 0 and shortfalls == ["reddit_api search"]
+    breaker = get_breaker("reddit_api", RateLimiter.key_id("deadline-test-client"))
+    assert breaker.stats()["consecutive_failures"] == 0
+    print("✓ Live search is skipped past the deadline")
+
+
+class QuickAnalystNoDeadline:
+    def analyze_onchain_data(self, token):
+        assert remaining() is None
+        return {"token": token, "net_smart_money_flow": "Neutral"}
+
+
+def test_no_deadline_is_not_partial():
+    """Test that runs without a deadline report a complete result"""
+    result = asyncio.run(run_analysis(StuckListener(released=True), QuickAnalystNoDeadline(), RecordingJudge(), "PEPE"))
+    assert result["partial"] is False and result["missing_stages"] == []
+    assert result["verdict"]["hype"] == 90
+    print("✓ Complete result without a deadline")
+
+
+def test_stream_reports_stage_that_misses_deadline():
+    """Test that the stream sends a timed-out placeholder for a stuck Listener and marks the run partial"""
+    listener = StuckListener()
+
+    async def collect():
+        return [event async for event in stream_analysis(listener, QuickAnalyst(), RecordingJudge(), "PEPE",
+                                                         deadline_ms=500)]
+
+    events, listener_finished = asyncio.run(without_waiting_for(listener, collect()))
+    assert listener_finished is False
+    events = {event["event"]: event for event in events}
+    assert events["onchain_analysis"]["timed_out"] is False
+    assert events["hype_analysis"]["timed_out"] is True
+    assert events["hype_analysis"]["data"]["details"]["error"] == "Timed out"
+    assert events["final_verdict"]["data"] == {"risk_level": "High", "hype": None, "flow": "Sell Pressure"}
+    assert events["done"]["partial"] is True and events["done"]["missing_stages"] == ["listener"]
+    print("✓ Stream reports the stage that missed the deadline")
+
+
+if __name__ == "__main__":
+    test_breaker_opens_and_half_opens()
+    test_failed_trial_reopens_breaker()
+    test_bad_byo_key_does_not_open_the_shared_circuit()
+    test_llm_retries_fit_the_deadline()
+    test_clip_timeout_to_remaining_budget()
+    test_expired_deadline_fails_before_request()
+    test_partial_result_when_stage_misses_deadline()
+    test_no_deadline_is_not_partial()
+    test_degraded_stage_counts_as_missing()
+    test_expired_deadline_is_noted_as_shortfall()
+    test_praw_requests_follow_the_deadline()
+    test_live_search_is_skipped_past_the_deadline()
+    test_stream_reports_stage_that_misses_deadline()
+    print("\n✅ All deadline tests passed!")
@@ -0,0 +1,188 @@
+"""
+Tests for incremental Etherscan transfer ingestion, with a fake Etherscan API.
+"""
+import sys
+import os
+import time
+import sqlite3
+import tempfile
+from types import SimpleNamespace
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import src.services.etherscan_ingestor as ingestor_module
+from src.services.etherscan_ingestor import EtherscanIngestor
+from src.services.transfer_store import TransferStore
+
+CONTRACT = "0xToken"
+PAIR = "0xpair"
+
+
+def make_tx(block, ts, i):
+    return {"hash": f"0x{block:x}{i}", "blockNumber": str(block), "timeStamp": str(ts),
+            "from": PAIR, "to": f"0xwallet{i}", "value": str(10 ** 18), "tokenDecimal": "18"}
+
+
+class FakeEtherscan:
+    """Serves tokentx pages out of an in-memory chain of transfers."""
+    def __init__(self, transfers):
+        self.transfers = transfers
+        self.requests = []
+
+    def __call__(self, url, upstream=None, params=None, **kwargs):
+        self.requests.append(dict(params))
+        rows = [tx for tx in self.transfers
+                if params["startblock"] <= int(tx["blockNumber"]) <= params["endblock"]]
+        rows.sort(key=lambda tx: int(tx["blockNumber"]), reverse=params["sort"] == "desc")
+        start = (params["page"] - 1) * params["offset"]
+        page = rows[start:start + params["offset"]]
+        if not page:
+            payload = {"status": "0", "message": "No transactions found", "result": []}
+        else:
+            payload = {"status": "1", "message": "OK", "result": page}
+        return SimpleNamespace(json=lambda: payload)
+
+
+def run_with_fake(fake, func):
+    original = ingestor_module.http_get
+    ingestor_module.http_get = fake
+    try:
+        return func()
+    finally:
+        ingestor_module.http_get = original
+
+
+def test_first_sync_backfills_then_syncs_incrementally():
+    """Test that later syncs only fetch from the cursor and store only new rows"""
+    now = int(time.time())
+    transfers = [make_tx(100 + i, now - 3600 + i, i) for i in range(25)]
+    fake = FakeEtherscan(transfers)
+    ingestor = EtherscanIngestor("key", TransferStore(":memory:"), page_size=10)
+
+    assert run_with_fake(fake, lambda: ingestor.sync(CONTRACT)) == 25
+    assert fake.requests[0]["sort"] == "desc"
+    assert len(fake.requests) == 3
+
+    fake.transfers.extend(make_tx(200 + i, now, 100 + i) for i in range(3))
+    fake.requests.clear()
+    assert run_with_fake(fake, lambda: ingestor.sync(CONTRACT)) == 3
+    assert fake.requests[0]["sort"] == "asc"
+    assert fake.requests[0]["startblock"] == 124
+    assert len(ingestor.pool_batch_in_window(CONTRACT, PAIR)) == 28
+    print("✓ Incremental sync only stores new transfers")
+
+
+def test_window_excludes_old_transfers():
+    """Test that the whale window only returns transfers inside it"""
+    now = int(time.time())
+    transfers = [make_tx(100, now - 48 * 3600, 0), make_tx(101, now - 60, 1)]
+    ingestor = EtherscanIngestor("key", TransferStore(":memory:"), window_seconds=24 * 3600)
+    run_with_fake(FakeEtherscan(transfers), lambda: ingestor.sync(CONTRACT))
+    window = ingestor.pool_batch_in_window(CONTRACT, PAIR)
+    assert window.timestamp.tolist() == [now - 60]
+    print("✓ Window filtering works")
+
+
+def test_failed_backfill_resumes_where_it_stopped():
+    """Test that a backfill failing after its first page resumes below it instead of starting over"""
+    now = int(time.time())
+    fake = FakeEtherscan([make_tx(100 + i, now - 3600 + i, i) for i in range(25)])
+    store = TransferStore(":memory:")
+    ingestor = EtherscanIngestor("key", store, page_size=10)
+
+    def flaky(url, upstream=None, params=None, **kwargs):
+        if params["page"] == 2:
+            raise ConnectionError("page 2 failed")
+        return fake(url, params=params)
+
+    try:
+        run_with_fake(flaky, lambda: ingestor.sync(CONTRACT))
+        raise AssertionError("sync should have failed")
+    except ConnectionError:
+        pass
+    assert store.get_cursor(1, CONTRACT) is None
+    assert not ingestor.window_covered(CONTRACT)
+
+    fake.requests.clear()
+    assert run_with_fake(fake, lambda: ingestor.sync(CONTRACT)) == 15
+    assert fake.requests[0]["sort"] == "desc"
+    assert fake.requests[0]["endblock"] == 115
+    assert store.get_cursor(1, CONTRACT) == 124
+    assert ingestor.window_covered(CONTRACT)
+    assert len(ingestor.pool_batch_in_window(CONTRACT, PAIR)) == 25
+    print("✓ Failed backfills resume where they stopped")
+
+
+def test_backfill_resumes_after_the_page_limit():
+    """Test that a backfill cut short by the page limit continues on the next sync"""
+    now = int(time.time())
+    fake = FakeEtherscan([make_tx(100 + i, now - 3600 + i, i) for i in range(25)])
+    store = TransferStore(":memory:")
+    ingestor = EtherscanIngestor("key", store, page_size=10, max_pages=1)
+
+    run_with_fake(fake, lambda: ingestor.sync(CONTRACT))
+    assert store.get_cursor(1, CONTRACT) is None
+    run_with_fake(fake, lambda: ingestor.sync(CONTRACT))
+    run_with_fake(fake, lambda: ingestor.sync(CONTRACT))
+    assert store.get_cursor(1, CONTRACT) == 124
+    assert len(ingestor.pool_batch_in_window(CONTRACT, PAIR)) == 25
+    print("✓ Page-limited backfills continue on the next sync")
+
+
+def test_stale_cursor_is_backfilled_again():
+    """Test that a cursor synced before the window started is dropped for a newest-first backfill"""
+    now = int(time.time())
+    old = [make_tx(100 + i, now - 72 * 3600 + i, i) for i in range(30)]
+    recent = [make_tx(500 + i, now - 60 + i, 100 + i) for i in range(5)]
+    fake = FakeEtherscan(old + recent)
+    store = TransferStore(":memory:")
+    store.set_cursor(1, CONTRACT, 100, now - 72 * 3600)
+    ingestor = EtherscanIngestor("key", store, page_size=10, max_pages=1)
+    assert not ingestor.window_covered(CONTRACT)
+
+    run_with_fake(fake, lambda: ingestor.sync(CONTRACT))
+    assert fake.requests[0]["sort"] == "desc"
+    assert store.get_cursor(1, CONTRACT) == 504
+    assert ingestor.window_covered(CONTRACT)
+    assert len(ingestor.pool_batch_in_window(CONTRACT, PAIR)) == 5
+    print("✓ Stale cursors are backfilled again")
+
+
+def test_cursors_from_before_synced_ts_read_as_stale():
+    """Test that a store created without synced_ts is migrated and its cursors count as stale"""
+    path = os.path.join(tempfile.mkdtemp(), "transfers.sqlite3")
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE ingestion_cursors (chain_id INTEGER NOT NULL, contract TEXT NOT NULL, "
+                 "last_block INTEGER NOT NULL, updated_at REAL NOT NULL, PRIMARY KEY (chain_id, contract))")
+    conn.execute("INSERT INTO ingestion_cursors VALUES (1, ?, 100, ?)", (CONTRACT.lower(), time.time()))
+    conn.commit()
+    conn.close()
+
+    store = TransferStore(path)
+    assert store.get_cursor_state(1, CONTRACT) == (100, None)
+    assert not EtherscanIngestor("key", store).window_covered(CONTRACT)
+    print("✓ Old cursors are migrated as stale")
+
+
+def test_prune_is_rate_limited():
+    """Test that old transfers are pruned at most once per prune interval"""
+    store = TransferStore(":memory:")
+    prunes = []
+    original_prune = store.prune
+    store.prune = lambda before_ts: prunes.append(before_ts) or original_prune(before_ts)
+    ingestor = EtherscanIngestor("key", store, page_size=10, prune_interval_seconds=3600)
+    fake = FakeEtherscan([make_tx(100, int(time.time()) - 60, 0)])
+    for _ in range(3):
+        run_with_fake(fake, lambda: ingestor.sync(CONTRACT))
+    assert len(prunes) == 1
+    print("✓ Pruning is rate-limited")
+
+
+if __name__ == "__main__":
+    test_first_sync_backfills_then_syncs_incrementally()
+    test_window_excludes_old_transfers()
+    test_failed_backfill_resumes_where_it_stopped()
+    test_backfill_resumes_after_the_page_limit()
+    test_stale_cursor_is_backfilled_again()
+    test_cursors_from_before_synced_ts_read_as_stale()
+    test_prune_is_rate_limited()
+    print("\n✅ All Etherscan ingestion tests passed!")
@@ -0,0 +1,94 @@
+"""
+Tests for the shared pooled HTTP client, against a local stub server.
+"""
+import sys
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.services.http_client import http_get, connection_stats, MAX_RETRIES, MIN_ATTEMPT_SECONDS
+from src.services.deadline import deadline_scope
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    flaky_calls = 0
+    busy_calls = 0
+
+    def do_GET(self):
+        if self.path.startswith("/flaky") and StubHandler.flaky_calls < 1:
+            StubHandler.flaky_calls += 1
+            status, body = 503, b"busy"
+        elif self.path.startswith("/busy"):
+            StubHandler.busy_calls += 1
+            status, body = 503, b"busy"
+        else:
+            status, body = 200, b'{"ok": true}'
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def start_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def test_connections_are_reused():
+    """Test that sequential calls to one host reuse a single keep-alive connection"""
+    server = start_server()
+    host = f"127.0.0.1:{server.server_port}"
+    try:
+        for _ in range(5):
+            assert http_get(f"http://{host}/ok", upstream="stub").json() == {"ok": True}
+        stats = connection_stats()[host]
+        assert stats["requests"] == 5
+        assert stats["new_connections"] == 1
+    finally:
+        server.shutdown()
+    print("✓ Keep-alive connections are reused")
+
+
+def test_retries_on_5xx():
+    """Test that a transient 503 is retried transparently"""
+    server = start_server()
+    try:
+        response = http_get(f"http://127.0.0.1:{server.server_port}/flaky", upstream="stub")
+        assert response.status_code == 200
+        assert StubHandler.flaky_calls == 1
+    finally:
+        server.shutdown()
+    print("✓ 5xx responses are retried")
+
+
+def test_retries_fit_the_deadline():
+    """Test that 5xx retries continue under a roomy deadline and stop when the budget cannot cover another attempt"""
+    server = start_server()
+    url = f"http://127.0.0.1:{server.server_port}/busy"
+    try:
+        with deadline_scope(time.monotonic() + 10):
+            assert http_get(url, upstream="stub").status_code == 503
+        assert StubHandler.busy_calls == MAX_RETRIES + 1
+
+        StubHandler.busy_calls = 0
+        with deadline_scope(time.monotonic() + MIN_ATTEMPT_SECONDS / 2):
+            assert http_get(url, upstream="stub").status_code == 503
+        assert StubHandler.busy_calls == 1
+    finally:
+        server.shutdown()
+    print("✓ Retries fit the deadline")
+
+
+if __name__ == "__main__":
+    test_connections_are_reused()
+    test_retries_on_5xx()
+    test_retries_fit_the_deadline()
+    print("\n✅ All HTTP client tests passed!")
@@ -0,0 +1,77 @@
+"""
+Tests for the compact, token-budgeted Judge prompt builder.
+"""
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.services.judge_prompt import build_judge_prompt, estimate_tokens
+
+
+def _inputs(post_count=10):
+    top_posts = [
+        {"title": f"PEPE post {i} " + "to the moon with huge whale accumulation and community hype " * 3,
+         "url": f"https://www.reddit.com/r/CryptoMoonShots/comments/abc{i}/pepe_post_{i}/",
+         "score": 100 - i, "sentiment": "Bullish" if i % 2 else "Bearish"}
+        for i in range(post_count)
+    ]
+    hype = {
+        "token": "PEPE", "hype_score": 72, "trending_volume": "High",
+        "details": {"reddit_data": {"posts": post_count, "upvotes": 900, "sentiment_score": 0.6312,
+                                    "top_posts": top_posts}}
+    }
+    onchain = {
+        "token": "PEPE", "net_smart_money_flow": "Whale Buy", "whale_concentration": 0,
+        "details": {
+            "price": 0.0000123, "liquidity": 1250000.37, "volume_24h": 4000000.9, "fdv": 5e9,
+            "pair_url": "https://dexscreener.com/ethereum/0xabc", "chain_id": "ethereum",
+            "tracking_type": "Deep Whale Analysis", "net_flow_usd": 80000,
+            "whale_data": {"whale_buys_usd": 180000.5, "whale_sells_usd": 100000.5, "whale_tx_count": 3,
+                           "pool_transfers_analyzed": 5000, "window_hours": 24,
+                           "chains": [{"chain_id": "ethereum", "whale_buys_usd": 180000.5}]},
+            "deltas": {"1h": {"price_pct": 1.2, "liquidity_pct": 0.1, "volume_24h_pct": 3.0,
+                              "reference_age_s": 3590}, "6h": None, "24h": None}
+        }
+    }
+    return hype, onchain
+
+
+def test_prompt_is_compact():
+    """Test that the compact prompt drops URLs and is much smaller than the indented dump"""
+    prompt, stats = build_judge_prompt(*_inputs(), token_budget=10000)
+    assert "https://" not in prompt
+    assert '"hype_score":72' in prompt and '"net_smart_money_flow":"Whale Buy"' in prompt
+    assert stats["posts_included"] == 10 and stats["posts_folded"] == 0
+    assert stats["prompt_tokens_est"] == estimate_tokens(prompt)
+    assert stats["reduction_pct"] > 40
+    print(f"✓ Compact prompt is {stats['reduction_pct']}% smaller")
+
+
+def test_budget_folds_posts():
+    """Test that a tight budget truncates and folds posts instead of overflowing"""
+    prompt, stats = build_judge_prompt(*_inputs(), token_budget=450)
+    assert not stats["over_budget"]
+    assert estimate_tokens(prompt) <= 450
+    assert stats["posts_folded"] > 0
+    assert "other_posts_by_sentiment" in prompt
+    # Highest-scored posts are the ones kept
+    assert "PEPE post 0" in prompt
+    print("✓ Tight budgets fold the lowest-ranked posts")
+
+
+def test_missing_dexscreener_data():
+    """Test the projection when the Analyst could not find the token"""
+    hype, _ = _inputs(post_count=0)
+    onchain = {"token": "PEPE", "net_smart_money_flow": "Unknown",
+               "details": {"error": "Token not found on DexScreener"}}
+    prompt, stats = build_judge_prompt(hype, onchain)
+    assert "Token not found on DexScreener" in prompt
+    assert stats["posts_included"] == 0
+    print("✓ Missing on-chain data is projected as an error")
+
+
+if __name__ == "__main__":
+    test_prompt_is_compact()
+    test_budget_folds_posts()
+    test_missing_dexscreener_data()
+    print("\nAll Judge prompt tests passed!")
@@ -0,0 +1,78 @@
+"""
+Tests for the local lexicon sentiment tier and hybrid routing.
+"""
+import sys
+import os
+import json
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.services.lexicon_sentiment import lexicon_sentiment, LEXICON_MIN_CONFIDENCE
+from conftest import make_listener
+
+FIXTURE = os.path.join(os.path.dirname(__file__), "fixtures", "sentiment_posts.json")
+
+
+class FakeLLM:
+    """Records which texts would have been sent to the LLM."""
+    provider = "openai"
+
+    def __init__(self):
+        self.sent = []
+
+    def analyze_sentiment_batch(self, texts):
+        self.sent.extend(texts)
+        return [{"sentiment_score": 0.5, "sentiment_label": "Neutral"} for _ in texts]
+
+
+def test_lexicon_scores_slang():
+    """Test clear-cut slang, phrases and negation"""
+    results = lexicon_sentiment(["PEPE to the moon 🚀 LFG", "Total rug pull, stay away",
+                                 "Not a scam, legit team", "What wallet should I use?"])
+    assert results[0]["sentiment_label"] == "Positive" and results[0]["sentiment_score"] > 0.8
+    assert results[1]["sentiment_label"] == "Negative" and results[1]["sentiment_score"] < 0.2
+    assert results[2]["sentiment_label"] == "Positive"
+    assert results[3] == {"sentiment_score": 0.5, "sentiment_label": "Neutral", "confidence": 0.0}
+    print("✓ Lexicon scores slang, phrases and negation")
+
+
+def test_confident_results_agree_with_fixture():
+    """Test that posts the lexicon keeps local agree with the reference labels"""
+    with open(FIXTURE) as f:
+        posts = json.load(f)["posts"]
+    results = lexicon_sentiment([p["text"] for p in posts])
+    local = [(r["sentiment_label"], p["label"]) for r, p in zip(results, posts)
+             if r["confidence"] >= LEXICON_MIN_CONFIDENCE]
+    agreement = sum(1 for ours, ref in local if ours == ref) / len(local)
+    assert len(local) >= len(posts) // 2
+    assert agreement >= 0.95
+    print(f"✓ {len(local)}/{len(posts)} posts kept local, {agreement:.0%} agreement")
+
+
+def test_hybrid_escalates_only_ambiguous_posts():
+    """Test that hybrid mode sends only low-confidence posts to the LLM"""
+    llm = FakeLLM()
+    texts = ["LFG 🚀 100x", "Is this a rug?", "Classic pump and dump"]
+    analyses, routing = make_listener(llm)._score_posts(texts, mode="hybrid")
+    assert llm.sent == ["Is this a rug?"]
+    assert routing["local"] == 2 and routing["llm"] == 1
+    assert analyses[0]["sentiment_label"] == "Positive" and analyses[2]["sentiment_label"] == "Negative"
+    print("✓ Hybrid mode escalates only ambiguous posts")
+
+
+def test_local_mode_makes_no_llm_calls():
+    """Test that local mode never touches the LLM"""
+    llm = FakeLLM()
+    texts = ["Is this a rug?"] * 25
+    analyses, routing = make_listener(llm)._score_posts(texts, mode="local")
+    assert llm.sent == []
+    assert len(analyses) == 25
+    assert routing["llm_requests"] == 0 and routing["llm_requests_saved"] >= 1
+    print("✓ Local mode makes no LLM calls")
+
+
+if __name__ == "__main__":
+    test_lexicon_scores_slang()
+    test_confident_results_agree_with_fixture()
+    test_hybrid_escalates_only_ambiguous_posts()
+    test_local_mode_makes_no_llm_calls()
+    print("\nAll lexicon sentiment tests passed!")
@@ -0,0 +1,60 @@
+"""
+Tests for batched sentiment scoring in LLMService.
+"""
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from conftest import make_llm_service as make_service, make_offline_llm_service
+
+
+def test_batch_maps_results_by_index():
+    """Test that results are mapped back by index, not by position"""
+    service, completions = make_service({"results": [
+        {"index": 1, "sentiment_score": 0.1, "sentiment_label": "Negative"},
+        {"index": 0, "sentiment_score": 0.9, "sentiment_label": "Positive"},
+    ]})
+    results = service.analyze_sentiment_batch(["to the moon", "rug pull"])
+    assert len(completions.calls) == 1
+    assert results[0]["sentiment_label"] == "Positive"
+    assert results[1]["sentiment_label"] == "Negative"
+    print("✓ Batch results mapped by index")
+
+
+def test_batch_falls_back_per_item():
+    """Test that dropped or mangled entries fall back to Neutral"""
+    service, _ = make_service({"results": [
+        {"index": 0, "sentiment_score": 0.8, "sentiment_label": "Positive"},
+        {"index": 1, "sentiment_score": "very high", "sentiment_label": "Positive"},
+        {"index": 2, "sentiment_score": 3.5, "sentiment_label": "Positive"},
+    ]})
+    results = service.analyze_sentiment_batch(["a", "b", "c", "d"])
+    assert results[0]["sentiment_score"] == 0.8
+    for result in results[1:]:
+        assert result["sentiment_score"] == 0.5
+        assert result["sentiment_label"] == "Neutral"
+    print("✓ Per-item fallback works")
+
+
+def test_batch_handles_invalid_json():
+    """Test that an unparseable response degrades every item to Neutral"""
+    service, _ = make_service("not json at all")
+    results = service.analyze_sentiment_batch(["a", "b"])
+    assert [r["sentiment_label"] for r in results] == ["Neutral", "Neutral"]
+    print("✓ Invalid JSON handled")
+
+
+def test_batch_without_provider():
+    """Test that the batch API works without any configured provider"""
+    service = make_offline_llm_service()
+    assert service.analyze_sentiment_batch([]) == []
+    assert len(service.analyze_sentiment_batch(["a", "b", "c"])) == 3
+    print("✓ No-provider fallback works")
+
+
+if __name__ == "__main__":
+    test_batch_maps_results_by_index()
+    test_batch_falls_back_per_item()
+    test_batch_handles_invalid_json()
+    test_batch_without_provider()
+    print("\n✅ All batch sentiment tests passed!")
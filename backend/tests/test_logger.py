@@ -0,0 +1,97 @@
+"""
+Tests for queue-backed, structured logging.
+"""
+import sys
+import os
+import io
+import json
+import logging
+import threading
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.utils.logger import build_queue_handler, JsonFormatter, request_id_var
+
+
+class BlockingHandler(logging.Handler):
+    """Sink that stalls like a hung disk until the test releases it."""
+    def __init__(self):
+        super().__init__()
+        self.unblocked = threading.Event()
+        self.records = []
+        self.threads = set()
+
+    def emit(self, record):
+        self.unblocked.wait(timeout=5)
+        self.threads.add(threading.current_thread().name)
+        self.records.append(record)
+
+
+def make_logger(name, handler):
+    logger = logging.getLogger(name)
+    logger.handlers = [handler]
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+    return logger
+
+
+def test_callers_do_not_block_on_sinks():
+    """Test that logging returns immediately while a background thread writes"""
+    sink = BlockingHandler()
+    handler, listener = build_queue_handler([sink])
+    logger = make_logger("test.queue.slow", handler)
+
+    for i in range(20):
+        logger.info("message %d", i)
+    # Every call returned while the sink was still stalled on the first record
+    assert sink.records == []
+    sink.unblocked.set()
+    listener.stop()
+
+    assert len(sink.records) == 20
+    assert threading.current_thread().name not in sink.threads
+    print("✓ 20 log calls returned while the sink was stalled")
+
+
+def test_full_queue_drops_instead_of_blocking():
+    """Test that a full queue drops records rather than stalling the request"""
+    sink = BlockingHandler()
+    handler, listener = build_queue_handler([sink], maxsize=2)
+    logger = make_logger("test.queue.full", handler)
+    for i in range(50):
+        logger.info("burst %d", i)
+    sink.unblocked.set()
+    listener.stop()
+    assert handler.dropped > 0
+    assert len(sink.records) + handler.dropped == 50
+    print(f"✓ {handler.dropped} records dropped under burst")
+
+
+def test_json_lines_carry_request_id_and_extra():
+    """Test JSON output with the request ID from the context and extra stage timings"""
+    stream = io.StringIO()
+    sink = logging.StreamHandler(stream)
+    sink.setFormatter(JsonFormatter())
+    handler, listener = build_queue_handler([sink])
+    logger = make_logger("test.queue.json", handler)
+
+    token = request_id_var.set("req-123")
+    try:
+        logger.info("Stage 'judge' finished", extra={"stage": "judge", "stage_ms": 812.4})
+    finally:
+        request_id_var.reset(token)
+    logger.info("outside a request")
+    listener.stop()
+
+    first, second = [json.loads(line) for line in stream.getvalue().splitlines()]
+    assert first["request_id"] == "req-123"
+    assert first["stage"] == "judge" and first["stage_ms"] == 812.4
+    assert first["message"] == "Stage 'judge' finished" and first["level"] == "INFO"
+    assert second["request_id"] is None
+    print("✓ JSON lines include request_id and extra fields")
+
+
+if __name__ == "__main__":
+    test_callers_do_not_block_on_sinks()
+    test_full_queue_drops_instead_of_blocking()
+    test_json_lines_carry_request_id_and_extra()
+    print("\nAll logger tests passed!")
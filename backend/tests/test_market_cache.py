@@ -0,0 +1,173 @@
+"""
+Tests for the single-flight market-data cache.
+"""
+import sys
+import os
+import threading
+import time
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import src.services.market_cache as market_cache_module
+from src.services.market_cache import CoalescingTTLCache
+from src.services.deadline import DeadlineExceeded, deadline_scope, remaining, check_deadline
+
+
+def wait_for(predicate, timeout: float = 5) -> bool:
+    """Polls predicate until it holds or timeout seconds pass."""
+    for _ in range(int(timeout / 0.01)):
+        if predicate():
+            return True
+        time.sleep(0.01)
+    return predicate()
+
+
+def test_concurrent_lookups_share_one_load():
+    """Test that concurrent misses for the same key coalesce into one upstream call"""
+    cache = CoalescingTTLCache("test", ttl_seconds=10)
+    calls = []
+    waiters = threading.Semaphore(0)
+
+    def loader():
+        calls.append(1)
+        # Hold the load open until the other 19 callers are waiting on it
+        for _ in range(19):
+            assert waiters.acquire(timeout=5), "callers did not join the load"
+        return ["pair"]
+
+    def remaining_spy():
+        # Waiters read their deadline right before they wait for the load in flight
+        waiters.release()
+        return remaining()
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get("PEPE", loader))) for _ in range(20)]
+    market_cache_module.remaining = remaining_spy
+    try:
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+    finally:
+        market_cache_module.remaining = remaining
+
+    assert len(calls) == 1
+    assert results == [["pair"]] * 20
+    stats = cache.stats()
+    assert stats["loads"] == 1
+    assert stats["coalesced"] == 19
+    assert stats["coalesce_ratio"] == 0.95
+    print("✓ Concurrent lookups are coalesced")
+
+
+def test_stale_value_served_while_refreshing():
+    """Test that a stale entry is returned immediately and refreshed in the background"""
+    cache = CoalescingTTLCache("test", ttl_seconds=0.05, stale_seconds=10)
+    versions = iter(["v1", "v2"])
+    cache.get("DOGE", lambda: next(versions))
+    time.sleep(0.1)
+
+    assert cache.get("DOGE", lambda: next(versions)) == "v1"
+    assert wait_for(lambda: cache.get("DOGE", lambda: "unused") == "v2")
+    assert cache.stats()["background_refreshes"] == 1
+    print("✓ Stale-while-revalidate works")
+
+
+def test_errors_are_not_cached():
+    """Test that a failed load propagates and the next lookup retries"""
+    cache = CoalescingTTLCache("test", ttl_seconds=10)
+
+    def failing_loader():
+        raise RuntimeError("upstream down")
+
+    try:
+        cache.get("SHIB", failing_loader)
+        assert False, "expected RuntimeError"
+    except RuntimeError:
+        pass
+    assert cache.get("SHIB", lambda: "ok") == "ok"
+    assert cache.stats()["load_errors"] == 1
+    print("✓ Errors are not cached")
+
+
+def test_waiters_keep_their_own_deadline():
+    """Test that a waiter stops at its own deadline, and loads itself when only the owner's deadline ran out"""
+    cache = CoalescingTTLCache("test", ttl_seconds=10)
+    started = threading.Event()
+    finish = threading.Event()
+    # Set once a waiter has joined the load in flight and is about to wait for it
+    waiting = {"short": threading.Event(), "patient": threading.Event()}
+
+    def slow_loader():
+        started.set()
+        assert finish.wait(timeout=5), "the load was never allowed to finish"
+        # The owner's budget ran out mid-load
+        raise DeadlineExceeded("slow load")
+
+    def remaining_spy():
+        joined = waiting.get(threading.current_thread().name)
+        if joined:
+            joined.set()
+        return remaining()
+
+    outcomes = {}
+
+    def owner():
+        with deadline_scope(time.monotonic() + 30):
+            try:
+                cache.get("WIF", slow_loader)
+            except DeadlineExceeded as e:
+                outcomes["owner"] = e
+
+    def waiter(name, budget):
+        started.wait()
+        with deadline_scope(time.monotonic() + budget if budget else None):
+            try:
+                outcomes[name] = cache.get("WIF", lambda: "own load")
+            except DeadlineExceeded as e:
+                outcomes[name] = e
+
+    owner_thread = threading.Thread(target=owner)
+    short = threading.Thread(target=waiter, args=("short", 0.05), name="short")
+    patient = threading.Thread(target=waiter, args=("patient", None), name="patient")
+    market_cache_module.remaining = remaining_spy
+    try:
+        for t in (owner_thread, short, patient):
+            t.start()
+        assert all(joined.wait(timeout=5) for joined in waiting.values())
+        # The short waiter gives up while the load is still running
+        short.join(timeout=5)
+        assert isinstance(outcomes["short"], DeadlineExceeded)
+        finish.set()
+        owner_thread.join()
+        patient.join()
+    finally:
+        finish.set()
+        market_cache_module.remaining = remaining
+
+    assert isinstance(outcomes["owner"], DeadlineExceeded)
+    assert outcomes["patient"] == "own load"
+    stats = cache.stats()
+    assert stats["wait_timeouts"] == 1 and stats["deadline_retries"] == 1 and stats["shared_errors"] == 0
+    print("✓ Waiters keep their own deadline")
+
+
+def test_background_refresh_keeps_caller_context():
+    """Test that a stale-while-revalidate refresh runs under the caller's deadline"""
+    cache = CoalescingTTLCache("test", ttl_seconds=0.01, stale_seconds=10)
+    cache.get("BONK", lambda: "v1")
+    time.sleep(0.02)
+    seen = []
+    with deadline_scope(time.monotonic() + 5):
+        cache.get("BONK", lambda: seen.append(remaining()) or "v2")
+    assert wait_for(lambda: seen)
+    assert seen[0] is not None and 0 < seen[0] <= 5
+    print("✓ Background refreshes follow the caller's deadline")
+
+
+if __name__ == "__main__":
+    test_concurrent_lookups_share_one_load()
+    test_stale_value_served_while_refreshing()
+    test_errors_are_not_cached()
+    test_waiters_keep_their_own_deadline()
+    test_background_refresh_keeps_caller_context()
+    print("\n✅ All market cache tests passed!")
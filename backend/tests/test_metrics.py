@@ -0,0 +1,90 @@
+"""
+Tests for in-process metrics and the Prometheus exposition.
+"""
+import sys
+import os
+import threading
+from types import SimpleNamespace
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.utils.metrics import (
+    Counter, Histogram, CollectorRegistry, instrumented, render_prometheus,
+    STAGE_DURATION, STAGE_ERRORS, UPSTREAM_DURATION, LLM_TOKENS
+)
+from conftest import make_llm_service
+
+
+def test_histogram_exposition():
+    """Test cumulative buckets, sum and count in the text format"""
+    # A private registry keeps the test metrics off /metrics
+    registry = CollectorRegistry()
+    histogram = Histogram("test_latency_seconds", "Test latency.", ("upstream",), buckets=(0.1, 1.0), registry=registry)
+    histogram.observe(0.05, upstream="a")
+    histogram.observe(0.5, upstream="a")
+    histogram.observe(5.0, upstream="a")
+    counter = Counter("test_errors_total", "Test errors.", ("reason",), registry=registry)
+    counter.inc(reason='bad "quote"')
+
+    text = registry.render()
+    assert "# TYPE test_latency_seconds histogram" in text
+    assert 'test_latency_seconds_bucket{upstream="a",le="0.1"} 1' in text
+    assert 'test_latency_seconds_bucket{upstream="a",le="1.0"} 2' in text
+    assert 'test_latency_seconds_bucket{upstream="a",le="+Inf"} 3' in text
+    assert 'test_latency_seconds_sum{upstream="a"} 5.55' in text
+    assert 'test_latency_seconds_count{upstream="a"} 3' in text
+    assert 'test_errors_total{reason="bad \\"quote\\""} 1' in text
+    assert "test_latency_seconds" not in render_prometheus()
+    print("✓ Histogram and counter exposition")
+
+
+def test_instrumented_records_errors():
+    """Test that stage spans count calls and failures"""
+    @instrumented("test_stage")
+    def failing():
+        raise ValueError("boom")
+
+    before = STAGE_DURATION.count(stage="test_stage")
+    try:
+        failing()
+    except ValueError:
+        pass
+    assert STAGE_DURATION.count(stage="test_stage") == before + 1
+    assert STAGE_ERRORS.value(stage="test_stage") >= 1
+    print("✓ Stage spans record duration and errors")
+
+
+def test_llm_token_counts():
+    """Test that provider-reported usage feeds the token counters"""
+    service, _ = make_llm_service("hello", usage=SimpleNamespace(prompt_tokens=120, completion_tokens=30))
+
+    labels = {"provider": "openai", "model": "gpt-4o", "operation": "generate_text"}
+    prompt_before = LLM_TOKENS.value(kind="prompt", **labels)
+    calls_before = UPSTREAM_DURATION.count(upstream="openai", outcome="ok")
+    assert service.generate_text("hi") == "hello"
+    assert LLM_TOKENS.value(kind="prompt", **labels) == prompt_before + 120
+    assert LLM_TOKENS.value(kind="completion", **labels) >= 30
+    assert UPSTREAM_DURATION.count(upstream="openai", outcome="ok") == calls_before + 1
+    print("✓ LLM token usage is counted")
+
+
+def test_concurrent_observations_are_all_counted():
+    """Test that observations from many threads are neither lost nor double-counted"""
+    histogram = Histogram("test_concurrent_seconds", "Concurrent.", ("stage",), buckets=(0.1,),
+                          registry=CollectorRegistry())
+    threads = [threading.Thread(target=lambda: [histogram.observe(0.01, stage="x") for _ in range(2000)])
+               for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert histogram.count(stage="x") == 16000
+    assert 'test_concurrent_seconds_bucket{stage="x",le="0.1"} 16000' in "\n".join(histogram.render())
+    print("✓ Concurrent observations are all counted (see benchmarks/bench_metrics.py for their cost)")
+
+
+if __name__ == "__main__":
+    test_histogram_exposition()
+    test_instrumented_records_errors()
+    test_llm_token_counts()
+    test_concurrent_observations_are_all_counted()
+    print("\nAll metrics tests passed!")
@@ -0,0 +1,103 @@
+"""
+Tests for multi-chain whale tracking in the Analyst.
+"""
+import sys
+import os
+import tempfile
+import threading
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import src.agents.analyst as analyst_module
+from conftest import make_analyst
+from src.services.chains import etherscan_chain_id
+from src.services.snapshot_store import SnapshotStore
+
+PAIRS = [
+    {"chainId": "ethereum", "pairAddress": "0xeth1", "baseToken": {"address": "0xtoken"}, "priceUsd": "1.0",
+     "liquidity": {"usd": 5_000_000}, "volume": {"h24": 100}, "txns": {"h24": {"buys": 1, "sells": 1}}},
+    {"chainId": "ethereum", "pairAddress": "0xeth2", "baseToken": {"address": "0xtoken"}, "priceUsd": "1.0",
+     "liquidity": {"usd": 100}},
+    {"chainId": "base", "pairAddress": "0xbase", "baseToken": {"address": "0xtokenbase"}, "priceUsd": "1.01",
+     "liquidity": {"usd": 2_000_000}},
+    {"chainId": "bsc", "pairAddress": "0xbsc", "baseToken": {"address": "0xtokenbsc"}, "priceUsd": "0.99",
+     "liquidity": {"usd": 1_000_000}},
+    {"chainId": "solana", "pairAddress": "So1", "baseToken": {"address": "So1token"}, "priceUsd": "1.0",
+     "liquidity": {"usd": 9_000_000}},
+]
+
+
+def make_agent():
+    agent = make_analyst("test-key")
+    agent._search_dexscreener_pairs = lambda symbol: PAIRS
+    return agent
+
+
+def test_chain_registry():
+    """Test DexScreener -> Etherscan V2 chain ID mapping"""
+    assert etherscan_chain_id("ethereum") == 1
+    assert etherscan_chain_id("base") == 8453
+    assert etherscan_chain_id("solana") is None
+    print("✓ Chain registry works")
+
+
+def test_top_pair_per_supported_chain():
+    """Test that only the top pair on each Etherscan-supported chain is tracked"""
+    dex_data = make_agent()._fetch_dexscreener_data("MULTICHAIN_TEST_A")
+    assert [p["pair_address"] for p in dex_data["whale_pairs"]] == ["0xeth1", "0xbase", "0xbsc"]
+    print("✓ Top pair per chain is selected")
+
+
+def test_selected_pair_is_always_tracked():
+    """Test that the Ethereum pair the analysis reports on keeps its slot when deeper chains fill the cap"""
+    agent = make_agent()
+    shallow_eth = [dict(p, liquidity={"usd": 10}) if p["chainId"] == "ethereum" else p for p in PAIRS]
+    agent._search_dexscreener_pairs = lambda symbol: shallow_eth
+    original = analyst_module.WHALE_MAX_CHAINS
+    analyst_module.WHALE_MAX_CHAINS = 2
+    try:
+        dex_data = agent._fetch_dexscreener_data("MULTICHAIN_TEST_C")
+    finally:
+        analyst_module.WHALE_MAX_CHAINS = original
+    assert dex_data["pair_address"] == "0xeth1"
+    assert [p["pair_address"] for p in dex_data["whale_pairs"]] == ["0xeth1", "0xbase"]
+    print("✓ Selected pair is always tracked")
+
+
+def test_chains_are_fetched_concurrently_and_merged():
+    """Test that per-chain whale stats are fetched in parallel and merged"""
+    agent = make_agent()
+    calls = []
+    # Each chain's fetch only returns once all three are in flight together
+    barrier = threading.Barrier(3)
+
+    def fake_whales(token_address, pair_address, price_usd, chain_id=1):
+        calls.append(chain_id)
+        barrier.wait(timeout=5)
+        return {"whale_buys_usd": 200_000.0, "whale_sells_usd": 50_000.0, "whale_tx_count": 2,
+                "pool_transfers_analyzed": 10, "window_hours": 24.0}
+
+    agent._fetch_etherscan_whales = fake_whales
+    # Snapshot history goes to a throwaway store, never backend/data
+    snapshot_store = SnapshotStore(os.path.join(tempfile.mkdtemp(), "snapshots.sqlite3"))
+    original_store = analyst_module.get_snapshot_store
+    analyst_module.get_snapshot_store = lambda: snapshot_store
+    try:
+        result = agent.analyze_onchain_data("MULTICHAIN_TEST_B")
+    finally:
+        analyst_module.get_snapshot_store = original_store
+
+    assert sorted(calls) == [1, 56, 8453]
+    whale_data = result["details"]["whale_data"]
+    assert whale_data["whale_tx_count"] == 6
+    assert len(whale_data["chains"]) == 3
+    assert result["net_smart_money_flow"] == "Whale Buy"
+    assert result["details"]["net_flow_usd"] == 450_000
+    print("✓ Chains are fetched concurrently and merged")
+
+
+if __name__ == "__main__":
+    test_chain_registry()
+    test_top_pair_per_supported_chain()
+    test_selected_pair_is_always_tracked()
+    test_chains_are_fetched_concurrently_and_merged()
+    print("\n✅ All multi-chain whale tests passed!")
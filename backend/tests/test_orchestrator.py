@@ -0,0 +1,168 @@
+"""
+Tests for the async orchestration layer.
+"""
+import sys
+import os
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.services.orchestrator import run_analysis, run_batch_analysis, stream_analysis, dedupe_tokens
+
+
+class StubListener:
+    def analyze_sentiment(self, token):
+        return {"token": token, "hype_score": 50}
+
+
+class StubAnalyst:
+    def analyze_onchain_data(self, token):
+        return {"token": token, "net_smart_money_flow": "Neutral"}
+
+
+class FastJudge:
+    def assess_risk(self, hype_data, onchain_data):
+        return {"risk_level": "Low", "hype": hype_data["hype_score"], "flow": onchain_data["net_smart_money_flow"]}
+
+
+class RendezvousListener(StubListener):
+    """Only returns once the Analyst is running at the same time (BrokenBarrierError otherwise)."""
+    def __init__(self, barrier):
+        self.barrier = barrier
+
+    def analyze_sentiment(self, token):
+        self.barrier.wait(timeout=5)
+        return super().analyze_sentiment(token)
+
+
+class RendezvousAnalyst(StubAnalyst):
+    def __init__(self, barrier):
+        self.barrier = barrier
+
+    def analyze_onchain_data(self, token):
+        self.barrier.wait(timeout=5)
+        return super().analyze_onchain_data(token)
+
+
+def test_listener_and_analyst_run_concurrently():
+    """Test that the Listener and Analyst are in flight at the same time"""
+    barrier = threading.Barrier(2)
+    result = asyncio.run(run_analysis(RendezvousListener(barrier), RendezvousAnalyst(barrier), FastJudge(), "PEPE"))
+    assert result["verdict"]["risk_level"] == "Low"
+    assert set(result["timings"]) == {"listener_ms", "analyst_ms", "judge_ms", "total_ms"}
+    print("✓ Listener and Analyst run concurrently")
+
+
+def test_judge_receives_both_outputs():
+    """Test that the Judge gets both stage outputs"""
+    result = asyncio.run(run_analysis(StubListener(), StubAnalyst(), FastJudge(), "PEPE"))
+    assert result["verdict"] == {"risk_level": "Low", "hype": 50, "flow": "Neutral"}
+    assert result["hype_data"]["token"] == "PEPE"
+    assert result["onchain_data"]["token"] == "PEPE"
+    print("✓ Judge receives both outputs")
+
+
+class FlakyAnalyst(StubAnalyst):
+    def analyze_onchain_data(self, token):
+        if token == "BAD":
+            raise RuntimeError("DexScreener exploded")
+        return super().analyze_onchain_data(token)
+
+
+def test_dedupe_tokens():
+    """Test that duplicate symbols are collapsed case-insensitively"""
+    assert dedupe_tokens(["pepe", "PEPE", " doge ", "", "Doge", "SHIB"]) == ["pepe", "doge", "SHIB"]
+    print("✓ Tokens are deduplicated")
+
+
+class CountingAnalyst(StubAnalyst):
+    """Records how many calls overlap; each waits until `rendezvous` calls are in flight together."""
+    def __init__(self, rendezvous):
+        self.barrier = threading.Barrier(rendezvous)
+        self.lock = threading.Lock()
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    def analyze_onchain_data(self, token):
+        with self.lock:
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            self.barrier.wait(timeout=5)
+            return super().analyze_onchain_data(token)
+        finally:
+            with self.lock:
+                self.in_flight -= 1
+
+
+def test_batch_runs_tokens_up_to_the_concurrency_limit():
+    """Test that a batch keeps exactly `concurrency` tokens in flight"""
+    tokens = [f"T{i}" for i in range(8)]
+    analyst = CountingAnalyst(rendezvous=4)
+
+    async def run_with_agent_pool():
+        # Mirrors the app's lifespan, which sizes the default executor for agent threads
+        asyncio.get_running_loop().set_default_executor(ThreadPoolExecutor(max_workers=16))
+        return await run_batch_analysis(StubListener(), analyst, FastJudge(), tokens, concurrency=4)
+
+    outcomes = asyncio.run(run_with_agent_pool())
+    assert list(outcomes) == tokens
+    assert all(outcome["verdict"]["risk_level"] == "Low" for outcome in outcomes.values())
+    assert analyst.max_in_flight == 4
+    print("✓ Batch runs with bounded concurrency")
+
+
+def test_batch_reports_per_token_errors():
+    """Test that one failing token does not fail the whole batch"""
+    outcomes = asyncio.run(run_batch_analysis(StubListener(), FlakyAnalyst(), FastJudge(), ["PEPE", "BAD"], concurrency=2))
+    assert outcomes["PEPE"]["verdict"]["risk_level"] == "Low"
+    assert isinstance(outcomes["BAD"], RuntimeError)
+    print("✓ Per-token errors are isolated")
+
+
+class GatedListener(StubListener):
+    """Blocks until the test releases it, and fails if that never happens."""
+    def __init__(self):
+        self.release = threading.Event()
+
+    def analyze_sentiment(self, token):
+        assert self.release.wait(timeout=5), "Listener was never released"
+        return super().analyze_sentiment(token)
+
+
+class QuickAnalyst:
+    def analyze_onchain_data(self, token):
+        return {"token": token, "net_smart_money_flow": "Buy Pressure"}
+
+
+def test_stream_emits_stages_as_they_complete():
+    """Test that the Analyst output is streamed while the Listener is still running"""
+    listener = GatedListener()
+
+    async def collect():
+        events = []
+        async for event in stream_analysis(listener, QuickAnalyst(), FastJudge(), "PEPE"):
+            events.append(event)
+            # The Listener can only finish after the Analyst event reached the client
+            if event["event"] == "onchain_analysis":
+                listener.release.set()
+        return events
+
+    events = asyncio.run(collect())
+    assert [e["event"] for e in events] == ["onchain_analysis", "hype_analysis", "final_verdict", "done"]
+    assert events[1]["data"]["hype_score"] == 50
+    assert events[2]["data"]["flow"] == "Buy Pressure"
+    assert set(events[3]["timings"]) == {"listener_ms", "analyst_ms", "judge_ms", "total_ms"}
+    assert events[3]["partial"] is False and events[3]["missing_stages"] == []
+    print("✓ Stream emits each stage as it completes")
+
+
+if __name__ == "__main__":
+    test_listener_and_analyst_run_concurrently()
+    test_judge_receives_both_outputs()
+    test_dedupe_tokens()
+    test_batch_runs_tokens_up_to_the_concurrency_limit()
+    test_batch_reports_per_token_errors()
+    test_stream_emits_stages_as_they_complete()
+    print("\n✅ All orchestrator tests passed!")
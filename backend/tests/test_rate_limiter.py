@@ -0,0 +1,121 @@
+"""
+Tests for the token-bucket rate limiter.
+"""
+import sys
+import os
+import tempfile
+import threading
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.services.rate_limiter import RateLimiter, RateLimitExceeded, MemoryBucketStore, SQLiteBucketStore
+
+
+class FakeClock:
+    """Monotonic clock that only moves when a caller sleeps or the test advances it."""
+    def __init__(self):
+        self.now = 1000.0
+        self.sleeps = []
+        self._lock = threading.Lock()
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        with self._lock:
+            self.sleeps.append(seconds)
+
+
+def fake_limiter(limits: dict, sweep_interval: float = 60.0):
+    clock = FakeClock()
+    limiter = RateLimiter(limits, store=MemoryBucketStore(sweep_interval, clock=clock), sleep=clock.sleep)
+    return limiter, clock
+
+
+def test_burst_then_queue():
+    """Test that calls within the burst pass immediately and later ones queue"""
+    limiter, clock = fake_limiter({"etherscan": (20.0, 3)})
+    waits = [limiter.acquire("etherscan", "key-a") for _ in range(5)]
+    # Reservations made at one instant queue one refill interval (1/20s) behind each other
+    assert waits == [0.0, 0.0, 0.0, 0.05, 0.1]
+    assert clock.sleeps == [0.05, 0.1]
+    stats = limiter.stats()["etherscan"]
+    assert stats["acquired"] == 5 and stats["delayed"] == 2
+    assert stats["total_wait_s"] == 0.15
+    print(f"✓ Burst passes, then queued for {stats['total_wait_s'] * 1000:.0f}ms total")
+
+
+def test_keys_and_upstreams_are_isolated():
+    """Test that buckets are per API key and unknown upstreams are unlimited"""
+    limiter = RateLimiter({"openai": (1.0, 1)})
+    assert limiter.acquire("openai", "key-a") == 0.0
+    assert limiter.acquire("openai", "key-b") == 0.0
+    assert limiter.acquire("unlisted", "key-a") == 0.0
+    print("✓ Buckets are isolated per key")
+
+
+def test_timeout_rejects_without_consuming():
+    """Test that a wait longer than the timeout raises and reserves nothing"""
+    limiter, clock = fake_limiter({"reddit_rss": (1.0, 1)})
+    limiter.acquire("reddit_rss")
+    try:
+        limiter.acquire("reddit_rss", timeout=0.1)
+        assert False, "expected RateLimitExceeded"
+    except RateLimitExceeded:
+        pass
+    assert clock.sleeps == []
+    assert limiter.stats()["reddit_rss"]["rejected"] == 1
+    clock.now += 1
+    assert limiter.acquire("reddit_rss") == 0.0
+    print("✓ Over-long waits are rejected immediately")
+
+
+def test_idle_buckets_are_evicted():
+    """Test that buckets of keys that went quiet are dropped once they have refilled"""
+    limiter, clock = fake_limiter({"openai": (10.0, 2)}, sweep_interval=0)
+    store = limiter.store
+    for i in range(50):
+        limiter.acquire("openai", f"byo-key-{i}")
+    assert store.size() == 50
+    clock.now += 0.12
+    limiter.acquire("openai", "byo-key-active")
+    limiter.acquire("openai", "byo-key-active")
+    assert store.size() == 1
+    # A dropped bucket comes back full, exactly as it would have refilled
+    assert limiter.acquire("openai", "byo-key-0") == 0.0
+    print("✓ Idle buckets are evicted")
+
+
+def test_threads_share_rate():
+    """Test that concurrent threads together stay within the configured rate"""
+    limiter, clock = fake_limiter({"etherscan": (50.0, 1)})
+    waits = []
+    threads = [threading.Thread(target=lambda: waits.append(limiter.acquire("etherscan", "k"))) for _ in range(11)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    # One token per reservation: the 11 callers are spaced one refill (1/50s) apart
+    assert sorted(round(w, 6) for w in waits) == [round(i / 50, 6) for i in range(11)]
+    print("✓ Threads share one bucket")
+
+
+def test_sqlite_store_is_shared():
+    """Test that two limiters on one SQLite file (as in two processes) share buckets"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "limits.sqlite3")
+        first = RateLimiter({"etherscan": (10.0, 2)}, store=SQLiteBucketStore(path))
+        second = RateLimiter({"etherscan": (10.0, 2)}, store=SQLiteBucketStore(path))
+        assert first.acquire("etherscan", "k") == 0.0
+        assert second.acquire("etherscan", "k") == 0.0
+        assert first.acquire("etherscan", "k") > 0.05
+    print("✓ SQLite buckets are shared across limiter instances")
+
+
+if __name__ == "__main__":
+    test_burst_then_queue()
+    test_keys_and_upstreams_are_isolated()
+    test_timeout_rejects_without_consuming()
+    test_idle_buckets_are_evicted()
+    test_threads_share_rate()
+    test_sqlite_store_is_shared()
+    print("\nAll rate limiter tests passed!")
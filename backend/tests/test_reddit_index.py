@@ -0,0 +1,145 @@
+"""
+Tests for the Reddit mention index, its ingestion worker and the Listener lookup.
+"""
+import sys
+import os
+import time
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import src.agents.listener as listener_module
+from conftest import make_listener
+from src.services.reddit_index import RedditMentionIndex, RedditIngestor, extract_terms
+from src.services.symbol_index import SymbolIndex
+
+
+def make_post(post_id: str, title: str, age_s: float = 60, selftext: str = "") -> dict:
+    return {"id": post_id, "title": title, "url": f"https://reddit.com/{post_id}", "score": 5,
+            "selftext": selftext, "created_at": time.time() - age_s}
+
+
+
+def test_extract_terms():
+    """Test that cashtags, all-caps tokens and known symbols become terms, and plain words and numbers do not"""
+    assert extract_terms("$pepe to the MOON, 1INCH up 2024% from $100") == {"PEPE", "MOON", "1INCH"}
+    assert extract_terms("bonk is back, when wen", frozenset({"BONK"})) == {"BONK"}
+    print("✓ Terms extracted")
+
+
+def test_common_words_are_not_indexed():
+    """Test that lower-case words only match posts when the symbol index knows them"""
+    symbols = SymbolIndex()
+    symbols.put("BONK", [{"chainId": "solana", "pairAddress": "0xpair", "liquidity": {"usd": 1000}}])
+    index = RedditMentionIndex(":memory:", symbols=symbols)
+    index.add_posts([make_post("t3_a", "bonk is back and the dip is over")])
+    assert [p["id"] for p in index.search("BONK")] == ["t3_a"]
+    assert index.search("the") == [] and index.search("dip") == []
+    print("✓ Common words are not indexed")
+
+
+def test_search_returns_newest_mentions_with_sentiment():
+    """Test that lookups by symbol or cashtag return recent posts newest first, with stored sentiment"""
+    index = RedditMentionIndex(":memory:")
+    added = index.add_posts([
+        make_post("t3_a", "PEPE to the moon LFG", age_s=300),
+        make_post("t3_b", "Is this a rug?", age_s=200, selftext="Dev dumped his $pepe bag"),
+        make_post("t3_c", "DOGE is boring", age_s=100),
+        make_post("t3_old", "PEPE last month", age_s=30 * 24 * 3600),
+    ])
+    assert added == 4
+    assert index.add_posts([make_post("t3_a", "PEPE to the moon LFG", age_s=300)]) == 0
+
+    posts = index.search("$Pepe")
+    assert [p["id"] for p in posts] == ["t3_b", "t3_a"]
+    assert posts[1]["sentiment"]["sentiment_label"] == "Positive"
+    assert index.prune() == 1
+    assert index.stats()["posts"] == 3
+    print("✓ Index lookups by symbol")
+
+
+class FakeSubmission:
+    def __init__(self, i):
+        self.name = f"t3_{i}"
+        self.title = f"WIF holders unite #{i}"
+        self.url = f"https://reddit.com/{i}"
+        self.score = i
+        self.selftext = ""
+        self.created_utc = time.time() - i
+
+
+class FakeReddit:
+    class config:
+        client_id = "fake-client"
+
+    def __init__(self):
+        self.polls = 0
+
+    def subreddit(self, name):
+        reddit = self
+
+        class Listing:
+            def new(self, limit):
+                reddit.polls += 1
+                return [FakeSubmission(i) for i in range(3 + reddit.polls)]
+        return Listing()
+
+
+def test_ingestor_indexes_only_new_posts():
+    """Test that repeated polls score and index each submission once"""
+    index = RedditMentionIndex(":memory:")
+    ingestor = RedditIngestor(index)
+    ingestor._reddit = FakeReddit()
+    assert ingestor.ingest_once() == 4
+    assert ingestor.ingest_once() == 1
+    stats = ingestor.stats()
+    assert stats["polls"] == 2 and stats["posts_added"] == 5 and stats["posts"] == 5
+    assert len(index.search("WIF")) == 5
+    print("✓ Ingestor indexes new posts only")
+
+
+def test_known_posts_get_their_score_updated():
+    """Test that a repeat poll refreshes the score of an indexed post and keeps its sentiment"""
+    index = RedditMentionIndex(":memory:")
+    post = make_post("t3_a", "PEPE to the moon LFG")
+    assert index.add_posts([post]) == 1
+    sentiment = index.search("PEPE")[0]["sentiment"]
+
+    assert index.add_posts([{**post, "score": 250}, make_post("t3_b", "PEPE again")]) == 1
+    posts = {p["id"]: p for p in index.search("PEPE")}
+    assert posts["t3_a"]["score"] == 250 and posts["t3_a"]["sentiment"] == sentiment
+    assert len(index.search("PEPE")) == 2
+    print("✓ Known posts get their score updated")
+
+
+def test_listener_answers_from_index():
+    """Test that the Listener uses indexed posts and their sentiment without a live search"""
+    index = RedditMentionIndex(":memory:")
+    index.add_posts([make_post(f"t3_{i}", f"BONK breakout, LFG #{i}", age_s=i) for i in range(5)])
+
+    class NoLLM:
+        provider = None
+
+    listener = make_listener(NoLLM())
+    listener._fetch_reddit_rss = lambda token: (_ for _ in ()).throw(AssertionError("live search used"))
+
+    original = listener_module.get_reddit_index
+    listener_module.get_reddit_index = lambda: index
+    try:
+        reddit_data = listener._fetch_reddit_sentiment("BONK")
+    finally:
+        listener_module.get_reddit_index = original
+
+    assert reddit_data["post_source"] == "index"
+    assert reddit_data["posts"] == 5
+    assert all(p["sentiment"] == "Positive" for p in reddit_data["top_posts"])
+    assert index.stats()["hits"] == 1
+    print("✓ Listener answered from the index")
+
+
+if __name__ == "__main__":
+    test_extract_terms()
+    test_common_words_are_not_indexed()
+    test_search_returns_newest_mentions_with_sentiment()
+    test_ingestor_indexes_only_new_posts()
+    test_known_posts_get_their_score_updated()
+    test_listener_answers_from_index()
+    print("\n✅ All Reddit index tests passed!")
@@ -0,0 +1,103 @@
+"""
+Tests for the streaming Reddit RSS parser and conditional feed fetches.
+"""
+import sys
+import os
+import threading
+from html import escape
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.services.reddit_rss import parse_feed, extract_body, fetch_feed, RedditFeedCache
+from src.services.http_client import connection_stats
+
+
+def entry_xml(i: int) -> str:
+    content = (f'<!-- SC_OFF --><div class="md"><p>PEPE post {i} is <strong>pumping</strong> &amp; '
+               f'holding</p></div><!-- SC_ON --> &#32; submitted by <a href="#">/u/user{i}</a>')
+    return (f"<entry><author><name>/u/user{i}</name></author><title>PEPE to the moon #{i}</title>"
+            f'<link href="https://www.reddit.com/r/CryptoMoonShots/comments/{i}/"/>'
+            f'<content type="html">{escape(content)}</content><published>2025-11-19T10:0{i % 10}:00+00:00</published></entry>')
+
+
+def feed_xml(entries: int) -> bytes:
+    body = "".join(entry_xml(i) for i in range(entries))
+    return f'<?xml version="1.0" encoding="UTF-8"?><feed xmlns="http://www.w3.org/2005/Atom">{body}</feed>'.encode()
+
+
+def test_parse_feed_stops_after_limit():
+    """Test that parsing stops once enough entries are complete, without reading further chunks"""
+    feed = feed_xml(3)
+
+    def truncated():
+        # Only the first entry is complete; reading on would raise
+        yield feed[:feed.index(b"</entry>") + len(b"</entry>")]
+        raise AssertionError("parser read past the first entry")
+
+    posts = parse_feed(truncated(), limit=1)
+    assert [p["title"] for p in posts] == ["PEPE to the moon #0"]
+    assert posts[0]["author"] == "/u/user0"
+    assert posts[0]["selftext"] == "PEPE post 0 is pumping & holding"
+    assert len(parse_feed([feed[i:i + 64] for i in range(0, len(feed), 64)], limit=10)) == 3
+    print("✓ Parser stops after the needed entries")
+
+
+def test_extract_body_skips_link_posts():
+    """Test that link posts (no markdown body) yield empty text"""
+    assert extract_body('<table><tr><td><a href="x">[link]</a></td></tr></table>') == ""
+    assert extract_body('<div class="md"><p>a</p>\n<p>b &lt;3</p></div>') == "a b <3"
+    print("✓ Body text extraction")
+
+
+class FeedHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    etag = '"feed-v1"'
+    served = []
+
+    def do_GET(self):
+        if self.headers.get("If-None-Match") == FeedHandler.etag:
+            FeedHandler.served.append(304)
+            self.send_response(304)
+            self.send_header("ETag", FeedHandler.etag)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        body = feed_xml(25)
+        FeedHandler.served.append(200)
+        self.send_response(200)
+        self.send_header("Content-Type", "application/atom+xml")
+        self.send_header("ETag", FeedHandler.etag)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def test_conditional_get_reuses_cached_posts():
+    """Test that a repeat poll sends the ETag, gets a 304 and reuses the parsed posts"""
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FeedHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    host = f"127.0.0.1:{server.server_port}"
+    url = f"http://{host}/r/CryptoMoonShots/search.rss?q=PEPE"
+    cache = RedditFeedCache()
+    try:
+        first = fetch_feed(url, limit=10, cache=cache)
+        second = fetch_feed(url, limit=10, cache=cache)
+    finally:
+        server.shutdown()
+
+    assert FeedHandler.served == [200, 304]
+    assert len(first) == 10 and second == first
+    assert cache.stats() == {"fetched": 1, "not_modified": 1, "feeds": 1}
+    # The unread tail of the first feed was drained, so the connection was reused
+    assert connection_stats()[host]["new_connections"] == 1
+    print("✓ 304 responses reuse the cached parse")
+
+
+if __name__ == "__main__":
+    test_parse_feed_stops_after_limit()
+    test_extract_body_skips_link_posts()
+    test_conditional_get_reuses_cached_posts()
+    print("\n✅ All Reddit RSS tests passed!")
@@ -3,9 +3,11 @@ Tests for security utilities, specifically API key sanitization.
 """
 import sys
 import os
+import logging
+import gc
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-from src.utils.security import sanitize_api_key, sanitize_error_message
+from src.utils.security import sanitize_api_key, sanitize_error_message, Redactor, RedactingFilter
 
 
 def test_sanitize_api_key_with_openai_key():
@@ -64,6 +66,57 @@ def test_sanitize_preserves_uuids():
     print("✓ UUIDs are preserved")
 
 
+def test_redactor_masks_many_values_in_one_pass():
+    """Test that every known value is masked, including ones with non-key characters"""
+    keys = [f"reddit-client-{i:03d}" for i in range(30)] + ["base64+key/with=padding"]
+    text = " | ".join(f"id={key}" for key in keys) + " 🚀"
+    result = Redactor(keys).redact(text)
+    assert not any(key in result for key in keys)
+    assert "redd...-007" in result and "base...ding" in result
+    assert result.endswith("🚀")
+    print("✓ Many values masked in one pass")
+
+
+def test_redactor_prefers_longest_value():
+    """Test that a value containing another is masked whole"""
+    short, long = "secret-123456", "secret-123456-extended"
+    assert Redactor([short, long]).redact(f"key {long}") == "key secr...nded"
+    print("✓ Longest value wins")
+
+
+def test_redactor_finds_openai_key_inside_longer_token():
+    """Test that an sk- key glued to a digit-free prefix is still masked"""
+    text = "header_value_for_sk-abcdefghijklmnopqrstuvwxyz rejected"
+    assert "abcdefghijklmnopqrstuvwxyz" not in Redactor().redact(text)
+    print("✓ Embedded OpenAI key masked")
+
+
+def test_redacting_filter_scrubs_args_and_traceback():
+    """Test that the log filter masks formatted arguments and exception text"""
+    key = "sk-proj-abc123def456ghi789jkl012mno345"
+    try:
+        raise RuntimeError(f"bad key {key}")
+    except RuntimeError:
+        record = logging.LogRecord("test", logging.ERROR, __file__, 0, "Calling with %s", (key,), sys.exc_info())
+    assert RedactingFilter(Redactor([key])).filter(record)
+    formatted = logging.Formatter("%(message)s").format(record)
+    assert key not in formatted
+    assert "sk-p...o345" in formatted and "RuntimeError" in formatted
+    print("✓ Log filter scrubs records")
+
+
+def test_request_secrets_are_not_retained():
+    """Test that a key passed to the sanitizers is not kept alive by any redactor"""
+    key = "byo-secret-key-" + os.urandom(8).hex()
+    assert key not in sanitize_error_message(Exception(f"rejected {key}"), [key])
+    assert key not in sanitize_api_key(f"rejected {key}", key)
+    gc.collect()
+    leaked = [obj for obj in gc.get_objects() if isinstance(obj, Redactor)
+              and any(value == key for value, _ in obj._run_masks + obj._other_masks)]
+    assert not leaked
+    print("✓ Request secrets are not retained")
+
+
 if __name__ == "__main__":
     test_sanitize_api_key_with_openai_key()
     test_sanitize_api_key_with_generic_key()
@@ -71,4 +124,9 @@ if __name__ == "__main__":
     test_sanitize_error_message()
     test_sanitize_preserves_safe_text()
     test_sanitize_preserves_uuids()
+    test_redactor_masks_many_values_in_one_pass()
+    test_redactor_prefers_longest_value()
+    test_redactor_finds_openai_key_inside_longer_token()
+    test_redacting_filter_scrubs_args_and_traceback()
+    test_request_secrets_are_not_retained()
     print("\n✅ All security tests passed!")
@@ -0,0 +1,124 @@
+"""
+Tests for the persistent sentiment cache.
+"""
+import sys
+import os
+import json
+import tempfile
+import time
+from types import SimpleNamespace
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from conftest import make_llm_service
+import src.services.sentiment_cache as sentiment_cache_module
+from src.services.sentiment_cache import SentimentCache
+
+
+def make_cache(**kwargs):
+    path = os.path.join(tempfile.mkdtemp(), "sentiment.sqlite3")
+    return SentimentCache(path, **kwargs)
+
+
+def test_keys_depend_on_provider_and_model():
+    """Test that the same text scored by different models gets different keys"""
+    key_a = SentimentCache.make_key("PEPE to the moon", "openai", "gpt-4o")
+    key_b = SentimentCache.make_key("PEPE to the moon", "gemini", "gemini-2.0-flash")
+    assert key_a != key_b
+    assert key_a == SentimentCache.make_key("PEPE to the moon", "openai", "gpt-4o")
+    print("✓ Keys are content-addressed per provider/model")
+
+
+def test_hit_miss_counters_and_persistence():
+    """Test hit/miss counting and that entries survive reopening the file"""
+    cache = make_cache()
+    cache.set("k1", {"sentiment_score": 0.9, "sentiment_label": "Positive"})
+    assert cache.get("k1")["sentiment_label"] == "Positive"
+    assert cache.get("k2") is None
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+    reopened = SentimentCache(cache.path)
+    assert reopened.get("k1")["sentiment_score"] == 0.9
+    print("✓ Counters and persistence work")
+
+
+def test_ttl_expiry():
+    """Test that expired entries are treated as misses"""
+    cache = make_cache(ttl_seconds=0)
+    cache.set("k1", {"sentiment_score": 0.9, "sentiment_label": "Positive"})
+    time.sleep(0.01)
+    assert cache.get("k1") is None
+    assert cache.stats()["entries"] == 0
+    print("✓ TTL expiry works")
+
+
+def test_lru_eviction():
+    """Test that the least recently used entry is evicted first"""
+    cache = make_cache(max_entries=2)
+    cache.set("a", {"sentiment_score": 0.1, "sentiment_label": "Negative"})
+    time.sleep(0.01)
+    cache.set("b", {"sentiment_score": 0.2, "sentiment_label": "Negative"})
+    time.sleep(0.01)
+    cache.get("a")
+    time.sleep(0.01)
+    cache.set("c", {"sentiment_score": 0.3, "sentiment_label": "Negative"})
+    assert cache.get("a") is not None
+    assert cache.get("b") is None
+    assert cache.get("c") is not None
+    print("✓ LRU eviction works")
+
+
+def test_warm_cache_makes_zero_llm_calls():
+    """Test that a repeat batch on a warm cache never calls the LLM"""
+    calls = []
+
+    def create(**kwargs):
+        calls.append(kwargs)
+        payload = {"results": [
+            {"index": 0, "sentiment_score": 0.9, "sentiment_label": "Positive"},
+            {"index": 1, "sentiment_score": 0.1, "sentiment_label": "Negative"},
+        ]}
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=json.dumps(payload)))])
+
+    service, _ = make_llm_service(create=create, sentiment_cache=make_cache())
+
+    first = service.analyze_sentiment_batch(["PEPE 100x", "PEPE rug"])
+    second = service.analyze_sentiment_batch(["PEPE 100x", "PEPE rug"])
+    assert len(calls) == 1
+    assert first == second
+    print("✓ Warm cache makes zero LLM calls")
+
+
+def test_failed_open_is_not_retried_on_every_call():
+    """Test that after a failed open the cache is skipped without reopening the database"""
+    opens = []
+
+    def failing_cache(**kwargs):
+        opens.append(kwargs["path"])
+        raise OSError("disk I/O error")
+
+    original = sentiment_cache_module.SentimentCache
+    sentiment_cache_module.SentimentCache = failing_cache
+    sentiment_cache_module._cache, sentiment_cache_module._open_failed_at = None, None
+    try:
+        assert sentiment_cache_module.get_sentiment_cache() is None
+        assert sentiment_cache_module.get_sentiment_cache() is None
+        assert len(opens) == 1
+        # Once the retry window has passed the cache is opened again
+        sentiment_cache_module._open_failed_at -= sentiment_cache_module.OPEN_RETRY_SECONDS
+        assert sentiment_cache_module.get_sentiment_cache() is None
+        assert len(opens) == 2
+    finally:
+        sentiment_cache_module.SentimentCache = original
+        sentiment_cache_module._cache, sentiment_cache_module._open_failed_at = None, None
+    print("✓ Failed opens back off")
+
+
+if __name__ == "__main__":
+    test_keys_depend_on_provider_and_model()
+    test_hit_miss_counters_and_persistence()
+    test_ttl_expiry()
+    test_lru_eviction()
+    test_warm_cache_makes_zero_llm_calls()
+    test_failed_open_is_not_retried_on_every_call()
+    print("\n✅ All sentiment cache tests passed!")
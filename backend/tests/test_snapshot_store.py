@@ -0,0 +1,49 @@
+"""
+Tests for the on-chain snapshot time-series store.
+"""
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.services.snapshot_store import SnapshotStore
+
+NOW = 1_700_000_000
+
+
+def view(price, liquidity, volume=1000.0):
+    return {"chain_id": "ethereum", "pair_address": "0xpair", "price_usd": price,
+            "liquidity_usd": liquidity, "volume_24h": volume, "fdv": 1e9,
+            "txns_24h": {"buys": 10, "sells": 5}}
+
+
+def test_min_interval_and_range_queries():
+    """Test that snapshots are throttled per pair and returned in time order"""
+    store = SnapshotStore(":memory:", min_interval_seconds=300)
+    assert store.record("pepe", view(1.0, 100), ts=NOW)
+    assert not store.record("PEPE", view(1.1, 100), ts=NOW + 60)
+    assert store.record("PEPE", view(1.2, 100), ts=NOW + 600)
+    rows = store.range("PEPE", "0xpair", NOW - 1, NOW + 3600)
+    assert [r["ts"] for r in rows] == [NOW, NOW + 600]
+    assert rows[1]["price"] == 1.2
+    print("✓ Throttling and range queries work")
+
+
+def test_deltas_over_windows():
+    """Test 1h/6h/24h deltas against the stored history"""
+    store = SnapshotStore(":memory:", min_interval_seconds=60)
+    store.record("PEPE", view(2.0, 1000), ts=NOW - 24 * 3600)
+    store.record("PEPE", view(1.0, 500), ts=NOW - 3600 - 30)
+
+    deltas = store.deltas("PEPE", view(1.5, 1000), now=NOW)
+    assert deltas["1h"]["price_pct"] == 50.0
+    assert deltas["1h"]["liquidity_pct"] == 100.0
+    assert deltas["1h"]["reference_age_s"] == 3630
+    assert deltas["6h"] is None
+    assert deltas["24h"]["price_pct"] == -25.0
+    print("✓ Deltas are computed per window")
+
+
+if __name__ == "__main__":
+    test_min_interval_and_range_queries()
+    test_deltas_over_windows()
+    print("\n✅ All snapshot store tests passed!")
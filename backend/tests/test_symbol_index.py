@@ -0,0 +1,155 @@
+"""
+Tests for the symbol -> pair resolution index, its warmer and the Analyst lookup.
+"""
+import sys
+import os
+from types import SimpleNamespace
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from conftest import make_analyst
+from src.services.symbol_index import SymbolIndex, SymbolIndexWarmer, rank_pairs, primary_position
+
+
+def make_pairs(prefix: str) -> list:
+    return [
+        {"chainId": "solana", "pairAddress": f"{prefix}-sol", "baseToken": {"address": "So1token"}, "priceUsd": "1.0",
+         "liquidity": {"usd": 9_000_000}},
+        {"chainId": "base", "pairAddress": f"{prefix}-base", "baseToken": {"address": "0xtokenbase"}, "priceUsd": "1.01",
+         "liquidity": {"usd": 2_000_000}},
+        {"chainId": "ethereum", "pairAddress": f"{prefix}-eth2", "baseToken": {"address": "0xtoken"}, "priceUsd": "1.0",
+         "liquidity": {"usd": 100}},
+        {"chainId": "ethereum", "pairAddress": f"{prefix}-eth1", "baseToken": {"address": "0xtoken"}, "priceUsd": "1.0",
+         "liquidity": {"usd": 5_000_000}, "volume": {"h24": 100}, "txns": {"h24": {"buys": 1, "sells": 1}}},
+    ]
+
+
+def test_rank_pairs_keeps_deepest_pair_per_chain():
+    """Test that ranking keeps one pair per chain, most liquid first, and prefers Ethereum"""
+    ranked = rank_pairs(make_pairs("rank"))
+    assert [p["pairAddress"] for p in ranked] == ["rank-sol", "rank-eth1", "rank-base"]
+
+    index = SymbolIndex()
+    entries = index.put("pepe", ranked)
+    assert entries[primary_position(entries)]["pair_address"] == "rank-eth1"
+    assert primary_position(entries[:1]) == 0
+    assert index.resolve("PEPE") == entries
+    print("✓ Pairs ranked per chain")
+
+
+def test_entries_expire_and_popularity_decays():
+    """Test that entries expire after the TTL and lookup counts fade between rounds"""
+    clock = SimpleNamespace(now=1000.0)
+    index = SymbolIndex(ttl_seconds=600, clock=lambda: clock.now)
+    index.put("DOGE", rank_pairs(make_pairs("ttl")))
+    assert index.put("NOPE", []) == []
+    for _ in range(3):
+        index.resolve("DOGE")
+    index.resolve("WIF")
+    assert index.popular(5) == ["DOGE", "WIF"]
+
+    clock.now += 601
+    assert index.resolve("DOGE") is None
+    index.decay_lookups()
+    assert index.popular(5) == ["DOGE"]
+    stats = index.stats()
+    assert stats["hits"] == 3 and stats["misses"] == 1 and stats["expired"] == 1 and stats["symbols"] == 0
+    print("✓ TTL expiry and popularity decay")
+
+
+def test_lookup_counts_are_capped():
+    """Test that lookups of unknown symbols keep only the most recent max_entries counts"""
+    index = SymbolIndex(max_entries=3)
+    for _ in range(2):
+        index.resolve("PEPE")
+    for i in range(10):
+        index.resolve(f"JUNK{i}")
+    assert index.popular(10) == ["JUNK7", "JUNK8", "JUNK9"]
+
+    index.resolve("PEPE")
+    assert index.popular(10) == ["JUNK8", "JUNK9", "PEPE"]
+    print("✓ Lookup counts are capped")
+
+
+def make_agent(pairs: list, pair_calls: list):
+    agent = make_analyst()
+    agent.searches = 0
+
+    def search(symbol):
+        agent.searches += 1
+        return pairs
+
+    def fetch_pairs(chain_id, addresses):
+        pair_calls.append((chain_id, addresses))
+        live = {p["pairAddress"]: p for p in pairs}
+        return [{**live[a], "priceUsd": "2.0"} for a in addresses if a in live]
+
+    agent._search_dexscreener_pairs = search
+    agent._fetch_dexscreener_pairs = fetch_pairs
+    return agent
+
+
+def test_analyst_refreshes_indexed_pair_without_search():
+    """Test that a resolved symbol is served from the per-pair endpoint, not a new search"""
+    pairs = make_pairs("analyst")
+    pair_calls = []
+    agent = make_agent(pairs, pair_calls)
+
+    first = agent._fetch_dexscreener_data("SYMBOL_INDEX_TEST_A")
+    second = agent._fetch_dexscreener_data("SYMBOL_INDEX_TEST_A")
+
+    assert agent.searches == 1
+    assert pair_calls == [("ethereum", ["analyst-eth1"])]
+    assert first["pair_source"] == "search" and second["pair_source"] == "index"
+    assert second["pair_address"] == "analyst-eth1" and second["price_usd"] == 2.0
+    assert [p["pair_address"] for p in second["whale_pairs"]] == ["analyst-eth1", "analyst-base"]
+    assert [p["price_usd"] for p in second["whale_pairs"]] == [2.0, 1.01]
+    print("✓ Indexed symbols skip the search")
+
+
+def test_analyst_searches_again_when_pair_is_gone():
+    """Test that a pair missing from the per-pair endpoint drops the entry and resolves it through the search again"""
+    pairs = make_pairs("gone")
+    agent = make_agent(pairs, [])
+    agent._fetch_dexscreener_data("SYMBOL_INDEX_TEST_B")
+    agent._fetch_dexscreener_pairs = lambda chain_id, addresses: []
+
+    dex_data = agent._fetch_dexscreener_data("SYMBOL_INDEX_TEST_B")
+    # The repeat search is answered by the short-TTL search cache
+    assert agent.searches == 1
+    assert dex_data["pair_source"] == "search" and dex_data["pair_address"] == "gone-eth1"
+    print("✓ Stale entries fall back to a search")
+
+
+def test_warmer_refreshes_configured_and_popular_symbols():
+    """Test that a warm round re-resolves pinned tokens plus the most looked-up ones"""
+    index = SymbolIndex()
+    for symbol, lookups in (("BONK", 3), ("WIF", 2), ("RARE", 1)):
+        for _ in range(lookups):
+            index.resolve(symbol)
+
+    class FakeAnalyst:
+        def __init__(self):
+            self.indexed = []
+
+        def index_symbol(self, symbol):
+            self.indexed.append(symbol)
+            ranked = rank_pairs(make_pairs(symbol)) if symbol != "WIF" else []
+            return ranked, index.put(symbol, ranked)
+
+    analyst = FakeAnalyst()
+    warmer = SymbolIndexWarmer(index, lambda: analyst, top=2, tokens=["pepe"])
+    assert warmer.warm_once() == 2
+    assert analyst.indexed == ["PEPE", "BONK", "WIF"]
+    assert index.resolve("BONK") is not None
+    assert warmer.stats()["refreshed"] == 2
+    print("✓ Warmer refreshes popular symbols")
+
+
+if __name__ == "__main__":
+    test_rank_pairs_keeps_deepest_pair_per_chain()
+    test_entries_expire_and_popularity_decays()
+    test_lookup_counts_are_capped()
+    test_analyst_refreshes_indexed_pair_without_search()
+    test_analyst_searches_again_when_pair_is_gone()
+    test_warmer_refreshes_configured_and_popular_symbols()
+    print("\n✅ All symbol index tests passed!")
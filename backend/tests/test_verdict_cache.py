@@ -0,0 +1,126 @@
+"""
+Tests for Judge verdict reuse on materially unchanged inputs.
+"""
+import sys
+import os
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.agents.judge import JudgeAgent
+from src.services.verdict_cache import verdict_cache, verdict_fingerprint
+
+
+class FakeLLM:
+    provider = "openai"
+
+    def __init__(self, response):
+        self.response = response
+        self.calls = 0
+
+    def generate_text(self, prompt):
+        self.calls += 1
+        return self.response
+
+
+def _inputs(hype_score=62, liquidity=1_250_000, net_flow_usd=80_000):
+    hype = {"token": "PEPE", "hype_score": hype_score, "trending_volume": "High"}
+    onchain = {
+        "token": "PEPE",
+        "net_smart_money_flow": "Whale Buy",
+        "details": {"liquidity": liquidity, "volume_24h": 4_000_000, "net_flow_usd": net_flow_usd,
+                    "tracking_type": "Deep Whale Analysis", "chain_id": "ethereum"}
+    }
+    return hype, onchain
+
+
+def test_fingerprint_ignores_noise():
+    """Test that small input changes keep the fingerprint and large ones change it"""
+    base = verdict_fingerprint(*_inputs())
+    assert verdict_fingerprint(*_inputs(hype_score=64, liquidity=1_300_000, net_flow_usd=85_000)) == base
+    assert verdict_fingerprint(*_inputs(hype_score=85)) != base
+    assert verdict_fingerprint(*_inputs(liquidity=5_000_000)) != base
+    assert verdict_fingerprint(*_inputs(net_flow_usd=-80_000)) != base
+    assert verdict_fingerprint(*_inputs(), provider="gemini") != verdict_fingerprint(*_inputs(), provider="openai")
+    print("✓ Fingerprint ignores noise but tracks material changes")
+
+
+def test_judge_reuses_verdict():
+    """Test that the Judge skips the LLM when inputs have not materially changed"""
+    verdict_cache.invalidate()
+    llm = FakeLLM(json.dumps({"risk_level": "Low", "verdict": "Organic Growth", "reasoning": "ok"}))
+    judge = JudgeAgent(llm=llm)
+
+    first = judge.assess_risk(*_inputs())
+    second = judge.assess_risk(*_inputs(hype_score=65))
+    assert llm.calls == 1
+    assert first["reused"] is False and second["reused"] is True
+    assert second["verdict"] == "Organic Growth"
+    assert second["input_summary"]["hype_score"] == 65
+
+    judge.assess_risk(*_inputs(hype_score=90))
+    assert llm.calls == 2
+    print("✓ Judge reuses verdicts for unchanged inputs")
+
+
+def test_failed_verdicts_are_not_cached():
+    """Test that AI Error fallbacks are retried on the next call"""
+    verdict_cache.invalidate()
+    llm = FakeLLM("not json")
+    judge = JudgeAgent(llm=llm)
+
+    first = judge.assess_risk(*_inputs())
+    second = judge.assess_risk(*_inputs())
+    assert first["verdict"] == "AI Error" and second["reused"] is False
+    assert llm.calls == 2
+    print("✓ Failed verdicts are not cached")
+
+
+def test_concurrent_callers_of_a_failing_judge():
+    """Test that callers coalesced onto a failed LLM call get the AI Error verdict without reused=True"""
+    verdict_cache.invalidate()
+
+    class SlowFailingLLM(FakeLLM):
+        def generate_text(self, prompt):
+            time.sleep(0.2)
+            return super().generate_text(prompt)
+
+    llm = SlowFailingLLM("not json")
+    judge = JudgeAgent(llm=llm)
+    before = verdict_cache.stats()
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        results = list(pool.map(lambda _: judge.assess_risk(*_inputs()), range(4)))
+    after = verdict_cache.stats()
+
+    assert llm.calls == 1
+    assert all(r["verdict"] == "AI Error" and r["reused"] is False for r in results)
+    assert after["shared_errors"] - before["shared_errors"] == 3
+    assert after["coalesced"] == before["coalesced"]
+    assert after["fresh_hits"] == before["fresh_hits"]
+    print("✓ Shared failures are not reported as reuse")
+
+
+def test_verdicts_on_degraded_inputs_are_not_cached():
+    """Test that a verdict built on a stage that ran out of time is neither cached nor reused"""
+    verdict_cache.invalidate()
+    llm = FakeLLM(json.dumps({"risk_level": "Medium", "verdict": "Unclear", "reasoning": "half the data"}))
+    judge = JudgeAgent(llm=llm)
+    hype, onchain = _inputs()
+    hype = {**hype, "degraded": True}
+
+    first = judge.assess_risk(hype, onchain)
+    second = judge.assess_risk(hype, onchain)
+    assert llm.calls == 2
+    assert first["reused"] is False and second["reused"] is False
+    assert verdict_cache.stats()["entries"] == 0
+    print("✓ Verdicts on degraded inputs are not cached")
+
+
+if __name__ == "__main__":
+    test_fingerprint_ignores_noise()
+    test_judge_reuses_verdict()
+    test_failed_verdicts_are_not_cached()
+    test_concurrent_callers_of_a_failing_judge()
+    test_verdicts_on_degraded_inputs_are_not_cached()
+    print("\nAll verdict cache tests passed!")
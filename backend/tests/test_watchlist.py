@@ -0,0 +1,93 @@
+"""
+Tests for the background watchlist scheduler.
+"""
+import sys
+import os
+import asyncio
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.services.watchlist import WatchlistScheduler
+
+
+class FakeListener:
+    def analyze_sentiment(self, token):
+        return {"token": token, "hype_score": 70}
+
+
+class FakeAnalyst:
+    def __init__(self):
+        self.calls = 0
+
+    def analyze_onchain_data(self, token):
+        self.calls += 1
+        return {"token": token, "net_smart_money_flow": "Buy Pressure"}
+
+
+class FakeJudge:
+    def assess_risk(self, hype_data, onchain_data):
+        return {"risk_level": "Low", "verdict": "Organic Growth"}
+
+
+def make_scheduler(analyst, tokens=("pepe",)):
+    return WatchlistScheduler(
+        tokens=list(tokens),
+        agents_factory=lambda: (FakeListener(), analyst, FakeJudge()),
+        intervals={"onchain": 0.05, "sentiment": 0.05, "verdict": 0.05},
+        jitter=0.1,
+        max_concurrency=2,
+    )
+
+
+async def wait_until(predicate, timeout: float = 5) -> bool:
+    """Sleeps in small steps until predicate holds or timeout seconds pass."""
+    for _ in range(int(timeout / 0.01)):
+        if predicate():
+            return True
+        await asyncio.sleep(0.01)
+    return predicate()
+
+
+def test_snapshots_are_precomputed_and_refreshed():
+    """Test that every stage is computed in the background and refreshed on its interval"""
+    analyst = FakeAnalyst()
+    scheduler = make_scheduler(analyst)
+
+    async def run():
+        await scheduler.start()
+        # Three on-chain runs take at least two refresh intervals
+        refreshed = await wait_until(lambda: analyst.calls >= 3 and scheduler.get_snapshot("PEPE") is not None)
+        await scheduler.stop()
+        return refreshed
+
+    assert asyncio.run(run())
+    snapshot = scheduler.get_snapshot("PEPE")
+    assert snapshot["final_verdict"]["verdict"] == "Organic Growth"
+    assert snapshot["onchain_analysis"]["net_smart_money_flow"] == "Buy Pressure"
+    assert set(snapshot["staleness_s"]) == {"onchain", "sentiment", "verdict"}
+    assert analyst.calls >= 3
+    print("✓ Snapshots are precomputed and refreshed")
+
+
+def test_untracked_or_stale_tokens_are_not_served():
+    """Test that untracked tokens and too-stale snapshots return None"""
+    scheduler = make_scheduler(FakeAnalyst())
+
+    async def run():
+        await scheduler.start()
+        computed = await wait_until(lambda: scheduler.get_snapshot("PEPE") is not None)
+        await scheduler.stop()
+        # Staleness is reported to 0.1s, so let the snapshot age past max_staleness=0.01
+        await asyncio.sleep(0.1)
+        return computed
+
+    assert asyncio.run(run())
+    assert scheduler.get_snapshot("DOGE") is None
+    assert scheduler.get_snapshot("PEPE", max_staleness=0.01) is None
+    assert scheduler.get_snapshot("PEPE", max_staleness=60) is not None
+    print("✓ Untracked and stale snapshots are not served")
+
+
+if __name__ == "__main__":
+    test_snapshots_are_precomputed_and_refreshed()
+    test_untracked_or_stale_tokens_are_not_served()
+    print("\n✅ All watchlist tests passed!")